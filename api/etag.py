@@ -0,0 +1,37 @@
+import hashlib
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from gerente.cache import versao_ledger
+
+
+class ETagLedgerMixin:
+    """
+    ETag/If-None-Match para as leituras da API.
+
+    A ETag combina a versão do ledger (gerente/cache.py, incrementada a cada
+    escrita em lançamentos, cartões, cofrinhos, categorias e fornecedores) com
+    a URL completa (filtros, cursor, campos). Um cliente que consulta de novo
+    sem mudanças no ledger recebe 304 sem nenhuma consulta ao banco.
+    """
+
+    def calcular_etag(self, request):
+        chave = f"{versao_ledger()}|{request.get_full_path()}|{request.accepted_media_type}"
+        return f'W/"{hashlib.sha1(chave.encode("utf-8")).hexdigest()}"'
+
+    def responder_com_etag(self, request, gerar_resposta, *args, **kwargs):
+        etag = self.calcular_etag(request)
+        enviadas = {valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')}
+        if etag in enviadas:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = gerar_resposta(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.responder_com_etag(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.responder_com_etag(request, super().retrieve, *args, **kwargs)
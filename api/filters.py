@@ -0,0 +1,20 @@
+import django_filters
+
+from home import busca
+from home.models import Lancamento
+
+
+class LancamentoFilter(django_filters.FilterSet):
+    """Mesmos filtros do RelatorioPeriodoForm (data_inicio, data_fim, metodo_pagamento), e mais alguns."""
+
+    data_inicio = django_filters.DateFilter(field_name='data', lookup_expr='gte')
+    data_fim = django_filters.DateFilter(field_name='data', lookup_expr='lte')
+    metodo_pagamento = django_filters.ChoiceFilter(choices=Lancamento.PAGAMENTO_CHOICES)
+    q = django_filters.CharFilter(method='filtrar_busca', label="Busca em descrição e observações")
+
+    class Meta:
+        model = Lancamento
+        fields = ['data_inicio', 'data_fim', 'metodo_pagamento', 'tipo', 'categoria', 'fornecedor', 'cartao_credito', 'cofrinho_destino']
+
+    def filtrar_busca(self, queryset, name, value):
+        return busca.filtrar(queryset, value)
@@ -0,0 +1,90 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from gerente.paginacao import codificar_cursor, decodificar_cursor, paginar_keyset
+
+
+class PaginacaoCursor(BasePagination):
+    """
+    Paginação por cursor (keyset): o custo de cada página não cresce com a
+    posição na lista, e inserções entre uma página e outra não duplicam nem
+    pulam itens. A ordenação vem de `ordering` da view, cujo último campo tem
+    que ser único (o id).
+
+    O cursor guarda todos os campos da ordenação (as mesmas regras de
+    `gerente.paginacao`), e não só o primeiro com um deslocamento como o
+    CursorPagination do DRF: num dia com milhares de lançamentos, cada página
+    continua sendo uma busca no índice em vez de repassar as linhas do mesmo dia.
+    """
+    page_size = 50
+    page_size_query_param = 'tamanho'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordenacao = tuple(view.ordering)
+        tamanho = self.get_page_size(request)
+
+        apos = antes = None
+        bruto = request.query_params.get(self.cursor_query_param)
+        if bruto:
+            direcao, _, valores = bruto.partition('.')
+            try:
+                if direcao not in ('p', 'a'):
+                    raise ValueError
+                cursor = decodificar_cursor(valores, queryset.model, self.ordenacao)
+            except ValueError:
+                raise NotFound("Cursor de paginação inválido.")
+            if direcao == 'p':
+                apos = cursor
+            else:
+                antes = cursor
+
+        linhas, self.tem_proxima, self.tem_anterior = paginar_keyset(
+            queryset, self.ordenacao, tamanho, apos=apos, antes=antes,
+        )
+        self.linhas = linhas
+        return linhas
+
+    def get_page_size(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(tamanho, self.max_page_size) if tamanho > 0 else self.page_size
+
+    def get_next_link(self):
+        if not (self.tem_proxima and self.linhas):
+            return None
+        return self._link('p', self.linhas[-1])
+
+    def get_previous_link(self):
+        if not (self.tem_anterior and self.linhas):
+            return None
+        return self._link('a', self.linhas[0])
+
+    def _link(self, direcao, objeto):
+        url = self.request.build_absolute_uri()
+        cursor = f'{direcao}.{codificar_cursor(objeto, self.ordenacao)}'
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
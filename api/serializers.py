@@ -0,0 +1,111 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from home.models import CartaoCredito, Categoria, Cofrinho, Fornecedor, Lancamento
+
+
+class CamposSelecionadosMixin:
+    """
+    Sparse fieldsets: `?fields=id,valor,data` devolve só esses campos. Campos
+    desconhecidos são ignorados; sem o parâmetro, todos os campos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        campos = request.query_params.get('fields')
+        if campos:
+            selecionados = {campo.strip() for campo in campos.split(',')}
+            for campo in set(self.fields) - selecionados:
+                self.fields.pop(campo)
+
+
+class LancamentoSerializer(CamposSelecionadosMixin, serializers.ModelSerializer):
+    categoria_nome = serializers.CharField(source='categoria.nome', read_only=True, default=None)
+    fornecedor_nome = serializers.CharField(source='fornecedor.nome', read_only=True, default=None)
+    cartao_credito_nome = serializers.CharField(source='cartao_credito.nome', read_only=True, default=None)
+
+    class Meta:
+        model = Lancamento
+        fields = [
+            'id', 'descricao', 'tipo', 'valor', 'data', 'metodo_pagamento',
+            'categoria', 'categoria_nome', 'fornecedor', 'fornecedor_nome',
+            'cartao_credito', 'cartao_credito_nome', 'cofrinho_destino', 'observacoes', 'quitado',
+        ]
+        read_only_fields = ['quitado']
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        tipo = attrs.get('tipo', getattr(self.instance, 'tipo', None))
+        metodo_pagamento = attrs.get('metodo_pagamento', getattr(self.instance, 'metodo_pagamento', None))
+        cartao_credito = attrs.get('cartao_credito', getattr(self.instance, 'cartao_credito', None))
+        if tipo == 'saida' and metodo_pagamento == 'cartao_credito' and not cartao_credito:
+            raise serializers.ValidationError(
+                {'cartao_credito': "Para uma saída no cartão, você deve selecionar o cartão."}
+            )
+        return attrs
+
+
+class LancamentoLoteSerializer(LancamentoSerializer):
+    """
+    Item do POST em lote. As referências chegam como IDs simples: a view
+    resolve todas de uma vez (uma consulta por modelo) em vez de uma por item.
+    Itens iguais a um lançamento existente (ou a outro do lote) são recusados
+    como duplicados, a menos que venham com `ignorar_duplicidade: true`.
+    """
+    categoria = serializers.IntegerField(required=False, allow_null=True)
+    fornecedor = serializers.IntegerField(required=False, allow_null=True)
+    cartao_credito = serializers.IntegerField(required=False, allow_null=True)
+    cofrinho_destino = serializers.IntegerField(required=False, allow_null=True)
+    # Vendas legítimas iguais (mesmo produto, mesmo valor, no mesmo dia) não são duplicidade
+    ignorar_duplicidade = serializers.BooleanField(required=False, default=False, write_only=True)
+
+    class Meta(LancamentoSerializer.Meta):
+        fields = LancamentoSerializer.Meta.fields + ['ignorar_duplicidade']
+
+    REFERENCIAS = {
+        'categoria': Categoria.objects.all(),
+        'fornecedor': Fornecedor.objects.all(),
+        'cartao_credito': CartaoCredito.objects.filter(ativo=True),
+        'cofrinho_destino': Cofrinho.objects.all(),
+    }
+
+
+class CartaoCreditoSerializer(CamposSelecionadosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CartaoCredito
+        fields = [
+            'id', 'nome', 'limite_total', 'limite_disponivel', 'dia_vencimento', 'dia_fechamento',
+            'ativo', 'observacoes',
+        ]
+        # Mantido pelos UPDATEs atômicos de compra/estorno (ver CartaoCredito.usar_limite)
+        read_only_fields = ['limite_disponivel']
+
+
+class CofrinhoSerializer(CamposSelecionadosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Cofrinho
+        fields = ['id', 'nome', 'objetivo', 'saldo', 'meta']
+        # Movimentado só por transferências (home.services.transferir_para_cofrinho)
+        read_only_fields = ['saldo']
+
+
+class CategoriaSerializer(CamposSelecionadosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Categoria
+        fields = ['id', 'nome', 'descricao', 'categoria_pai', 'caminho', 'nivel']
+        read_only_fields = ['caminho', 'nivel']
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.instance is not None:
+            # Reaproveita a validação do modelo (categoria dentro da própria subárvore)
+            categoria = Categoria(pk=self.instance.pk, caminho=self.instance.caminho,
+                                  categoria_pai=attrs.get('categoria_pai', self.instance.categoria_pai))
+            try:
+                categoria.clean()
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.message_dict)
+        return attrs
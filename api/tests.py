@@ -0,0 +1,291 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from home.models import CartaoCredito, Categoria, Fornecedor, Lancamento, SaldoDiario
+
+
+class LancamentoApiTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('api', password='senha')
+        cls.cartao = CartaoCredito.objects.create(
+            nome="Nubank", limite_total=Decimal('1000.00'), limite_disponivel=Decimal('1000.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        inicio = date(2025, 1, 1)
+        Lancamento.objects.bulk_create([
+            Lancamento(
+                descricao=f"Venda {i}", tipo='entrada', valor=Decimal('10.00'),
+                data=inicio + timedelta(days=i), metodo_pagamento='pix' if i % 2 else 'dinheiro',
+            )
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def test_exige_autenticacao(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/lancamentos/').status_code, 403)
+
+    def test_paginacao_por_cursor_percorre_tudo_sem_repetir(self):
+        vistos = []
+        url = '/api/lancamentos/?tamanho=7'
+        while url:
+            resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200)
+            vistos += [item['id'] for item in resposta.data['results']]
+            url = resposta.data['next']
+        esperado = list(Lancamento.objects.order_by('-data', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_filtros_do_relatorio_e_campos_selecionados(self):
+        resposta = self.client.get('/api/lancamentos/', {
+            'data_inicio': '2025-01-10', 'data_fim': '2025-01-19', 'metodo_pagamento': 'pix',
+            'fields': 'id,data,valor',
+        })
+        resultados = resposta.data['results']
+        self.assertEqual(len(resultados), 5)
+        self.assertEqual(set(resultados[0]), {'id', 'data', 'valor'})
+
+    def test_lista_sem_n_mais_1(self):
+        for i, lancamento in enumerate(Lancamento.objects.all()):
+            lancamento.categoria = Categoria.objects.create(nome=f"Categoria {i}")
+            lancamento.fornecedor = Fornecedor.objects.create(nome=f"Fornecedor {i}")
+            lancamento.save()
+        with self.assertNumQueries(1):
+            resposta = self.client.get('/api/lancamentos/?tamanho=30')
+        self.assertEqual(len({item['fornecedor_nome'] for item in resposta.data['results']}), 30)
+
+    def test_etag_devolve_304_ate_o_ledger_mudar(self):
+        resposta = self.client.get('/api/lancamentos/')
+        etag = resposta['ETag']
+
+        with self.assertNumQueries(0):
+            resposta = self.client.get('/api/lancamentos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+        Lancamento.objects.create(
+            descricao="Nova venda", tipo='entrada', valor=Decimal('5.00'), data=date(2025, 2, 1),
+        )
+        resposta = self.client.get('/api/lancamentos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_escrita_aplica_limite_do_cartao(self):
+        dados = {
+            'descricao': "Compra", 'tipo': 'saida', 'valor': '600.00', 'data': '2025-02-01',
+            'metodo_pagamento': 'cartao_credito', 'cartao_credito': self.cartao.pk,
+        }
+        resposta = self.client.post('/api/lancamentos/', dados)
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['cartao_credito_nome'], "Nubank")
+
+        resposta = self.client.post('/api/lancamentos/', dados)
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("Limite insuficiente", str(resposta.data))
+
+        compra = Lancamento.objects.get(descricao="Compra")
+        self.assertEqual(self.client.patch(f'/api/lancamentos/{compra.pk}/', {'valor': '200.00'}).status_code, 200)
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('800.00'))
+
+        self.assertEqual(self.client.delete(f'/api/lancamentos/{compra.pk}/').status_code, 204)
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('1000.00'))
+
+    def test_alterar_limite_total_do_cartao_desloca_disponivel(self):
+        CartaoCredito.objects.filter(pk=self.cartao.pk).update(limite_disponivel=Decimal('700.00'))
+        resposta = self.client.patch(f'/api/cartoes/{self.cartao.pk}/', {'limite_total': '1500.00', 'limite_disponivel': '0'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['limite_disponivel'], '1200.00')
+
+
+    def test_paginacao_com_muitos_lancamentos_no_mesmo_dia(self):
+        mesmo_dia = date(2025, 1, 15)
+        Lancamento.objects.bulk_create([
+            Lancamento(
+                descricao=f"Venda PDV {i}", tipo='entrada', valor=Decimal('1.00'),
+                data=mesmo_dia, metodo_pagamento='dinheiro',
+            )
+            for i in range(40)
+        ])
+        esperado = list(Lancamento.objects.order_by('-data', '-id').values_list('id', flat=True))
+
+        paginas = []
+        url = '/api/lancamentos/?tamanho=7'
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                resposta = self.client.get(url)
+            # O cursor leva data e id: nenhuma página repassa as linhas do mesmo dia
+            self.assertEqual(len(consultas), 1)
+            paginas.append(resposta.data)
+            url = resposta.data['next']
+        self.assertEqual([item['id'] for pagina in paginas for item in pagina['results']], esperado)
+
+        # Voltando pelos links "previous" as páginas se repetem na mesma ordem
+        vistos = []
+        url = paginas[-1]['previous']
+        while url:
+            resposta = self.client.get(url)
+            vistos = [item['id'] for item in resposta.data['results']] + vistos
+            url = resposta.data['previous']
+        self.assertEqual(vistos, esperado[:-len(paginas[-1]['results'])])
+
+    def test_cursor_invalido(self):
+        for cursor in ('lixo', 'p.lixo', 'x.WyIyMDI1LTAxLTAxIiwgIjEiXQ==', 'p.WyIyMDI1LTAyLTMwIiwgIjEiXQ=='):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/lancamentos/', {'cursor': cursor}).status_code, 404)
+
+    def test_nao_exclui_cartao_com_lancamentos(self):
+        self.client.post('/api/lancamentos/', {
+            'descricao': "Compra", 'tipo': 'saida', 'valor': '50.00', 'data': '2025-02-01',
+            'metodo_pagamento': 'cartao_credito', 'cartao_credito': self.cartao.pk,
+        })
+        resposta = self.client.delete(f'/api/cartoes/{self.cartao.pk}/')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertTrue(CartaoCredito.objects.filter(pk=self.cartao.pk).exists())
+        self.assertTrue(Lancamento.objects.filter(cartao_credito=self.cartao, fatura__isnull=False).exists())
+
+        vazio = CartaoCredito.objects.create(
+            nome="Sem uso", limite_total=Decimal('100.00'), limite_disponivel=Decimal('100.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        self.assertEqual(self.client.delete(f'/api/cartoes/{vazio.pk}/').status_code, 204)
+        self.assertFalse(CartaoCredito.objects.filter(pk=vazio.pk).exists())
+
+
+class LancamentoLoteApiTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('pdv', password='senha')
+        cls.cartao = CartaoCredito.objects.create(
+            nome="Maquininha", limite_total=Decimal('100.00'), limite_disponivel=Decimal('100.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        cls.categoria = Categoria.objects.create(nome="Vendas")
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def venda(self, **extra):
+        item = {'descricao': "Venda", 'tipo': 'entrada', 'valor': '10.00', 'data': '2025-03-01',
+                'metodo_pagamento': 'pix', 'categoria': self.categoria.pk}
+        item.update(extra)
+        return item
+
+    def test_resultado_por_item(self):
+        compra = {'descricao': "Compra", 'tipo': 'saida', 'valor': '60.00', 'data': '2025-03-01',
+                  'metodo_pagamento': 'cartao_credito', 'cartao_credito': self.cartao.pk}
+        itens = [
+            self.venda(),
+            self.venda(valor='abc'),
+            self.venda(categoria=999999),
+            compra,
+            dict(compra, descricao="Outra compra"),  # não cabe no limite que sobrou
+            self.venda(data='2025-03-02', valor='5.00'),
+        ]
+        resposta = self.client.post('/api/lancamentos/lote/', itens, format='json')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['criados'], 3)
+        self.assertEqual([r['status'] for r in resposta.data['resultados']], [201, 400, 400, 201, 400, 201])
+        self.assertIn('valor', resposta.data['resultados'][1]['erros'])
+        self.assertIn('categoria', resposta.data['resultados'][2]['erros'])
+        self.assertIn("Limite insuficiente", resposta.data['resultados'][4]['erros']['non_field_errors'][0])
+        self.assertEqual(resposta.data['resultados'][0]['lancamento']['categoria_nome'], "Vendas")
+
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('40.00'))
+        self.assertEqual(SaldoDiario.saldo_ate(date(2025, 3, 2)), Decimal('15.00'))
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+    def test_reenvio_nao_duplica(self):
+        itens = [self.venda(), self.venda(descricao="Venda 2")]
+        self.assertEqual(self.client.post('/api/lancamentos/lote/', itens, format='json').data['criados'], 2)
+
+        resposta = self.client.post('/api/lancamentos/lote/', itens, format='json')
+        self.assertEqual(resposta.data['criados'], 0)
+        self.assertEqual([r['status'] for r in resposta.data['resultados']], [400, 400])
+        self.assertIn('duplicado', resposta.data['resultados'][0]['erros'])
+        self.assertEqual(SaldoDiario.saldo_ate(date(2025, 3, 1)), Decimal('20.00'))
+
+        # Repetida dentro do mesmo lote também é recusada, a menos que o item diga que não é duplicidade
+        resposta = self.client.post('/api/lancamentos/lote/', [
+            self.venda(descricao="Venda 3"), self.venda(descricao="Venda 3"),
+            self.venda(descricao="Venda 3", ignorar_duplicidade=True), self.venda(ignorar_duplicidade=True),
+        ], format='json')
+        self.assertEqual([r['status'] for r in resposta.data['resultados']], [201, 400, 201, 201])
+        self.assertEqual(Lancamento.objects.filter(data=date(2025, 3, 1)).count(), 5)
+
+    def test_consultas_nao_crescem_com_o_lote(self):
+        def consultas(tamanho, data):
+            itens = [self.venda(descricao=f"Venda {i}", data=data) for i in range(tamanho)]
+            with CaptureQueriesContext(connection) as contexto:
+                resposta = self.client.post('/api/lancamentos/lote/', itens, format='json')
+            self.assertEqual(resposta.data['criados'], tamanho)
+            return len(contexto)
+
+        self.assertEqual(consultas(5, '2025-03-01'), consultas(50, '2025-03-02'))
+
+    def test_payload_invalido(self):
+        self.assertEqual(self.client.post('/api/lancamentos/lote/', {'a': 1}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/lancamentos/lote/', [], format='json').status_code, 400)
+
+
+class BuscaApiTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('api', password='senha')
+        inicio = date(2025, 1, 1)
+        Lancamento.objects.bulk_create([
+            Lancamento(
+                descricao=f"Aluguel {i}", tipo='saida', valor=Decimal('100.00'), data=inicio + timedelta(days=i),
+                metodo_pagamento='pix', observacoes="aluguel galpão" if i == 7 else "",
+            )
+            for i in range(25)
+        ] + [
+            Lancamento(descricao="Energia", tipo='saida', valor=Decimal('50.00'), data=inicio, metodo_pagamento='pix')
+            for _ in range(40)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuario)
+
+    def test_resultados_por_relevancia_paginados(self):
+        resposta = self.client.get('/api/lancamentos/busca/?q=aluguel&tamanho=10')
+        self.assertEqual(resposta.status_code, 200)
+        primeira = resposta.json()
+        # O termo também nas observações pesa mais no bm25
+        self.assertEqual(primeira['results'][0]['descricao'], "Aluguel 7")
+        self.assertIn('relevancia', primeira['results'][0])
+        self.assertIsNone(primeira['previous'])
+
+        vistos = [item['id'] for item in primeira['results']]
+        url = primeira['next']
+        while url:
+            pagina = self.client.get(url).json()
+            vistos += [item['id'] for item in pagina['results']]
+            url = pagina['next']
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(len(set(vistos)), 25)
+
+    def test_filtros_da_lista_e_lista_com_q(self):
+        resposta = self.client.get('/api/lancamentos/busca/?q=aluguel&data_fim=2025-01-05')
+        self.assertEqual(len(resposta.json()['results']), 5)
+
+        resposta = self.client.get('/api/lancamentos/?q=galpao')
+        self.assertEqual([item['descricao'] for item in resposta.json()['results']], ["Aluguel 7"])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/lancamentos/busca/').status_code, 400)
+        self.assertEqual(self.client.get('/api/lancamentos/busca/?q=aluguel&pagina=51').status_code, 400)
+        self.assertEqual(self.client.get('/api/lancamentos/busca/?q=aluguel&tamanho=x').status_code, 400)
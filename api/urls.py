@@ -0,0 +1,17 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from .views import CartaoCreditoViewSet, CategoriaViewSet, CofrinhoViewSet, LancamentoViewSet
+
+app_name = 'api'
+
+router = DefaultRouter()
+router.register('lancamentos', LancamentoViewSet, basename='lancamento')
+router.register('cartoes', CartaoCreditoViewSet, basename='cartao')
+router.register('cofrinhos', CofrinhoViewSet, basename='cofrinho')
+router.register('categorias', CategoriaViewSet, basename='categoria')
+
+urlpatterns = [
+    # /api/lancamentos/?data_inicio=&data_fim=&metodo_pagamento=&fields=&cursor=
+    path('', include(router.urls)),
+]
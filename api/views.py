@@ -0,0 +1,224 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from home.busca import buscar_por_relevancia
+from home.models import CartaoCredito, Categoria, Cofrinho, Lancamento
+from home.services import (
+    MENSAGEM_DUPLICADO, atualizar_cartao, criar_lancamentos_em_lote, excluir_lancamento, salvar_lancamento,
+)
+
+from .etag import ETagLedgerMixin
+from .filters import LancamentoFilter
+from .paginacao import PaginacaoCursor
+from .serializers import (
+    CartaoCreditoSerializer, CategoriaSerializer, CofrinhoSerializer, LancamentoLoteSerializer, LancamentoSerializer,
+)
+
+TAMANHO_MAXIMO_LOTE = 1000
+
+# Busca por relevância: paginação por número de página, até um limite de profundidade
+TAMANHO_PAGINA_BUSCA = 20
+TAMANHO_MAXIMO_PAGINA_BUSCA = 100
+PAGINA_MAXIMA_BUSCA = 50
+
+
+def _erro_de_validacao(erro):
+    """Converte o ValidationError do Django (vindo dos serviços) para o do DRF (resposta 400)."""
+    return serializers.ValidationError(erro.message_dict if hasattr(erro, 'error_dict') else erro.messages)
+
+
+class LancamentoViewSet(ETagLedgerMixin, viewsets.ModelViewSet):
+    serializer_class = LancamentoSerializer
+    pagination_class = PaginacaoCursor
+    ordering = ('-data', '-id')
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = LancamentoFilter
+
+    def get_queryset(self):
+        return Lancamento.objects.select_related('categoria', 'fornecedor', 'cartao_credito')
+
+    # Escritas passam pelos mesmos serviços das views HTML (limite do cartão)
+    def perform_create(self, serializer):
+        try:
+            serializer.instance = salvar_lancamento(Lancamento(**serializer.validated_data))
+        except DjangoValidationError as e:
+            raise _erro_de_validacao(e)
+
+    def perform_update(self, serializer):
+        lancamento = serializer.instance
+        for campo, valor in serializer.validated_data.items():
+            setattr(lancamento, campo, valor)
+        try:
+            salvar_lancamento(lancamento)
+        except DjangoValidationError as e:
+            raise _erro_de_validacao(e)
+
+    def perform_destroy(self, instance):
+        excluir_lancamento(instance)
+
+    @action(detail=False, methods=['get'], url_path='busca')
+    def busca(self, request):
+        """
+        GET /api/lancamentos/busca/?q=aluguel&pagina=1&tamanho=20: lançamentos
+        cuja descrição ou observações contêm `q`, do mais para o menos
+        relevante (campo `relevancia`). Aceita os demais filtros da lista.
+        A ordem por relevância não tem cursor, então a profundidade é limitada
+        a PAGINA_MAXIMA_BUSCA páginas; para ir além, refine a busca ou use a
+        lista com `?q=` (ordenada por data).
+        """
+        return self.responder_com_etag(request, self._busca)
+
+    def _busca(self, request):
+        termo = request.query_params.get('q', '').strip()
+        if not termo:
+            raise serializers.ValidationError({'q': ["Informe o termo de busca."]})
+        pagina = self._inteiro(request, 'pagina', 1, 1, PAGINA_MAXIMA_BUSCA)
+        tamanho = self._inteiro(request, 'tamanho', TAMANHO_PAGINA_BUSCA, 1, TAMANHO_MAXIMO_PAGINA_BUSCA)
+
+        # Os demais filtros restringem o conjunto; o termo é tratado pela busca por relevância
+        parametros = request.query_params.copy()
+        parametros.pop('q')
+        filtros = self.filterset_class(parametros, queryset=self.get_queryset(), request=request)
+        if not filtros.is_valid():
+            raise serializers.ValidationError(filtros.errors)
+
+        # Um item a mais indica se existe próxima página
+        encontrados = buscar_por_relevancia(filtros.qs, termo, tamanho + 1, (pagina - 1) * tamanho)
+        tem_proxima = len(encontrados) > tamanho and pagina < PAGINA_MAXIMA_BUSCA
+        encontrados = encontrados[:tamanho]
+
+        resultados = self.get_serializer(encontrados, many=True).data
+        for item, lancamento in zip(resultados, encontrados):
+            item['relevancia'] = round(lancamento.relevancia, 4)
+
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'pagina', pagina + 1) if tem_proxima else None,
+            'previous': replace_query_param(url, 'pagina', pagina - 1) if pagina > 1 else None,
+            'results': resultados,
+        })
+
+    @staticmethod
+    def _inteiro(request, parametro, padrao, minimo, maximo):
+        bruto = request.query_params.get(parametro)
+        if bruto is None:
+            return padrao
+        try:
+            valor = int(bruto)
+        except ValueError:
+            raise serializers.ValidationError({parametro: ["Informe um número inteiro."]})
+        if not minimo <= valor <= maximo:
+            raise serializers.ValidationError({parametro: [f"Use um valor entre {minimo} e {maximo}."]})
+        return valor
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        """
+        POST /api/lancamentos/lote/ com uma lista de lançamentos. Valida todos,
+        resolve as referências com uma consulta por modelo e grava os válidos
+        de uma vez. Responde com um resultado por item, na ordem enviada:
+        {"indice", "status": 201, "lancamento"} ou {"indice", "status": 400, "erros"}.
+        Reenviar o mesmo lote não lança nada de novo: cada item repetido volta
+        com o erro `duplicado` (ver `ignorar_duplicidade` no item).
+        """
+        itens = request.data
+        if not isinstance(itens, list) or not itens:
+            raise serializers.ValidationError("Envie uma lista não vazia de lançamentos.")
+        if len(itens) > TAMANHO_MAXIMO_LOTE:
+            raise serializers.ValidationError(f"No máximo {TAMANHO_MAXIMO_LOTE} lançamentos por lote.")
+
+        resultados = [None] * len(itens)
+        validos = {}
+        for indice, item in enumerate(itens):
+            serializer = LancamentoLoteSerializer(data=item)
+            if serializer.is_valid():
+                validos[indice] = serializer.validated_data
+            else:
+                resultados[indice] = serializer.errors
+
+        # Uma consulta por modelo referenciado, para o lote inteiro
+        referencias = {}
+        for campo, queryset in LancamentoLoteSerializer.REFERENCIAS.items():
+            ids = {dados[campo] for dados in validos.values() if dados.get(campo) is not None}
+            referencias[campo] = queryset.in_bulk(ids) if ids else {}
+
+        lancamentos = {}
+        ignorar_duplicidade = []
+        for indice, dados in validos.items():
+            ignorar = dados.pop('ignorar_duplicidade')
+            erros = {}
+            for campo in LancamentoLoteSerializer.REFERENCIAS:
+                pk = dados.pop(campo, None)
+                if pk is not None and pk not in referencias[campo]:
+                    erros[campo] = [f"Pk inválido \"{pk}\" - objeto não existe."]
+                dados[campo] = referencias[campo].get(pk)
+            if erros:
+                resultados[indice] = erros
+            else:
+                lancamentos[indice] = Lancamento(**dados)
+                ignorar_duplicidade.append(ignorar)
+
+        try:
+            falhas = criar_lancamentos_em_lote(list(lancamentos.values()), ignorar_duplicidade)
+        except DjangoValidationError as e:
+            raise _erro_de_validacao(e)
+        criados = {}
+        for (indice, lancamento), falha in zip(lancamentos.items(), falhas):
+            if falha is None:
+                criados[indice] = LancamentoSerializer(lancamento).data
+            elif falha == MENSAGEM_DUPLICADO:
+                resultados[indice] = {'duplicado': [falha]}
+            else:
+                resultados[indice] = {'non_field_errors': [falha]}
+
+        respostas = [
+            {'indice': indice, 'status': status.HTTP_201_CREATED, 'lancamento': criados[indice]}
+            if indice in criados else
+            {'indice': indice, 'status': status.HTTP_400_BAD_REQUEST, 'erros': resultados[indice]}
+            for indice in range(len(itens))
+        ]
+        return Response({'criados': len(criados), 'resultados': respostas}, status=status.HTTP_200_OK)
+
+
+class CartaoCreditoViewSet(ETagLedgerMixin, viewsets.ModelViewSet):
+    queryset = CartaoCredito.objects.all()
+    serializer_class = CartaoCreditoSerializer
+    pagination_class = PaginacaoCursor
+    ordering = ('nome', 'id')
+
+    def perform_create(self, serializer):
+        # Cartão novo começa com todo o limite disponível
+        serializer.save(limite_disponivel=serializer.validated_data['limite_total'])
+
+    def perform_update(self, serializer):
+        cartao = serializer.instance
+        for campo, valor in serializer.validated_data.items():
+            setattr(cartao, campo, valor)
+        atualizar_cartao(cartao, serializer.validated_data.keys())
+
+    def perform_destroy(self, instance):
+        # Como em CartaoCreditoDeleteView: as faturas iriam junto e as compras ficariam sem cartão
+        if Lancamento.objects.filter(cartao_credito=instance).exists():
+            raise serializers.ValidationError(
+                'Não é possível excluir este cartão pois há lançamentos associados a ele.'
+            )
+        instance.delete()
+
+
+class CofrinhoViewSet(ETagLedgerMixin, viewsets.ModelViewSet):
+    queryset = Cofrinho.objects.all()
+    serializer_class = CofrinhoSerializer
+    pagination_class = PaginacaoCursor
+    ordering = ('nome', 'id')
+
+
+class CategoriaViewSet(ETagLedgerMixin, viewsets.ModelViewSet):
+    queryset = Categoria.objects.all()
+    serializer_class = CategoriaSerializer
+    pagination_class = PaginacaoCursor
+    # A ordem pelo caminho materializado lista cada categoria logo antes das suas subcategorias
+    ordering = ('caminho', 'id')
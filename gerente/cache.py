@@ -0,0 +1,109 @@
+"""
+Cache versionado para os cálculos do dashboard.
+
+Todas as chaves incluem a versão atual do ledger. Qualquer escrita em
+Lancamento, Cofrinho, CartaoCredito, Categoria ou Fornecedor incrementa a versão
+(home/signals.py), o que invalida de uma vez tudo o que foi calculado antes,
+sem precisar saber quais chaves existiam. Funciona com o LocMem (testes e
+desenvolvimento) e com um backend compartilhado como Redis em produção (ver
+CACHES em settings).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+CHAVE_VERSAO = 'gerente:ledger:versao'
+CHAVE_ACERTOS = 'gerente:cache:acertos'
+CHAVE_FALHAS = 'gerente:cache:falhas'
+TIMEOUT_PADRAO = 60 * 60
+
+_AUSENTE = object()
+
+
+def versao_ledger():
+    """Versão atual do ledger. Começa com um timestamp para nunca repetir uma versão antiga se a chave for perdida."""
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, int(time.time() * 1000), timeout=None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def _incrementar_versao():
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        versao_ledger()
+
+
+def invalidar_ledger():
+    """
+    Incrementa a versão do ledger agora, para que a própria transação não leia
+    valores antigos, e de novo quando ela for confirmada: entre os dois
+    incrementos outra requisição pode ter guardado, com a versão nova, um
+    valor calculado sem a escrita ainda não confirmada.
+    """
+    _incrementar_versao()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_incrementar_versao)
+
+
+def _contar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.add(chave, 1, timeout=None)
+
+
+def estatisticas_cache():
+    """Contadores de acertos e falhas do cache versionado (compartilhados entre processos se o backend for)."""
+    acertos = cache.get(CHAVE_ACERTOS, 0)
+    falhas = cache.get(CHAVE_FALHAS, 0)
+    total = acertos + falhas
+    return {
+        'versao': versao_ledger(),
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': round(acertos / total, 4) if total else None,
+    }
+
+
+def zerar_estatisticas():
+    cache.delete_many([CHAVE_ACERTOS, CHAVE_FALHAS])
+
+
+def _parte_da_chave(arg):
+    # Argumentos compostos (tuplas de cenário) têm espaços, que o memcached não aceita numa chave
+    texto = str(arg)
+    if ' ' in texto:
+        return hashlib.md5(texto.encode()).hexdigest()
+    return texto
+
+
+def cache_versionado(prefixo, timeout=TIMEOUT_PADRAO):
+    """
+    Decorator que guarda o resultado da função no cache, com chave formada
+    pelo prefixo, pela versão do ledger e pelos argumentos posicionais.
+
+    A função original continua disponível em `.sem_cache`, para quem precisa
+    ler o banco dentro de uma transação (ex.: verificação de saldo).
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def com_cache(*args):
+            chave = ':'.join(['gerente', prefixo, str(versao_ledger()), *(_parte_da_chave(arg) for arg in args)])
+            valor = cache.get(chave, _AUSENTE)
+            if valor is _AUSENTE:
+                _contar(CHAVE_FALHAS)
+                valor = funcao(*args)
+                cache.set(chave, valor, timeout)
+            else:
+                _contar(CHAVE_ACERTOS)
+            return valor
+
+        com_cache.sem_cache = funcao
+        return com_cache
+    return decorador
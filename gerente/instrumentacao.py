@@ -0,0 +1,131 @@
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger('gerente.instrumentacao')
+
+# Quantas consultas mais lentas de cada requisição vão para o log
+CONSULTAS_LENTAS = 3
+
+
+class Medicao:
+    """Consultas, tempo de banco e de template de uma requisição."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.lentas = []  # heap (duração, sql) com as CONSULTAS_LENTAS mais demoradas
+        self.view = None
+        self.orcamento = None
+
+    def registrar_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tempo_db += duracao
+            item = (duracao, sql[:300])
+            if len(self.lentas) < CONSULTAS_LENTAS:
+                heapq.heappush(self.lentas, item)
+            else:
+                heapq.heappushpop(self.lentas, item)
+
+    def estourou_orcamento(self, request):
+        # O orçamento vale para leituras; escritas disparam signals e variam com o conteúdo
+        return request.method in ('GET', 'HEAD') and self.orcamento is not None and self.consultas > self.orcamento
+
+    def server_timing(self, tempo_total):
+        return (
+            f'db;dur={self.tempo_db * 1000:.1f};desc="{self.consultas} consultas", '
+            f'tpl;dur={self.tempo_template * 1000:.1f}, '
+            f'total;dur={tempo_total * 1000:.1f}'
+        )
+
+    def como_dict(self, request, response, tempo_total):
+        return {
+            'metodo': request.method,
+            'caminho': request.path,
+            'view': self.view,
+            'status': response.status_code,
+            'consultas': self.consultas,
+            'orcamento_consultas': self.orcamento,
+            'db_ms': round(self.tempo_db * 1000, 1),
+            'template_ms': round(self.tempo_template * 1000, 1),
+            'total_ms': round(tempo_total * 1000, 1),
+            'consultas_lentas': [
+                {'ms': round(duracao * 1000, 1), 'sql': sql}
+                for duracao, sql in sorted(self.lentas, reverse=True)
+            ],
+        }
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição: número de consultas SQL, tempo total no banco, as
+    consultas mais lentas e o tempo de renderização do template.
+
+    Os números saem no cabeçalho Server-Timing (visível no DevTools do
+    navegador) e numa linha JSON no logger 'gerente.instrumentacao': INFO para
+    toda requisição e WARNING quando um GET passa do orçamento de consultas da
+    view (atributo `orcamento_consultas`). A medição fica em
+    `request.medicao`, que os testes usam para cobrar os orçamentos.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicao = request.medicao = Medicao()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(medicao.registrar_consulta))
+            response = self.get_response(request)
+        tempo_total = time.perf_counter() - inicio
+
+        response['Server-Timing'] = medicao.server_timing(tempo_total)
+        nivel = logging.WARNING if medicao.estourou_orcamento(request) else logging.INFO
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, json.dumps(medicao.como_dict(request, response, tempo_total), ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        classe = getattr(view_func, 'view_class', None)
+        request.medicao.view = f'{view_func.__module__}.{(classe or view_func).__name__}'
+        request.medicao.orcamento = getattr(classe, 'orcamento_consultas', None)
+
+    def process_template_response(self, request, response):
+        inicio = time.perf_counter()
+
+        def fim_da_renderizacao(response):
+            request.medicao.tempo_template = time.perf_counter() - inicio
+
+        response.add_post_render_callback(fim_da_renderizacao)
+        return response
+
+
+class OrcamentoConsultasTestMixin:
+    """
+    Para TestCases: `assertDentroDoOrcamento(url)` faz um GET com o cache
+    vazio (o pior caso) e falha se a view fizer mais consultas do que o seu
+    `orcamento_consultas`.
+    """
+
+    def assertDentroDoOrcamento(self, url, **extra):
+        cache.clear()
+        resposta = self.client.get(url, **extra)
+        medicao = resposta.wsgi_request.medicao
+        self.assertIsNotNone(medicao.orcamento, f"{medicao.view} não declara orcamento_consultas.")
+        self.assertLessEqual(
+            medicao.consultas, medicao.orcamento,
+            f"{url} ({medicao.view}) fez {medicao.consultas} consultas; orçamento: {medicao.orcamento}.",
+        )
+        return resposta
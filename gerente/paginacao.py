@@ -0,0 +1,131 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class PaginaCursor:
+    """Página de uma paginação por cursor. Expõe a mesma interface básica do `Page` do Django."""
+
+    def __init__(self, object_list, url_proxima=None, url_anterior=None):
+        self.object_list = object_list
+        self.url_proxima = url_proxima
+        self.url_anterior = url_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.url_proxima is not None
+
+    def has_previous(self):
+        return self.url_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def inverter_ordenacao(ordenacao):
+    """('-data', '-id') -> ('data', 'id'): a mesma ordem, de trás para a frente."""
+    return tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordenacao)
+
+
+def filtro_apos(ordenacao, valores):
+    """
+    Q das linhas que vêm depois de `valores` na `ordenacao` (campos com '-'
+    para ordem decrescente). Com ('-data', '-id'):
+    data < x OR (data = x AND id < y).
+    """
+    filtro = Q()
+    campos = [campo.lstrip('-') for campo in ordenacao]
+    for i, campo in enumerate(ordenacao):
+        iguais = {c: valores[j] for j, c in enumerate(campos[:i])}
+        comparacao = 'lt' if campo.startswith('-') else 'gt'
+        filtro |= Q(**iguais, **{f'{campos[i]}__{comparacao}': valores[i]})
+    return filtro
+
+
+def paginar_keyset(queryset, ordenacao, tamanho, apos=None, antes=None):
+    """
+    Uma página de `queryset` na `ordenacao` (cujo último campo tem que ser
+    único), depois do cursor `apos` ou antes do cursor `antes`.
+    Retorna (linhas, tem_proxima, tem_anterior).
+    """
+    if antes is not None:
+        # Voltando: busca na ordem inversa a partir do cursor e inverte.
+        inversa = inverter_ordenacao(ordenacao)
+        linhas = list(queryset.filter(filtro_apos(inversa, antes)).order_by(*inversa)[:tamanho + 1])
+        tem_anterior = len(linhas) > tamanho
+        return linhas[:tamanho][::-1], True, tem_anterior
+
+    if apos is not None:
+        queryset = queryset.filter(filtro_apos(ordenacao, apos))
+    linhas = list(queryset.order_by(*ordenacao)[:tamanho + 1])
+    return linhas[:tamanho], len(linhas) > tamanho, apos is not None
+
+
+def codificar_cursor(objeto, ordenacao):
+    valores = [str(getattr(objeto, campo.lstrip('-'))) for campo in ordenacao]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+def decodificar_cursor(bruto, modelo, ordenacao):
+    """Valores do cursor convertidos pelos campos do modelo; ValueError se o cursor for inválido."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(bruto.encode()))
+        campos = [modelo._meta.get_field(campo.lstrip('-')) for campo in ordenacao]
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            raise ValueError
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, ValidationError) as erro:
+        raise ValueError("Cursor de paginação inválido.") from erro
+
+
+class KeysetPaginationMixin:
+    """
+    Paginação por cursor (keyset) para ListViews.
+
+    Em vez de OFFSET, cada página filtra a partir da última linha da página
+    anterior usando os campos de `cursor_fields` (em ordem decrescente). O custo
+    de cada página não depende do tamanho da tabela e inserções novas não
+    deslocam as páginas seguintes. Os links ficam em `page_obj.url_proxima` e
+    `page_obj.url_anterior`.
+    """
+    paginate_by = 50
+    cursor_fields = ('data', 'id')
+
+    def get_ordering(self):
+        return [f'-{campo}' for campo in self.cursor_fields]
+
+    def paginate_queryset(self, queryset, page_size):
+        linhas, tem_proxima, tem_anterior = paginar_keyset(
+            queryset, self.get_ordering(), page_size,
+            apos=self._ler_cursor('apos'), antes=self._ler_cursor('antes'),
+        )
+        pagina = PaginaCursor(
+            linhas,
+            url_proxima=self._url_cursor('apos', linhas[-1]) if tem_proxima and linhas else None,
+            url_anterior=self._url_cursor('antes', linhas[0]) if tem_anterior and linhas else None,
+        )
+        return None, pagina, linhas, pagina.has_other_pages()
+
+    def _ler_cursor(self, parametro):
+        bruto = self.request.GET.get(parametro)
+        if not bruto:
+            return None
+        try:
+            return decodificar_cursor(bruto, self.model, self.cursor_fields)
+        except ValueError:
+            raise Http404("Cursor de paginação inválido.")
+
+    def _url_cursor(self, parametro, objeto):
+        query = self.request.GET.copy()
+        query.pop('apos', None)
+        query.pop('antes', None)
+        query[parametro] = codificar_cursor(objeto, self.cursor_fields)
+        return f'?{query.urlencode()}'
@@ -12,8 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,27 +33,22 @@ DATABASES = {
     }
 }
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.getenv('SECRET_KEY')
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: don't run with debug turned on in production!
+# SECRET_KEY, DEBUG e ALLOWED_HOSTS vêm do .env. Sem DEBUG=True explícito o
+# projeto roda em modo de produção e exige uma SECRET_KEY própria.
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
-
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-i2exma66lors@_y7n1+x*av+rz^b3__k0_a6m#)4lyoma38($&'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured("Defina SECRET_KEY no .env (ou DEBUG=True para desenvolvimento).")
+    SECRET_KEY = 'django-insecure-i2exma66lors@_y7n1+x*av+rz^b3__k0_a6m#)4lyoma38($&'
 
-ALLOWED_HOSTS = ['192.168.100.80', 'localhost', '127.0.0.1']
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 
 # Application definition
@@ -65,13 +60,28 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
+    'django_filters',
     'home',
     'relatorios',
-    
+    'api',
 ]
 
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'COERCE_DECIMAL_TO_STRING': True,
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Consultas, tempo de banco e de template por requisição (Server-Timing + log JSON)
+    'gerente.instrumentacao.InstrumentacaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,6 +90,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if not DEBUG:
+    # Arquivos estáticos servidos pelo próprio processo (gunicorn), comprimidos e com
+    # cache longo. Em DEBUG o runserver serve direto das pastas static dos apps.
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'gerente.urls'
 
 TEMPLATES = [
@@ -103,13 +118,53 @@ WSGI_APPLICATION = 'gerente.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Com DB_NAME definido (Docker/produção) vale o PostgreSQL configurado no início
+# do arquivo; sem ele, o SQLite local de desenvolvimento.
+if not os.getenv('DB_NAME'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Transações começam com BEGIN IMMEDIATE: escritas concorrentes esperam
+                # a vez (timeout) em vez de falharem com "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Banco de testes em arquivo (e não em memória) para que os testes de
+            # concorrência possam abrir várias conexões de verdade.
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
     }
-}
 
+# Reaproveita a conexão entre requisições do mesmo worker em vez de abrir uma
+# por requisição; o health check descarta conexões que caíram.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('CONN_MAX_AGE', '60'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+
+# Cache
+# Em produção, REDIS_URL aponta para um Redis compartilhado entre os workers;
+# sem ele, cada processo usa o cache em memória local (ver gerente/cache.py).
+# Com mais de um worker do gunicorn o Redis é obrigatório: a versão do ledger
+# precisa ser a mesma em todos os processos para a invalidação funcionar.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gerente',
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -146,7 +201,41 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
-STATIC_ROOT = 'static\css\style.css'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # Fora do DEBUG, nomes com hash do conteúdo (cache "para sempre") e versões gzip/brotli
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Logging
+# 'gerente.instrumentacao' registra uma linha JSON por requisição (INFO) e
+# avisa quando uma view passa do seu orçamento de consultas (WARNING).
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'gerente.instrumentacao': {
+            'handlers': ['console'],
+            'level': os.getenv('INSTRUMENTACAO_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
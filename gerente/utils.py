@@ -9,12 +9,20 @@ def get_periodo_contabil_atual(dia_de_corte=11):
     Retorna uma tupla (data_inicio, data_fim).
     """
     hoje = timezone.localtime(timezone.now()).date()
+    return get_periodo_contabil(hoje, dia_de_corte)
 
-    if hoje.day >= dia_de_corte:
-        ano_inicio = hoje.year
-        mes_inicio = hoje.month
+def get_periodo_contabil(referencia, dia_de_corte=11):
+    """
+    Calcula as datas de início e fim do período contábil que contém
+    a data de referência.
+
+    Retorna uma tupla (data_inicio, data_fim).
+    """
+    if referencia.day >= dia_de_corte:
+        ano_inicio = referencia.year
+        mes_inicio = referencia.month
     else:
-        data_mes_anterior = hoje.replace(day=1) - timedelta(days=1)
+        data_mes_anterior = referencia.replace(day=1) - timedelta(days=1)
         ano_inicio = data_mes_anterior.year
         mes_inicio = data_mes_anterior.month
 
@@ -34,17 +42,22 @@ def get_periodo_contabil_atual(dia_de_corte=11):
 
 
 
-from django.db.models import Sum
-from home.models import Lancamento
+from django.db.models import Sum, Q, Subquery, Case, When, Value, IntegerField
+from functools import reduce
+from operator import or_
+from home.models import Lancamento, SaldoDiario
+from gerente.cache import cache_versionado
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
 
+@cache_versionado('total_entradas')
 def calcular_total_entradas(inicio: date, fim: date) -> Decimal:
     """Total de entradas no período: Útil para KPIs de receita em cantina (ex: vendas diárias)."""
     return Lancamento.objects.filter(
         tipo='entrada', data__gte=inicio, data__lte=fim
     ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
 
+@cache_versionado('total_saidas')
 def calcular_total_saidas(inicio: date, fim: date) -> Decimal:
     """Total de saídas no período (excluindo cartões): Reflete despesas reais de caixa."""
     return Lancamento.objects.filter(
@@ -55,13 +68,66 @@ def calcular_saldo_periodo(inicio: date, fim: date) -> Decimal:
     """Saldo líquido do período: Entradas - Saídas. Para análises isoladas mensais."""
     return calcular_total_entradas(inicio, fim) - calcular_total_saidas(inicio, fim)
 
+@cache_versionado('saldo_acumulado')
 def calcular_saldo_acumulado(ate_data: date) -> Decimal:
-    """Saldo histórico até a data: Garante continuidade de caixa entre meses."""
-    entradas = Lancamento.objects.filter(tipo='entrada', data__lte=ate_data).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-    saidas = Lancamento.objects.filter(tipo='saida', data__lte=ate_data).exclude(metodo_pagamento='cartao_credito').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-    return entradas - saidas
+    """Saldo histórico até a data: Garante continuidade de caixa entre meses.
+    Lido do snapshot SaldoDiario em vez de somar todo o histórico."""
+    return SaldoDiario.saldo_ate(ate_data)
 
 def calcular_saldo_total_com_inicial(inicio: date, fim: date) -> Decimal:
     """Saldo total: Inicial + Período. Ideal para dashboard de home.html."""
-    dia_anterior = inicio - relativedelta(days=1)
-    return calcular_saldo_acumulado(dia_anterior) + calcular_saldo_periodo(inicio, fim)
+    return resumo_periodo(inicio, fim)['saldo_final']
+
+@cache_versionado('resumo_periodo')
+def resumo_periodo(inicio: date, fim: date) -> dict:
+    """
+    Resumo de caixa do período em uma única consulta: entradas, saídas,
+    saldo inicial (fim do dia anterior ao início) e saldo final.
+
+    Agrega os snapshots de SaldoDiario do período junto com o último snapshot
+    anterior a `inicio`, usando Sum(..., filter=Q(...)) para separar cada total.
+    """
+    ultimo_dia_anterior = SaldoDiario.objects.filter(data__lt=inicio).order_by('-data').values('data')[:1]
+    totais = SaldoDiario.objects.filter(
+        Q(data__gte=inicio, data__lte=fim) | Q(data=Subquery(ultimo_dia_anterior))
+    ).aggregate(
+        entradas=Sum('entradas', filter=Q(data__gte=inicio)),
+        saidas=Sum('saidas', filter=Q(data__gte=inicio)),
+        saldo_inicial=Sum('saldo_acumulado', filter=Q(data__lt=inicio)),
+    )
+    entradas, saidas, saldo_inicial = (
+        (totais[chave] or Decimal('0.00')).quantize(Decimal('0.01'))
+        for chave in ('entradas', 'saidas', 'saldo_inicial')
+    )
+    return {
+        'entradas': entradas,
+        'saidas': saidas,
+        'saldo_inicial': saldo_inicial,
+        'saldo_final': saldo_inicial + entradas - saidas,
+    }
+
+@cache_versionado('resumo_por_metodo')
+def calcular_resumo_por_metodo() -> list:
+    """Entradas e saídas de todo o histórico agrupadas por método de pagamento."""
+    return list(Lancamento.objects.values('metodo_pagamento').annotate(
+        total_entradas=Sum('valor', filter=Q(tipo='entrada')),
+        total_saidas=Sum('valor', filter=Q(tipo='saida'))
+    ).order_by('metodo_pagamento'))
+
+def totais_por_subarvore(lancamentos, categorias, incluir_raiz=True):
+    """
+    Soma `valor` dos lançamentos de cada subárvore de categorias, em qualquer
+    profundidade, com uma única consulta (filtro por prefixo do caminho).
+    As subárvores devem ser disjuntas. Retorna {categoria.pk: total}.
+    """
+    categorias = list(categorias)
+    if not categorias:
+        return {}
+    filtros = {categoria.pk: categoria.filtro_subarvore(incluir_raiz=incluir_raiz) for categoria in categorias}
+    totais = lancamentos.filter(reduce(or_, filtros.values())).annotate(
+        raiz=Case(
+            *(When(filtro, then=Value(pk)) for pk, filtro in filtros.items()),
+            output_field=IntegerField(),
+        )
+    ).values('raiz').annotate(total=Sum('valor')).order_by()
+    return {linha['raiz']: linha['total'] for linha in totais}
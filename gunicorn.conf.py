@@ -0,0 +1,39 @@
+"""
+Configuração do gunicorn para produção (ver Dockerfile e docker-compose.yaml).
+
+Tudo pode ser ajustado por variável de ambiente, sem rebuild da imagem:
+
+- WEB_CONCURRENCY: número de processos (padrão: 2 x CPUs + 1);
+- GUNICORN_THREADS: threads por processo (padrão: 4). As views passam boa
+  parte do tempo esperando o banco, então threads aumentam a vazão sem o custo
+  de memória de mais processos;
+- GUNICORN_WORKER_CLASS: 'gthread' (padrão, WSGI). Para servir via ASGI
+  (gerente/asgi.py) use 'uvicorn_worker.UvicornWorker', com o pacote
+  uvicorn-worker instalado, e troque o módulo para gerente.asgi:application;
+- GUNICORN_TIMEOUT: segundos até um worker travado ser reiniciado (padrão: 30).
+
+Os números de requisições/s por quantidade de workers estão em DEPLOY.md.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla cada worker depois de N requisições (com jitter para não reiniciarem
+# todos juntos), contendo vazamentos de memória de longo prazo.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+# Carrega o Django uma vez no master e faz fork: workers sobem mais rápido e
+# compartilham memória. As conexões com o banco são abertas só nos workers.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
@@ -1,14 +1,24 @@
+from django import forms
 from django.contrib import admin
-from .models import Categoria, Lancamento, Fornecedor, Cofrinho, CartaoCredito # Adicione Categoria se não estiver
+from .models import Categoria, Lancamento, Fornecedor, Cofrinho, CartaoCredito, CompraParcelada, Fatura, Recorrencia # Adicione Categoria se não estiver
+from .forms import VerificaDuplicidadeMixin
+from .services import excluir_compra_parcelada
 
 # Register your models here.
 admin.site.register(Cofrinho)
 
+@admin.register(Fornecedor)
+class FornecedorAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'cnpj', 'contato')
+    search_fields = ('nome', 'cnpj')
+    ordering = ('nome',)
+
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nome', 'categoria_pai', 'descricao') # colunas q vao ser mostradas
     list_filter = ('categoria_pai',)
     search_fields = ('nome', 'categoria_pai__nome')
+    autocomplete_fields = ('categoria_pai',)
 
     fieldsets = (
         (None, {
@@ -18,3 +28,71 @@ class CategoriaAdmin(admin.ModelAdmin):
             'fields': ('categoria_pai',)
         }),
     )
+
+    def get_queryset(self, request):
+        # Lista e autocompletar mostram str(categoria), que inclui a categoria pai
+        return super().get_queryset(request).select_related('categoria_pai')
+
+
+class LancamentoAdminForm(VerificaDuplicidadeMixin, forms.ModelForm):
+    ignorar_duplicidade = forms.BooleanField(label="Registrar mesmo assim (não é duplicado)", required=False)
+
+    class Meta:
+        model = Lancamento
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self.verificar_duplicidade(cleaned_data)
+        return cleaned_data
+
+@admin.register(Lancamento)
+class LancamentoAdmin(admin.ModelAdmin):
+    form = LancamentoAdminForm
+    list_display = ('data', 'descricao', 'tipo', 'valor', 'metodo_pagamento', 'fornecedor', 'categoria')
+    list_filter = ('tipo', 'metodo_pagamento')
+    search_fields = ('descricao',)
+    # Categoria.__str__ mostra a categoria pai
+    list_select_related = ('fornecedor', 'categoria__categoria_pai')
+    autocomplete_fields = ('categoria', 'fornecedor')
+    date_hierarchy = 'data'
+
+@admin.register(Recorrencia)
+class RecorrenciaAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'tipo', 'valor', 'frequencia', 'intervalo', 'proxima_data', 'data_fim', 'ativa')
+    list_filter = ('ativa', 'tipo', 'frequencia')
+    search_fields = ('descricao',)
+    autocomplete_fields = ('categoria', 'fornecedor')
+    readonly_fields = ('proxima_data',)
+
+@admin.register(Fatura)
+class FaturaAdmin(admin.ModelAdmin):
+    list_display = ('cartao', 'fechamento', 'vencimento', 'total', 'em_aberto', 'data_pagamento')
+    list_filter = ('cartao',)
+    list_select_related = ('cartao',)
+    date_hierarchy = 'fechamento'
+    # Totais mantidos pelos lançamentos; o pagamento é feito na tela do cartão
+    readonly_fields = ('cartao', 'abertura', 'fechamento', 'vencimento', 'total', 'em_aberto', 'data_pagamento')
+
+@admin.register(CompraParcelada)
+class CompraParceladaAdmin(admin.ModelAdmin):
+    list_display = ('data', 'descricao', 'valor_total', 'numero_parcelas', 'cartao_credito')
+    list_filter = ('cartao_credito',)
+    list_select_related = ('cartao_credito',)
+    search_fields = ('descricao',)
+
+    def has_add_permission(self, request):
+        # As parcelas e a reserva do limite são criadas pelo formulário de lançamento
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Só leitura: cada parcela é um lançamento com cópia dos dados da compra
+        # (descrição, categoria, fornecedor, observações), editada na lista de lançamentos
+        return False
+
+    def delete_model(self, request, obj):
+        excluir_compra_parcelada(obj)
+
+    def delete_queryset(self, request, queryset):
+        for compra in queryset:
+            excluir_compra_parcelada(compra)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 
 
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(recriar_indice_busca, sender=self)
+
+
+def recriar_indice_busca(using, **kwargs):
+    # Migrations que reconstroem a tabela de lançamentos no SQLite levam os
+    # triggers da busca junto; aqui eles voltam (e o índice é reindexado).
+    from .busca import reparar_indice_busca
+    reparar_indice_busca(connections[using])
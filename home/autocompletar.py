@@ -0,0 +1,81 @@
+"""
+Sugestões para os campos fornecedor e categoria do LancamentoForm.
+
+Os widgets (AutocompletarSelect) não renderizam a lista inteira: buscam as
+opções em JSON conforme o usuário digita. A busca é por prefixo do nome
+normalizado (`nome_busca`, indexado) e cada processo guarda as respostas
+recentes num LRU pequeno, com a versão do ledger na chave: qualquer escrita
+(gerente/cache.py) torna as entradas antigas inalcançáveis.
+"""
+from functools import lru_cache
+
+from django import forms
+from django.db import connection
+from django.db.models import Q
+
+from gerente.cache import versao_ledger
+
+from .models import Categoria, Fornecedor, normalizar_descricao
+
+LIMITE_SUGESTOES = 20
+
+MODELOS = {
+    'fornecedores': Fornecedor.objects.all(),
+    'categorias': Categoria.objects.select_related('categoria_pai'),
+}
+
+
+def filtro_prefixo(prefixo):
+    if not prefixo:
+        return Q()
+    if connection.vendor == 'postgresql':
+        # Atendido pelo índice com varchar_pattern_ops
+        return Q(nome_busca__startswith=prefixo)
+    # O LIKE do SQLite não usa índice; o intervalo [prefixo, prefixo + '{') usa.
+    # nome_busca só tem [a-z0-9 ] e '{' vem logo depois de 'z'.
+    return Q(nome_busca__gte=prefixo, nome_busca__lt=prefixo + '{')
+
+
+@lru_cache(maxsize=256)
+def _sugestoes(tipo, prefixo, versao):
+    registros = MODELOS[tipo].filter(filtro_prefixo(prefixo)).order_by('nome_busca', 'pk')[:LIMITE_SUGESTOES]
+    return tuple((registro.pk, str(registro)) for registro in registros)
+
+
+def sugestoes(tipo, termo):
+    """Até LIMITE_SUGESTOES pares (pk, texto) de `tipo` ('fornecedores' ou 'categorias') cujo nome começa com `termo`."""
+    return _sugestoes(tipo, normalizar_descricao(termo), versao_ledger())
+
+
+class AutocompletarSelect(forms.Select):
+    """
+    Select que renderiza só a opção vazia e a selecionada; o restante vem de
+    `url` (ver static/gerente/js/autocompletar.js).
+    """
+
+    class Media:
+        js = ['gerente/js/autocompletar.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        selecionados = [v for v in value if v not in ('', None)]
+        escolhas = [('', self.choices.field.empty_label or '---------')]
+        if selecionados:
+            escolhas += [
+                (self.choices.field.prepare_value(objeto), self.choices.field.label_from_instance(objeto))
+                for objeto in self.choices.queryset.filter(pk__in=selecionados)
+            ]
+        original, self.choices = self.choices, escolhas
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = original
+
@@ -0,0 +1,234 @@
+"""
+Benchmarks executados por `manage.py benchmark <suite>`.
+
+Cada suite recebe os parâmetros da linha de comando, roda contra o banco
+de testes (criado e destruído pelo comando) e devolve um dict com as
+medições, que o comando emite como JSON.
+"""
+import random
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Max, Sum
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .dados_sinteticos import gerar_dados_sinteticos
+from .models import CartaoCredito, Categoria, Cofrinho, Lancamento
+
+
+def executar_em_threads(alvo, threads):
+    """
+    Roda `alvo()` em `threads` threads ao mesmo tempo (liberadas juntas por uma
+    barreira), cada uma com sua própria conexão. Retorna a duração em segundos
+    e propaga o primeiro erro encontrado.
+    """
+    barreira = threading.Barrier(threads)
+    erros = []
+
+    def trabalhador():
+        try:
+            barreira.wait()
+            alvo()
+        except Exception as e:
+            erros.append(e)
+        finally:
+            connection.close()
+
+    trabalhadores = [threading.Thread(target=trabalhador) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for trabalhador_ in trabalhadores:
+        trabalhador_.start()
+    for trabalhador_ in trabalhadores:
+        trabalhador_.join()
+    duracao = time.perf_counter() - inicio
+
+    if erros:
+        raise erros[0]
+    return duracao
+
+
+def benchmark_transferencias(threads=8, operacoes=50, valor=Decimal('10.00'), **opcoes):
+    """
+    Transferências simultâneas para o mesmo cofrinho, com caixa suficiente para
+    só metade delas. Mede transferências por segundo sob contenção e confere que
+    nenhuma atualização foi perdida.
+    """
+    from .services import transferir_para_cofrinho
+
+    total = threads * operacoes
+    Lancamento.objects.create(
+        descricao='Aporte inicial (benchmark)', tipo='entrada', valor=valor * total / 2,
+        data=timezone.localdate(), metodo_pagamento='dinheiro',
+    )
+    cofrinho = Cofrinho.objects.create(nome='Benchmark')
+    aprovadas = []
+    recusadas = []
+
+    def transferir():
+        for _ in range(operacoes):
+            try:
+                transferir_para_cofrinho(cofrinho, valor)
+                aprovadas.append(1)
+            except ValidationError:
+                recusadas.append(1)
+
+    duracao = executar_em_threads(transferir, threads)
+    cofrinho.refresh_from_db()
+
+    return {
+        'threads': threads,
+        'tentativas': total,
+        'aprovadas': len(aprovadas),
+        'recusadas': len(recusadas),
+        'duracao_s': round(duracao, 4),
+        'transferencias_por_s': round(total / duracao, 1),
+        'saldo_cofrinho': str(cofrinho.saldo),
+        'saldo_esperado': str(valor * len(aprovadas)),
+        'consistente': cofrinho.saldo == valor * len(aprovadas),
+    }
+
+
+def benchmark_categorias(tamanho=3000, lancamentos=50000, **opcoes):
+    """
+    Árvore com `tamanho` categorias aninhadas e `lancamentos` lançamentos.
+    Compara o total por subárvore via caminho materializado (uma consulta)
+    com a descida recursiva nível a nível, e mede o custo de mover uma
+    subárvore grande.
+    """
+    from gerente.utils import totais_por_subarvore
+
+    rng = random.Random(42)
+    inicio = time.perf_counter()
+    categorias = []
+    for i in range(tamanho):
+        # Uma raiz a cada 300 categorias; as demais penduradas em qualquer anterior.
+        pai = rng.choice(categorias) if categorias and i % 300 else None
+        categoria = Categoria(nome=f'Categoria {i}', categoria_pai=pai)
+        categoria.save()
+        categorias.append(categoria)
+    duracao_criacao = time.perf_counter() - inicio
+
+    hoje = timezone.localdate()
+    Lancamento.objects.bulk_create([
+        Lancamento(
+            descricao=f'Lançamento {i}', tipo='saida', valor=Decimal(rng.randint(100, 10000)) / 100,
+            data=hoje, categoria=rng.choice(categorias), metodo_pagamento='pix',
+        )
+        for i in range(lancamentos)
+    ], batch_size=2000)
+
+    raizes = list(Categoria.objects.filter(categoria_pai__isnull=True))
+
+    inicio = time.perf_counter()
+    com_caminho = totais_por_subarvore(Lancamento.objects.all(), raizes)
+    duracao_caminho = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    recursivo = {}
+    for raiz in raizes:
+        ids, nivel = [raiz.pk], [raiz.pk]
+        while nivel:
+            nivel = list(Categoria.objects.filter(categoria_pai_id__in=nivel).values_list('pk', flat=True))
+            ids.extend(nivel)
+        recursivo[raiz.pk] = Lancamento.objects.filter(categoria_id__in=ids).aggregate(total=Sum('valor'))['total']
+    duracao_recursivo = time.perf_counter() - inicio
+
+    # Move a maior subárvore para dentro de outra raiz
+    maior = max(raizes, key=lambda raiz: Categoria.objects.filter(caminho__startswith=raiz.caminho).count())
+    destino = next(raiz for raiz in raizes if raiz.pk != maior.pk)
+    inicio = time.perf_counter()
+    maior.categoria_pai = destino
+    maior.save()
+    duracao_mover = time.perf_counter() - inicio
+
+    centavo = Decimal('0.01')
+    return {
+        'categorias': tamanho,
+        'lancamentos': lancamentos,
+        'profundidade_maxima': Categoria.objects.aggregate(maximo=Max('nivel'))['maximo'],
+        'raizes': len(raizes),
+        'criacao_s': round(duracao_criacao, 4),
+        'rollup_caminho_s': round(duracao_caminho, 4),
+        'rollup_recursivo_s': round(duracao_recursivo, 4),
+        'mover_subarvore_s': round(duracao_mover, 4),
+        'consistente': all(
+            (com_caminho.get(pk) or 0).quantize(centavo) == (total or 0).quantize(centavo)
+            for pk, total in recursivo.items()
+        ),
+    }
+
+
+def _tempos_ms(amostras):
+    amostras = sorted(amostras)
+    return {
+        'mediana': round(statistics.median(amostras) * 1000, 2),
+        'max': round(amostras[-1] * 1000, 2),
+    }
+
+
+def benchmark_views(tamanhos=(1000, 10000, 100000), repeticoes=5, **opcoes):
+    """
+    Tempo de resposta das principais views com o ledger sintético em cada um
+    dos `tamanhos` (o banco cresce de um tamanho para o seguinte). Cada view
+    é medida `repeticoes` vezes com o cache vazio (frio) e logo em seguida com
+    o cache preenchido (quente); o número de consultas vem do middleware de
+    instrumentação.
+    """
+    views = {
+        'HomeView': lambda: reverse('home'),
+        'LancamentoListView': lambda: reverse('lista_lancamentos'),
+        'CartaoCreditoDetailView': lambda: reverse(
+            'detalhes_cartao', kwargs={'pk': CartaoCredito.objects.order_by('pk').values_list('pk', flat=True).first()}
+        ),
+        'RelatorioDREView': lambda: reverse('relatorios:dre_detalhado'),
+        'RelatoriosDashboardView': lambda: reverse('relatorios:dashboard'),
+        'RelatorioProjecaoView': lambda: reverse('relatorios:projecao'),
+    }
+    cliente = Client()
+    resultados = {}
+    gerados = 0
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for tamanho in sorted(tamanhos):
+            inicio = time.perf_counter()
+            gerar_dados_sinteticos(tamanho - gerados, semente=tamanho)
+            duracao_geracao = time.perf_counter() - inicio
+            gerados = tamanho
+
+            medidas = {}
+            for nome, url in views.items():
+                url = url()
+                frio, quente = [], []
+                for _ in range(repeticoes):
+                    cache.clear()
+                    inicio = time.perf_counter()
+                    resposta = cliente.get(url)
+                    frio.append(time.perf_counter() - inicio)
+                    consultas = resposta.wsgi_request.medicao.consultas
+
+                    inicio = time.perf_counter()
+                    cliente.get(url)
+                    quente.append(time.perf_counter() - inicio)
+                medidas[nome] = {
+                    'status': resposta.status_code,
+                    'consultas': consultas,
+                    'bytes': len(resposta.content),
+                    'frio_ms': _tempos_ms(frio),
+                    'quente_ms': _tempos_ms(quente),
+                }
+            resultados[str(tamanho)] = {'geracao_s': round(duracao_geracao, 2), 'views': medidas}
+
+    return {'repeticoes': repeticoes, 'tamanhos': resultados}
+
+
+SUITES = {
+    'transferencias': benchmark_transferencias,
+    'categorias': benchmark_categorias,
+    'views': benchmark_views,
+}
@@ -0,0 +1,157 @@
+"""
+Busca textual em descricao/observacoes dos lançamentos.
+
+Cada banco usa o índice que tem:
+
+- PostgreSQL: índice GIN de trigramas (pg_trgm) sobre "descricao observacoes";
+  encontra trechos e erros de digitação, com relevância por word_similarity;
+- SQLite: tabela virtual FTS5 (conteúdo externo, mantida por triggers) com
+  prefixos e sem acentos, relevância por bm25;
+- outros: icontains, sem índice e sem relevância.
+
+O índice é criado pela migration 0022. No SQLite, uma migration posterior que
+reconstrua a tabela de lançamentos descarta os triggers junto com a tabela
+antiga; o post_migrate os recria (home/apps.py).
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABELA_FTS = 'home_lancamento_busca'
+
+# Mesma expressão do índice GIN: o PostgreSQL só usa o índice se a consulta repetir a expressão
+TEXTO_PG = "(home_lancamento.descricao || ' ' || COALESCE(home_lancamento.observacoes, ''))"
+
+SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        descricao, observacoes, content='home_lancamento', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON home_lancamento BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, descricao, observacoes) VALUES (new.id, new.descricao, new.observacoes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON home_lancamento BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF descricao, observacoes ON home_lancamento BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+        INSERT INTO {TABELA_FTS}(rowid, descricao, observacoes) VALUES (new.id, new.descricao, new.observacoes);
+    END""",
+]
+
+SQL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS lanc_busca_trgm_idx ON home_lancamento USING gin ({TEXTO_PG.replace('home_lancamento.', '')} gin_trgm_ops)",
+]
+
+
+def _triggers_sqlite(cursor):
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{TABELA_FTS}_a%'])
+    return cursor.fetchone()[0]
+
+
+def instalar_indice_busca(conexao=connection):
+    """Cria o índice de busca do banco, se ainda não existir. Idempotente."""
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'sqlite':
+            completo = _triggers_sqlite(cursor) == 3
+            for sql in SQL_SQLITE:
+                cursor.execute(sql)
+            if not completo:
+                # Tabela nova ou triggers perdidos: reindexa a partir dos lançamentos
+                cursor.execute(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+        elif conexao.vendor == 'postgresql':
+            for sql in SQL_POSTGRESQL:
+                cursor.execute(sql)
+
+
+def reparar_indice_busca(conexao=connection):
+    """No SQLite, recria os triggers (e reindexa) se a tabela FTS existe mas eles sumiram."""
+    if conexao.vendor != 'sqlite' or TABELA_FTS not in conexao.introspection.table_names():
+        return
+    with conexao.cursor() as cursor:
+        precisa = _triggers_sqlite(cursor) < 3
+    if precisa:
+        instalar_indice_busca(conexao)
+
+
+def remover_indice_busca(conexao=connection):
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {TABELA_FTS}_{sufixo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABELA_FTS}")
+        elif conexao.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS lanc_busca_trgm_idx")
+
+
+def _consulta_fts(termo):
+    # Cada palavra vira um prefixo entre aspas ("alug"*): nada do que o usuário
+    # digitar é interpretado como sintaxe do FTS5. Palavras são combinadas com AND.
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def filtrar(lancamentos, termo):
+    """Restringe o queryset `lancamentos` aos que contêm `termo` (usa o índice de busca)."""
+    termo = (termo or '').strip()
+    if connection.vendor == 'postgresql':
+        return lancamentos.filter(RawSQL(f"%s <%% {TEXTO_PG}", [termo], output_field=BooleanField()))
+    if connection.vendor == 'sqlite':
+        consulta = _consulta_fts(termo)
+        if not consulta:
+            return lancamentos.none()
+        return lancamentos.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [consulta])
+        )
+    return lancamentos.filter(Q(descricao__icontains=termo) | Q(observacoes__icontains=termo))
+
+
+def buscar_por_relevancia(lancamentos, termo, limite, deslocamento=0):
+    """
+    Uma página (`limite` a partir de `deslocamento`) dos lançamentos de
+    `lancamentos` que contêm `termo`, do mais para o menos relevante. Cada
+    lançamento vem com o atributo `relevancia` (maior é melhor).
+    """
+    termo = (termo or '').strip()
+
+    if connection.vendor == 'sqlite':
+        consulta = _consulta_fts(termo)
+        if not consulta:
+            return []
+        # O FTS5 calcula o bm25 (coluna `rank`, menor é melhor) dentro do próprio
+        # índice. Os filtros do queryset entram depois, sobre os resultados já
+        # calculados: um `rowid IN (...)` junto do MATCH faz o FTS5 recalcular o
+        # rank linha a linha (minutos com 200 mil lançamentos).
+        sql = (
+            f"WITH encontrados AS MATERIALIZED ("
+            f"SELECT rowid AS id, rank FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s"
+            f") SELECT id, -rank FROM encontrados"
+        )
+        params = [consulta]
+        if lancamentos.query.has_filters():
+            sql_ids, params_ids = lancamentos.order_by().values('id').query.sql_with_params()
+            sql += f" WHERE id IN ({sql_ids})"
+            params += list(params_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} ORDER BY rank LIMIT %s OFFSET %s", params + [limite, deslocamento])
+            relevancias = dict(cursor.fetchall())
+        encontrados = lancamentos.in_bulk(list(relevancias))
+        resultado = [encontrados[pk] for pk in relevancias if pk in encontrados]
+        for lancamento in resultado:
+            lancamento.relevancia = relevancias[lancamento.pk]
+        return resultado
+
+    if connection.vendor == 'postgresql':
+        ordenados = filtrar(lancamentos, termo).annotate(
+            relevancia=RawSQL(f"word_similarity(%s, {TEXTO_PG})", [termo], output_field=FloatField())
+        ).order_by('-relevancia', '-data', '-id')
+    else:
+        ordenados = filtrar(lancamentos, termo).annotate(
+            relevancia=Value(1.0, output_field=FloatField())
+        ).order_by('-data', '-id')
+    return list(ordenados[deslocamento:deslocamento + limite])
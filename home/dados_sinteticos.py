@@ -0,0 +1,156 @@
+"""
+Gerador de um ledger sintético e realista para testes de carga e benchmarks
+(`manage.py gerar_dados_sinteticos` e a suite `views` de `manage.py benchmark`).
+
+Cria a árvore de categorias do DRE, fornecedores, cartões e cofrinhos (ou
+reaproveita os que já existem) e insere os lançamentos em lotes com
+bulk_create. SaldoDiario, o rollup dos relatórios e o cache são atualizados
+de uma vez pelo signal `lancamentos_em_lote`, como numa importação.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_CEILING, Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CartaoCredito, Categoria, Cofrinho, Fatura, Fornecedor, Lancamento
+from .signals import lancamentos_em_lote
+
+ZERO = Decimal('0.00')
+
+# Categoria raiz do DRE -> (tipo, peso no volume de lançamentos, faixa de valor, subcategorias)
+CATEGORIAS = {
+    'RECEITAS': ('entrada', 55, (5, 800), ['Vendas balcão', 'Vendas online', 'Serviços prestados']),
+    'CUSTOS DE PRODUTOS/SERVIÇOS': ('saida', 20, (20, 3000), ['Mercadorias para revenda', 'Embalagens', 'Frete de compras']),
+    'DESPESAS OPERACIONAIS': ('saida', 12, (30, 2500), ['Aluguel', 'Energia elétrica', 'Água', 'Internet', 'Manutenção']),
+    'DESPESAS ADMINISTRATIVAS': ('saida', 8, (15, 4000), ['Salários', 'Contabilidade', 'Material de escritório']),
+    'DESPESAS FINANCEIRAS': ('saida', 4, (2, 300), ['Tarifas bancárias', 'Juros', 'Taxas de maquininha']),
+}
+# Fração das saídas que são transferências para cofrinhos
+FRACAO_TRANSFERENCIAS = 0.01
+
+METODOS = {
+    'entrada': (['pix', 'dinheiro', 'cartao_debito', 'caderno'], [50, 25, 20, 5]),
+    'saida': (['pix', 'dinheiro', 'cartao_credito', 'cartao_debito'], [40, 15, 35, 10]),
+}
+
+
+def _categorias():
+    """Subcategorias do DRE com (tipo, faixa de valor), criando as que faltam."""
+    folhas = []
+    pesos = []
+    for nome_raiz, (tipo, peso, faixa, subcategorias) in CATEGORIAS.items():
+        raiz, _ = Categoria.objects.get_or_create(nome=nome_raiz)
+        for nome in subcategorias:
+            categoria, _ = Categoria.objects.get_or_create(nome=nome, defaults={'categoria_pai': raiz})
+            folhas.append((categoria, tipo, faixa))
+            pesos.append(peso / len(subcategorias))
+    return folhas, pesos
+
+
+def _completar(modelo, quantidade, criar):
+    """Os `quantidade` primeiros registros do modelo, criando os que faltam com `criar(i)`."""
+    existentes = list(modelo.objects.order_by('pk')[:quantidade])
+    novos = [criar(i) for i in range(len(existentes), quantidade)]
+    for objeto in novos:
+        objeto.save()
+    return existentes + novos
+
+
+def gerar_dados_sinteticos(lancamentos, fornecedores=200, cartoes=3, cofrinhos=5, dias=730,
+                           semente=42, lote=5000, progresso=None):
+    """
+    Insere `lancamentos` lançamentos espalhados pelos últimos `dias` dias.
+
+    Compras no cartão de faturas já vencidas saem quitadas; as demais
+    consomem limite (e o limite total é aumentado se não couberem).
+    `progresso(inseridos)` é chamado a cada lote. Retorna um dict com as
+    quantidades geradas.
+    """
+    rng = random.Random(semente)
+    hoje = timezone.localdate()
+
+    folhas, pesos = _categorias()
+    lista_fornecedores = _completar(Fornecedor, fornecedores, lambda i: Fornecedor(nome=f"Fornecedor {i + 1:04d}"))
+    lista_cartoes = _completar(CartaoCredito, cartoes, lambda i: CartaoCredito(
+        nome=f"Cartão {i + 1}", limite_total=Decimal('20000.00'), limite_disponivel=Decimal('20000.00'),
+        dia_vencimento=rng.choice([5, 10, 15, 20, 25]), dia_fechamento=rng.choice([1, 3, 8, 13, 18]),
+    ))
+    lista_cofrinhos = _completar(Cofrinho, cofrinhos, lambda i: Cofrinho(
+        nome=f"Reserva {i + 1}", meta=Decimal(rng.randint(10, 200) * 100),
+    ))
+
+    movimentos = defaultdict(lambda: (ZERO, ZERO))
+    uso_por_cartao = defaultdict(lambda: ZERO)
+    aporte_por_cofrinho = defaultdict(lambda: ZERO)
+
+    def novo_lancamento(i):
+        data = hoje - timedelta(days=rng.randrange(dias))
+        categoria, tipo, (minimo, maximo) = rng.choices(folhas, pesos)[0]
+        valor = Decimal(rng.randint(minimo * 100, maximo * 100)) / 100
+        metodos, pesos_metodos = METODOS[tipo]
+        lancamento = Lancamento(
+            descricao=f"{categoria.nome} #{i}", tipo=tipo, valor=valor, data=data, categoria=categoria,
+            metodo_pagamento=rng.choices(metodos, pesos_metodos)[0],
+        )
+        if tipo == 'saida':
+            if rng.random() < FRACAO_TRANSFERENCIAS:
+                cofrinho = rng.choice(lista_cofrinhos)
+                lancamento.descricao = f"Transferência para cofrinho {cofrinho.nome}"
+                lancamento.categoria = None
+                lancamento.metodo_pagamento = 'pix'
+                lancamento.cofrinho_destino = cofrinho
+                aporte_por_cofrinho[cofrinho.pk] += valor
+            else:
+                lancamento.fornecedor = rng.choice(lista_fornecedores)
+            if lancamento.metodo_pagamento == 'cartao_credito':
+                lancamento.cartao_credito = rng.choice(lista_cartoes)
+                cartao = lancamento.cartao_credito
+                lancamento.quitado = cartao.vencimento_para(cartao.fechamento_para(data)) < hoje
+                if not lancamento.quitado:
+                    uso_por_cartao[lancamento.cartao_credito.pk] += valor
+        lancamento.atualizar_impressao_digital()
+
+        entradas, saidas = lancamento.movimento_de_caixa()
+        atual_entradas, atual_saidas = movimentos[data]
+        movimentos[data] = (atual_entradas + entradas, atual_saidas + saidas)
+        return lancamento
+
+    with transaction.atomic():
+        inseridos = 0
+        while inseridos < lancamentos:
+            tamanho = min(lote, lancamentos - inseridos)
+            novos = [novo_lancamento(inseridos + i) for i in range(tamanho)]
+            Fatura.atribuir_em_lote(novos)
+            Lancamento.objects.bulk_create(novos)
+            inseridos += tamanho
+            if progresso:
+                progresso(inseridos)
+
+        for cartao in lista_cartoes:
+            usado = uso_por_cartao[cartao.pk]
+            cartao.refresh_from_db(fields=['limite_disponivel'])
+            # Se as compras em aberto não cabem, aumenta o limite até o milhar de cima
+            falta = usado - cartao.limite_disponivel
+            aumento = (falta / 1000).to_integral_value(rounding=ROUND_CEILING) * 1000 if falta > 0 else ZERO
+            CartaoCredito.objects.filter(pk=cartao.pk).update(
+                limite_total=F('limite_total') + aumento,
+                limite_disponivel=F('limite_disponivel') + aumento - usado,
+            )
+        for cofrinho_id, aporte in aporte_por_cofrinho.items():
+            Cofrinho.objects.filter(pk=cofrinho_id).update(saldo=F('saldo') + aporte)
+
+        if movimentos:
+            lancamentos_em_lote.send(sender=Lancamento, movimentos=dict(movimentos))
+
+    return {
+        'lancamentos': lancamentos,
+        'categorias': len(folhas),
+        'fornecedores': len(lista_fornecedores),
+        'cartoes': len(lista_cartoes),
+        'cofrinhos': len(lista_cofrinhos),
+        'dias': dias,
+    }
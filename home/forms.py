@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django import forms
-from .models import Categoria, Lancamento, Fornecedor, Cofrinho, CartaoCredito
+from django.urls import reverse_lazy
+from .autocompletar import AutocompletarSelect
+from .models import Categoria, Lancamento, Fornecedor, Cofrinho, CartaoCredito, CompraParcelada, Recorrencia, calcular_impressao_digital
 
 class CategoriaForm(forms.ModelForm):
     class Meta:
@@ -10,7 +14,35 @@ class CategoriaForm(forms.ModelForm):
             'descricao': 'Descrição'
         }
 
-class LancamentoForm(forms.ModelForm):
+class VerificaDuplicidadeMixin:
+    """
+    Recusa lançamentos com a mesma data, tipo, valor, descrição e fornecedor de um já
+    existente (consulta indexada pela impressão digital), a menos que o campo
+    `ignorar_duplicidade` seja marcado.
+    """
+
+    def verificar_duplicidade(self, cleaned_data):
+        if cleaned_data.get('ignorar_duplicidade'):
+            return
+        campos = [cleaned_data.get(campo) for campo in ('data', 'tipo', 'valor', 'descricao')]
+        if any(campo is None for campo in campos):
+            return
+        fornecedor = cleaned_data.get('fornecedor')
+        impressao = calcular_impressao_digital(*campos, fornecedor.pk if fornecedor else None)
+        duplicado = Lancamento.objects.filter(impressao_digital=impressao).exclude(pk=self.instance.pk).first()
+        if duplicado:
+            self.add_error(None,
+                f"Já existe um lançamento igual: \"{duplicado.descricao}\" de R$ {duplicado.valor} "
+                f"em {duplicado.data:%d/%m/%Y}. Marque \"Registrar mesmo assim\" se não for duplicado."
+            )
+
+class LancamentoForm(VerificaDuplicidadeMixin, forms.ModelForm):
+    parcelas = forms.IntegerField(
+        label="Parcelas", min_value=1, max_value=CompraParcelada.MAXIMO_PARCELAS, initial=1, required=False,
+        help_text="Compras no cartão: o valor é dividido em parcelas, uma por fatura.",
+    )
+    ignorar_duplicidade = forms.BooleanField(label="Registrar mesmo assim (não é duplicado)", required=False)
+
     class Meta:
         model = Lancamento
         fields = ['descricao', 'tipo', 'valor', 'data', 'categoria', 'fornecedor', 
@@ -19,23 +51,33 @@ class LancamentoForm(forms.ModelForm):
             'data': forms.DateInput(attrs={'type': 'date'}),
             'valor': forms.NumberInput(attrs={'step': '0.01'}),
             'observacoes': forms.Textarea(attrs={'rows': 3}),
+            # Com milhares de fornecedores, as opções vêm sob demanda (home/autocompletar.py)
+            'categoria': AutocompletarSelect(reverse_lazy('autocompletar_categorias')),
+            'fornecedor': AutocompletarSelect(reverse_lazy('autocompletar_fornecedores')),
         }
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['cartao_credito'].queryset = CartaoCredito.objects.filter(ativo=True)
+        # Categoria.__str__ mostra a categoria pai: sem o JOIN seria uma consulta por opção
+        self.fields['categoria'].queryset = Categoria.objects.select_related('categoria_pai')
         # O campo cartão de crédito não é obrigatório por padrão.
         # Nossa lógica no `clean` e o JS no template vão controlar isso.
         self.fields['cartao_credito'].required = False
+        # Parcelar só na criação: na edição, cada parcela é um lançamento comum
+        if self.instance.pk:
+            del self.fields['parcelas']
         
         for field in self.fields:
             self.fields[field].widget.attrs.update({'class': 'form-control'})
+        self.fields['ignorar_duplicidade'].widget.attrs.update({'class': 'form-check-input'})
     
     def clean(self):
         """
         ÚNICA FONTE DE VALIDAÇÃO para a lógica do cartão de crédito.
         """
         cleaned_data = super().clean()
+        self.verificar_duplicidade(cleaned_data)
         tipo = cleaned_data.get('tipo')
         metodo_pagamento = cleaned_data.get('metodo_pagamento')
         cartao_credito = cleaned_data.get('cartao_credito')
@@ -58,9 +100,23 @@ class LancamentoForm(forms.ModelForm):
         
         # Se for uma ENTRADA, nenhuma dessas validações é acionada, permitindo
         # que o campo 'cartao_credito' fique vazio, como esperado.
+
+        if (cleaned_data.get('parcelas') or 1) > 1 and not (tipo == 'saida' and metodo_pagamento == 'cartao_credito'):
+            self.add_error('parcelas', "Só compras no cartão de crédito podem ser parceladas.")
         
         return cleaned_data
 
+    def compra_parcelada(self):
+        """A CompraParcelada (não salva) do formulário, ou None se o lançamento não for parcelado."""
+        if (self.cleaned_data.get('parcelas') or 1) <= 1:
+            return None
+        dados = self.cleaned_data
+        return CompraParcelada(
+            descricao=dados['descricao'], valor_total=dados['valor'], numero_parcelas=dados['parcelas'],
+            data=dados['data'], cartao_credito=dados['cartao_credito'], categoria=dados.get('categoria'),
+            fornecedor=dados.get('fornecedor'), observacoes=dados.get('observacoes'),
+        )
+
 class FornecedorForm(forms.ModelForm):
     class Meta:
         model = Fornecedor
@@ -81,11 +137,78 @@ class TransferirParaCofrinhoForm(forms.Form):
             raise forms.ValidationError("O valor deve ser maior que zero!")
         return valor
 
+class ImportarExtratoForm(forms.Form):
+    FORMATO_CHOICES = [('', 'Detectar pela extensão'), ('csv', 'CSV'), ('ofx', 'OFX')]
+
+    arquivo = forms.FileField(label="Arquivo do Extrato")
+    formato = forms.ChoiceField(choices=FORMATO_CHOICES, label="Formato", required=False)
+    metodo_pagamento = forms.ChoiceField(
+        choices=[('', '---------')] + Lancamento.PAGAMENTO_CHOICES, label="Método de Pagamento Padrão", required=False
+    )
+    cartao_credito = forms.ModelChoiceField(
+        queryset=CartaoCredito.objects.filter(ativo=True), label="Fatura do Cartão", required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        arquivo = cleaned_data.get('arquivo')
+        if arquivo and not cleaned_data.get('formato'):
+            extensao = arquivo.name.rsplit('.', 1)[-1].lower()
+            if extensao not in ('csv', 'ofx'):
+                raise forms.ValidationError("Não foi possível detectar o formato. Escolha CSV ou OFX.")
+            cleaned_data['formato'] = extensao
+        return cleaned_data
+
 class RelatorioPeriodoForm(forms.Form):
     data_inicio = forms.DateField(label="Data de Início", widget=forms.DateInput(attrs={"type": "date"}), required=False)
     data_fim = forms.DateField(label="Data de Fim", widget=forms.DateInput(attrs={"type": "date"}), required=False)
     metodo_pagamento = forms.ChoiceField(choices=Lancamento.PAGAMENTO_CHOICES, label="Método de Pagamento", required=False)
 
+    def filtrar(self, lancamentos):
+        """Aplica os filtros preenchidos (form já validado) ao queryset de lançamentos."""
+        data_inicio = self.cleaned_data.get('data_inicio')
+        data_fim = self.cleaned_data.get('data_fim')
+        metodo_pagamento = self.cleaned_data.get('metodo_pagamento')
+        if data_inicio:
+            lancamentos = lancamentos.filter(data__gte=data_inicio)
+        if data_fim:
+            lancamentos = lancamentos.filter(data__lte=data_fim)
+        if metodo_pagamento:
+            lancamentos = lancamentos.filter(metodo_pagamento=metodo_pagamento)
+        return lancamentos
+
+
+class ProjecaoForm(forms.Form):
+    """Horizonte da projeção de caixa e o cenário a simular (relatorios/projecao.py)."""
+    meses = forms.IntegerField(label="Meses", min_value=1, max_value=24, initial=6)
+    categoria = forms.ModelChoiceField(
+        queryset=Categoria.objects.select_related('categoria_pai'), label="Cortar a categoria", required=False,
+        widget=AutocompletarSelect(reverse_lazy('autocompletar_categorias')),
+    )
+    corte_percentual = forms.DecimalField(label="Corte (%)", min_value=0, max_value=100, decimal_places=2, required=False)
+    custo_valor = forms.DecimalField(label="Novo custo (R$)", min_value=Decimal('0.01'), decimal_places=2, required=False)
+    custo_frequencia = forms.ChoiceField(label="Frequência do custo", choices=Recorrencia.FREQUENCIA_CHOICES, initial='mensal')
+    custo_inicio = forms.DateField(label="Início do custo", widget=forms.DateInput(attrs={"type": "date"}), required=False)
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('categoria') and dados.get('corte_percentual') is None:
+            self.add_error('corte_percentual', "Informe o percentual do corte.")
+        if dados.get('corte_percentual') and not dados.get('categoria'):
+            self.add_error('categoria', "Selecione a categoria a cortar.")
+        return dados
+
+    def cenario(self, hoje):
+        """(cortes, custos) no formato de simular_fluxo_caixa (form já validado)."""
+        dados = self.cleaned_data
+        cortes = ()
+        if dados.get('categoria') and dados.get('corte_percentual'):
+            cortes = ((dados['categoria'].caminho, dados['corte_percentual']),)
+        custos = ()
+        if dados.get('custo_valor'):
+            custos = ((dados['custo_valor'], dados['custo_frequencia'], dados.get('custo_inicio') or hoje),)
+        return cortes, custos
+
 
 class CartaoCreditoForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,223 @@
+"""
+Importação de extratos bancários (OFX ou CSV) para Lancamento.
+
+Os arquivos são lidos linha a linha (sem carregar o extrato inteiro), as
+categorias e fornecedores são resolvidos por nome em mapas carregados uma
+única vez, e os lançamentos são gravados com bulk_create em lotes, dentro de
+uma única transação: ou o extrato entra inteiro, ou nada entra.
+
+bulk_create não dispara os signals de Lancamento, então os efeitos derivados
+são aplicados em agregado no fim:
+
+- limite do cartão: uma baixa por cartão com o total das compras;
+- faturas: atribuídas e somadas por lote (Fatura.atribuir_em_lote);
+- SaldoDiario, cache e DRE: um único envio de `lancamentos_em_lote`.
+
+Linhas cuja impressão digital já existe no banco (extrato importado de novo,
+lançamento digitado à mão) são ignoradas, com uma consulta indexada por lote.
+Repetições dentro do próprio arquivo são mantidas: podem ser compras iguais.
+
+Formato CSV (cabeçalho obrigatório, separador ';' ou ','):
+    data;descricao;valor[;tipo][;categoria][;fornecedor][;metodo_pagamento][;observacoes]
+`data` em dd/mm/aaaa ou aaaa-mm-dd; `valor` aceita 1.234,56 ou 1234.56. Sem a
+coluna `tipo`, valores negativos são saídas e positivos, entradas.
+"""
+import csv
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Categoria, Fatura, Fornecedor, Lancamento
+from .signals import lancamentos_em_lote
+
+TAMANHO_LOTE = 2000
+ZERO = Decimal('0.00')
+
+FORMATOS = ['csv', 'ofx']
+METODOS_VALIDOS = {codigo for codigo, _ in Lancamento.PAGAMENTO_CHOICES}
+
+
+def _decimal(texto):
+    texto = texto.strip().replace('R$', '').replace(' ', '')
+    if ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    return Decimal(texto)
+
+
+def _data(texto):
+    texto = texto.strip()
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {texto!r}")
+
+
+def ler_csv(linhas):
+    """Gera um dict por transação do CSV. `linhas` é qualquer iterável de str (arquivo aberto)."""
+    linhas = iter(linhas)
+    cabecalho = next(linhas, '')
+    delimitador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+    colunas = [coluna.strip().lower() for coluna in next(csv.reader([cabecalho], delimiter=delimitador))]
+    faltando = {'data', 'descricao', 'valor'} - set(colunas)
+    if faltando:
+        raise ValidationError(f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}.")
+
+    for numero, campos in enumerate(csv.reader(linhas, delimiter=delimitador), start=2):
+        if not any(campo.strip() for campo in campos):
+            continue
+        registro = dict(zip(colunas, (campo.strip() for campo in campos)))
+        try:
+            valor = _decimal(registro['valor'])
+            data = _data(registro['data'])
+        except (ValueError, InvalidOperation, KeyError) as erro:
+            raise ValidationError(f"Linha {numero} do CSV inválida: {erro}")
+        tipo = registro.get('tipo', '').lower() or ('saida' if valor < 0 else 'entrada')
+        if tipo not in ('entrada', 'saida'):
+            raise ValidationError(f"Linha {numero} do CSV inválida: tipo {tipo!r}.")
+        yield {
+            'linha': numero,
+            'data': data,
+            'descricao': registro['descricao'],
+            'valor': abs(valor),
+            'tipo': tipo,
+            'categoria': registro.get('categoria', ''),
+            'fornecedor': registro.get('fornecedor', ''),
+            'metodo_pagamento': registro.get('metodo_pagamento', ''),
+            'observacoes': registro.get('observacoes', ''),
+        }
+
+
+_TAG_OFX = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+def ler_ofx(linhas):
+    """
+    Gera um dict por <STMTTRN> do OFX (SGML 1.x ou XML 2.x), lendo linha a
+    linha. Valores negativos (TRNAMT) são saídas.
+    """
+    transacao = None
+    for linha in linhas:
+        for fechamento, tag, valor in _TAG_OFX.findall(linha):
+            if tag == 'STMTTRN':
+                if not fechamento:
+                    transacao = {}
+                elif transacao is not None:
+                    yield _transacao_ofx(transacao)
+                    transacao = None
+            elif transacao is not None and not fechamento:
+                transacao[tag] = valor.strip()
+
+
+def _transacao_ofx(transacao):
+    try:
+        valor = Decimal(transacao['TRNAMT'].replace(',', '.'))
+        data = date(*(int(parte) for parte in (
+            transacao['DTPOSTED'][:4], transacao['DTPOSTED'][4:6], transacao['DTPOSTED'][6:8]
+        )))
+    except (KeyError, ValueError, InvalidOperation) as erro:
+        raise ValidationError(f"Transação OFX inválida ({transacao.get('FITID', 'sem FITID')}): {erro}")
+    descricao = transacao.get('MEMO') or transacao.get('NAME') or 'Lançamento importado'
+    return {
+        'data': data,
+        'descricao': descricao[:255],
+        'valor': abs(valor),
+        'tipo': 'saida' if valor < 0 else 'entrada',
+        'categoria': '',
+        'fornecedor': transacao.get('NAME', '') if transacao.get('MEMO') else '',
+        'metodo_pagamento': '',
+        'observacoes': '',
+    }
+
+
+LEITORES = {'csv': ler_csv, 'ofx': ler_ofx}
+
+
+def importar_extrato(linhas, formato='csv', metodo_pagamento=None, cartao=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa as transações do extrato. `cartao` marca as saídas como compras no
+    cartão (consumindo limite); `metodo_pagamento` é o método padrão para as
+    linhas que não trazem um. Levanta ValidationError (e desfaz tudo) se alguma
+    linha for inválida ou se o limite de algum cartão não comportar as compras.
+
+    Retorna {'importados': n, 'duplicados': n, 'entradas': total, 'saidas': total}.
+    """
+    if formato not in LEITORES:
+        raise ValidationError(f"Formato de extrato inválido: {formato!r}.")
+    if cartao is not None:
+        metodo_pagamento = 'cartao_credito'
+    elif metodo_pagamento == 'cartao_credito':
+        raise ValidationError("Escolha o cartão para importar compras no cartão de crédito.")
+
+    categorias = {}
+    for pk, nome in Categoria.objects.values_list('pk', 'nome').order_by('-nivel'):
+        categorias[nome.lower()] = pk  # em nomes repetidos vale a categoria mais rasa
+    fornecedores = {nome.lower(): pk for pk, nome in Fornecedor.objects.values_list('pk', 'nome')}
+
+    movimentos = defaultdict(lambda: (ZERO, ZERO))
+    uso_por_cartao = defaultdict(lambda: ZERO)
+    resultado = {'importados': 0, 'duplicados': 0, 'entradas': ZERO, 'saidas': ZERO}
+    lote = []
+    importadas = set()  # impressões gravadas por esta importação não contam como duplicadas
+
+    def gravar(lote):
+        existentes = set(Lancamento.objects.filter(
+            impressao_digital__in={lancamento.impressao_digital for lancamento in lote}
+        ).values_list('impressao_digital', flat=True)) - importadas
+        novos = [lancamento for lancamento in lote if lancamento.impressao_digital not in existentes]
+        Fatura.atribuir_em_lote(novos)
+        Lancamento.objects.bulk_create(novos)
+        importadas.update(lancamento.impressao_digital for lancamento in novos)
+        resultado['importados'] += len(novos)
+        resultado['duplicados'] += len(lote) - len(novos)
+        for lancamento in novos:
+            entradas, saidas = lancamento.movimento_de_caixa()
+            atual_entradas, atual_saidas = movimentos[lancamento.data]
+            movimentos[lancamento.data] = (atual_entradas + entradas, atual_saidas + saidas)
+            if lancamento.consome_limite():
+                uso_por_cartao[lancamento.cartao_credito] += lancamento.valor
+            resultado['entradas' if lancamento.tipo == 'entrada' else 'saidas'] += lancamento.valor
+
+    with transaction.atomic():
+        for registro in LEITORES[formato](linhas):
+            metodo = registro['metodo_pagamento'].lower() or metodo_pagamento
+            if metodo and metodo not in METODOS_VALIDOS:
+                raise ValidationError(f"Método de pagamento inválido: {metodo!r}.")
+            if metodo == 'cartao_credito' and cartao is None:
+                # Sem cartão a compra não entraria no caixa nem em fatura nenhuma
+                raise ValidationError(
+                    f"Linha {registro['linha']} do CSV: compra no cartão de crédito sem cartão escolhido na importação."
+                )
+            lancamento = Lancamento(
+                descricao=registro['descricao'],
+                tipo=registro['tipo'],
+                valor=registro['valor'],
+                data=registro['data'],
+                categoria_id=categorias.get(registro['categoria'].lower()),
+                fornecedor_id=fornecedores.get(registro['fornecedor'].lower()),
+                metodo_pagamento=metodo,
+                cartao_credito=cartao if metodo == 'cartao_credito' else None,
+                observacoes=registro['observacoes'] or None,
+            )
+            lancamento.atualizar_impressao_digital()
+
+            lote.append(lancamento)
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote = []
+
+        if lote:
+            gravar(lote)
+
+        for cartao_usado, total in uso_por_cartao.items():
+            cartao_usado.usar_limite(total)
+
+        lancamentos_em_lote.send(sender=Lancamento, movimentos=dict(movimentos))
+
+    return resultado
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+
+from home.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda uma suite de benchmark em um banco de testes descartável "
+        "(nunca no banco configurado) e emite os resultados em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES), help="Suite a executar.")
+        parser.add_argument('--threads', type=int, default=8, help="Threads concorrentes.")
+        parser.add_argument('--operacoes', type=int, default=50, help="Operações por thread.")
+        parser.add_argument('--tamanho', type=int, default=3000, help="Quantidade de registros gerados pela suite.")
+        parser.add_argument(
+            '--tamanhos', default='1000,10000,100000',
+            help="Suite views: tamanhos do ledger (lançamentos), separados por vírgula.",
+        )
+        parser.add_argument('--repeticoes', type=int, default=5, help="Suite views: medições por view e tamanho.")
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimir.")
+
+    def handle(self, *args, **options):
+        antigos = setup_databases(verbosity=0, interactive=False)
+        try:
+            resultado = SUITES[options['suite']](
+                threads=options['threads'], operacoes=options['operacoes'], tamanho=options['tamanho'],
+                tamanhos=[int(tamanho) for tamanho in options['tamanhos'].split(',')],
+                repeticoes=options['repeticoes'],
+            )
+        finally:
+            teardown_databases(antigos, verbosity=0)
+
+        resultado = {'suite': options['suite'], **resultado}
+        saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        self.stdout.write(saida)
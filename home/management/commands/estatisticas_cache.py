@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from gerente.cache import estatisticas_cache, zerar_estatisticas
+
+
+class Command(BaseCommand):
+    help = "Mostra a versão do ledger e os acertos/falhas do cache dos cálculos do dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--zerar',
+            action='store_true',
+            help="Zera os contadores depois de mostrar.",
+        )
+
+    def handle(self, *args, **options):
+        estatisticas = estatisticas_cache()
+        taxa = estatisticas['taxa_acerto']
+        self.stdout.write(f"Versão do ledger: {estatisticas['versao']}")
+        self.stdout.write(f"Acertos: {estatisticas['acertos']}")
+        self.stdout.write(f"Falhas: {estatisticas['falhas']}")
+        self.stdout.write(f"Taxa de acerto: {f'{taxa:.1%}' if taxa is not None else '-'}")
+
+        if options['zerar']:
+            zerar_estatisticas()
+            self.stdout.write(self.style.SUCCESS("Contadores zerados."))
@@ -0,0 +1,52 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.dados_sinteticos import gerar_dados_sinteticos
+from home.models import Lancamento
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche o banco configurado com um ledger sintético: categorias do DRE, "
+        "fornecedores, cartões, cofrinhos e N lançamentos (bulk_create em lotes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lancamentos', type=int, default=100000, help="Quantidade de lançamentos a gerar.")
+        parser.add_argument('--fornecedores', type=int, default=200)
+        parser.add_argument('--cartoes', type=int, default=3)
+        parser.add_argument('--cofrinhos', type=int, default=5)
+        parser.add_argument('--dias', type=int, default=730, help="Lançamentos espalhados pelos últimos N dias.")
+        parser.add_argument('--semente', type=int, default=42, help="Semente do gerador (mesma semente, mesmos dados).")
+        parser.add_argument('--lote', type=int, default=5000, help="Lançamentos por bulk_create.")
+        parser.add_argument(
+            '--acrescentar', action='store_true',
+            help="Permite gerar num banco que já tem lançamentos (os dados existentes são mantidos).",
+        )
+
+    def handle(self, *args, **options):
+        if Lancamento.objects.exists() and not options['acrescentar']:
+            raise CommandError("O banco já tem lançamentos. Use --acrescentar para gerar mesmo assim.")
+
+        total = options['lancamentos']
+
+        def progresso(inseridos):
+            sys.stderr.write(f"\r{inseridos}/{total} lançamentos")
+            sys.stderr.flush()
+
+        inicio = time.perf_counter()
+        resultado = gerar_dados_sinteticos(
+            total, fornecedores=options['fornecedores'], cartoes=options['cartoes'], cofrinhos=options['cofrinhos'],
+            dias=options['dias'], semente=options['semente'], lote=options['lote'], progresso=progresso,
+        )
+        duracao = time.perf_counter() - inicio
+        sys.stderr.write("\n")
+
+        resultado.update({
+            'duracao_s': round(duracao, 2),
+            'lancamentos_por_s': round(total / duracao, 1) if duracao else None,
+        })
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.recorrencias import gerar_recorrentes, previsao_fluxo_caixa
+
+
+class Command(BaseCommand):
+    help = (
+        "Lança as ocorrências vencidas de todas as recorrências ativas. Pode rodar "
+        "quantas vezes quiser (ex.: cron diário): nada é lançado duas vezes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ate', help="Lança as ocorrências até esta data (AAAA-MM-DD). Padrão: hoje.")
+        parser.add_argument(
+            '--previsao', type=int, metavar='MESES',
+            help="Depois de lançar, mostra o saldo projetado com as recorrências para os próximos MESES meses.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            ate = date.fromisoformat(options['ate']) if options['ate'] else None
+        except ValueError:
+            raise CommandError("Use --ate no formato AAAA-MM-DD.")
+
+        resultado = gerar_recorrentes(ate)
+        for regra, data, erro in resultado['recusados']:
+            self.stderr.write(f"{regra.descricao} em {data:%d/%m/%Y}: {erro}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['criados']} lançamento(s) recorrente(s) criado(s) de {resultado['regras']} regra(s) vencida(s)."
+        ))
+
+        if options['previsao']:
+            for mes in previsao_fluxo_caixa(options['previsao']):
+                self.stdout.write(
+                    f"{mes['mes']:%m/%Y}: entradas R$ {mes['entradas']}, saídas R$ {mes['saidas']}, "
+                    f"saldo projetado R$ {mes['saldo_final']}"
+                )
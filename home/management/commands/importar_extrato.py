@@ -0,0 +1,74 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from home.importacao import FORMATOS, TAMANHO_LOTE, importar_extrato
+from home.models import CartaoCredito, Lancamento
+
+
+class Command(BaseCommand):
+    help = "Importa um extrato bancário (OFX ou CSV) como lançamentos, em lotes e numa única transação."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo do extrato.")
+        parser.add_argument(
+            '--formato',
+            choices=FORMATOS,
+            help="Formato do arquivo (padrão: pela extensão).",
+        )
+        parser.add_argument(
+            '--metodo',
+            choices=[codigo for codigo, _ in Lancamento.PAGAMENTO_CHOICES],
+            help="Método de pagamento das linhas que não informam um.",
+        )
+        parser.add_argument(
+            '--cartao',
+            type=int,
+            help="ID do cartão de crédito: importa o arquivo como fatura (as saídas consomem limite).",
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help="Codificação do arquivo (padrão: utf-8-sig; extratos OFX costumam usar cp1252).",
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE,
+            help=f"Tamanho dos lotes do bulk_create (padrão: {TAMANHO_LOTE}).",
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or options['arquivo'].rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS:
+            raise CommandError("Não foi possível detectar o formato pela extensão. Use --formato.")
+
+        cartao = None
+        if options['cartao'] is not None:
+            try:
+                cartao = CartaoCredito.objects.get(pk=options['cartao'])
+            except CartaoCredito.DoesNotExist:
+                raise CommandError(f"Cartão #{options['cartao']} não encontrado.")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], encoding=options['encoding'], errors='replace', newline='') as linhas:
+                resultado = importar_extrato(
+                    linhas,
+                    formato=formato,
+                    metodo_pagamento=options['metodo'],
+                    cartao=cartao,
+                    tamanho_lote=options['lote'],
+                )
+        except OSError as erro:
+            raise CommandError(f"Não foi possível ler o arquivo: {erro}")
+        except ValidationError as erro:
+            raise CommandError(erro.messages[0])
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['importados']} lançamento(s) importado(s) em {duracao:.2f}s, "
+            f"{resultado['duplicados']} duplicado(s) ignorado(s): "
+            f"R$ {resultado['entradas']} em entradas e R$ {resultado['saidas']} em saídas."
+        ))
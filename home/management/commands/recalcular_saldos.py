@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from home.models import SaldoDiario
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os snapshots de SaldoDiario a partir dos lançamentos ou verifica se estão consistentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help="Apenas compara os snapshots com um recálculo completo, sem alterar nada.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            divergencias = SaldoDiario.divergencias()
+            for data, gravado, esperado in divergencias:
+                self.stdout.write(f"{data:%d/%m/%Y}: gravado={gravado} esperado={esperado}")
+            if divergencias:
+                raise CommandError(
+                    f"{len(divergencias)} dia(s) divergente(s). Rode 'manage.py recalcular_saldos' para corrigir."
+                )
+            self.stdout.write(self.style.SUCCESS("Snapshots de saldo consistentes com os lançamentos."))
+            return
+
+        total = SaldoDiario.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"{total} snapshot(s) de saldo diário reconstruído(s)."))
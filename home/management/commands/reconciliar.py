@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from home.reconciliacao import reconciliar
+
+
+class Command(BaseCommand):
+    help = "Compara saldos de cofrinhos, limites de cartões e totais de faturas com o ledger e, opcionalmente, corrige as divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help="Grava os valores recalculados a partir dos lançamentos.",
+        )
+
+    def handle(self, *args, **options):
+        resultado = reconciliar(corrigir=options['corrigir'])
+
+        rotulos = {'cartoes': 'Cartão', 'cofrinhos': 'Cofrinho', 'faturas': 'Fatura'}
+        for modelo, divergencias in resultado.items():
+            for d in divergencias:
+                diferenca = d['gravado'] - d['esperado']
+                self.stdout.write(
+                    f"{rotulos[modelo]} #{d['id']} ({d['nome']}): gravado R$ {d['gravado']}, "
+                    f"esperado R$ {d['esperado']} (diferença R$ {diferenca})"
+                )
+                if 'total_gravado' in d and d['total_gravado'] != d['total_esperado']:
+                    self.stdout.write(
+                        f"  total da fatura: gravado R$ {d['total_gravado']}, esperado R$ {d['total_esperado']}"
+                    )
+
+        total = sum(len(divergencias) for divergencias in resultado.values())
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+        elif options['corrigir']:
+            self.stdout.write(self.style.SUCCESS(f"{total} divergência(s) corrigida(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{total} divergência(s) encontrada(s). Rode com --corrigir para gravar os valores do ledger."
+            ))
@@ -0,0 +1,49 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from home.models import Lancamento
+
+
+class Command(BaseCommand):
+    help = "Lista os grupos de lançamentos duplicados (mesma data, tipo, valor, descrição e fornecedor)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help="Considera só lançamentos a partir desta data (AAAA-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        lancamentos = Lancamento.objects.exclude(impressao_digital='')
+        if options['desde']:
+            lancamentos = lancamentos.filter(data__gte=options['desde'])
+
+        # Uma única consulta: os grupos com mais de um lançamento entram como subconsulta agrupada
+        repetidas = lancamentos.values('impressao_digital').annotate(
+            quantidade=Count('id')
+        ).filter(quantidade__gt=1).values('impressao_digital')
+        duplicados = lancamentos.filter(impressao_digital__in=repetidas).order_by(
+            'impressao_digital', 'id'
+        ).values_list('impressao_digital', 'id', 'data', 'descricao', 'valor', 'fornecedor__nome')
+
+        grupos = 0
+        excedentes = 0
+        for _, linhas in groupby(duplicados.iterator(chunk_size=2000), key=lambda linha: linha[0]):
+            linhas = list(linhas)
+            grupos += 1
+            excedentes += len(linhas) - 1
+            _, _, data, descricao, valor, fornecedor = linhas[0]
+            ids = ', '.join(f"#{linha[1]}" for linha in linhas)
+            self.stdout.write(
+                f"{data:%d/%m/%Y} R$ {valor} \"{descricao}\""
+                f"{f' ({fornecedor})' if fornecedor else ''}: {len(linhas)}x -> {ids}"
+            )
+
+        if not grupos:
+            self.stdout.write(self.style.SUCCESS("Nenhum lançamento duplicado encontrado."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{grupos} grupo(s) de duplicados, {excedentes} lançamento(s) excedente(s)."
+            ))
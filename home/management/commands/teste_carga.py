@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga HTTP contra um servidor já rodando (ex.: gunicorn): "
+        "N clientes concorrentes com keep-alive durante D segundos. Emite JSON "
+        "com requisições/s e latências. Procedimento e resultados em DEPLOY.md."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="URLs completas, requisitadas em rodízio por cada cliente.")
+        parser.add_argument('--concorrencia', type=int, default=16, help="Clientes simultâneos.")
+        parser.add_argument('--duracao', type=float, default=10.0, help="Duração da medição em segundos.")
+        parser.add_argument('--aquecimento', type=float, default=2.0, help="Segundos de aquecimento descartados.")
+
+    def handle(self, *args, **options):
+        alvos = [urlsplit(url) for url in options['urls']]
+        if any(alvo.scheme not in ('http', 'https') for alvo in alvos):
+            raise CommandError("Use URLs http:// ou https://.")
+
+        latencias = []
+        erros = []
+        trava = threading.Lock()
+        inicio_medicao = time.perf_counter() + options['aquecimento']
+        fim = inicio_medicao + options['duracao']
+
+        def cliente():
+            conexoes = {}
+            minhas_latencias = []
+            meus_erros = 0
+            indice = 0
+            while True:
+                agora = time.perf_counter()
+                if agora >= fim:
+                    break
+                alvo = alvos[indice % len(alvos)]
+                indice += 1
+                conexao = conexoes.get(alvo.netloc)
+                if conexao is None:
+                    classe = HTTPSConnection if alvo.scheme == 'https' else HTTPConnection
+                    conexao = conexoes[alvo.netloc] = classe(alvo.netloc, timeout=30)
+                try:
+                    conexao.request('GET', alvo.path + (f'?{alvo.query}' if alvo.query else ''))
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                    ok = resposta.status < 400
+                except OSError:
+                    conexoes.pop(alvo.netloc).close()
+                    ok = False
+                duracao = time.perf_counter() - agora
+                if agora >= inicio_medicao:
+                    if ok:
+                        minhas_latencias.append(duracao)
+                    else:
+                        meus_erros += 1
+            for conexao in conexoes.values():
+                conexao.close()
+            with trava:
+                latencias.extend(minhas_latencias)
+                erros.append(meus_erros)
+
+        clientes = [threading.Thread(target=cliente) for _ in range(options['concorrencia'])]
+        for thread in clientes:
+            thread.start()
+        for thread in clientes:
+            thread.join()
+
+        latencias.sort()
+
+        def percentil(p):
+            if not latencias:
+                return None
+            return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 1)
+
+        resultado = {
+            'urls': options['urls'],
+            'concorrencia': options['concorrencia'],
+            'duracao_s': options['duracao'],
+            'requisicoes': len(latencias),
+            'erros': sum(erros),
+            'requisicoes_por_segundo': round(len(latencias) / options['duracao'], 1),
+            'latencia_ms': {'p50': percentil(0.50), 'p95': percentil(0.95), 'p99': percentil(0.99)},
+        }
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2025-09-10 14:20
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def popular_saldos(apps, schema_editor):
+    Lancamento = apps.get_model('home', 'Lancamento')
+    SaldoDiario = apps.get_model('home', 'SaldoDiario')
+
+    por_dia = Lancamento.objects.values('data').annotate(
+        total_entradas=Sum('valor', filter=Q(tipo='entrada')),
+        total_saidas=Sum('valor', filter=Q(tipo='saida') & ~Q(metodo_pagamento='cartao_credito')),
+    ).order_by('data')
+
+    saldos = []
+    saldo = Decimal('0.00')
+    for dia in por_dia:
+        entradas = dia['total_entradas'] or Decimal('0.00')
+        saidas = dia['total_saidas'] or Decimal('0.00')
+        if not entradas and not saidas:
+            continue
+        saldo += entradas - saidas
+        saldos.append(SaldoDiario(data=dia['data'], entradas=entradas, saidas=saidas, saldo_acumulado=saldo))
+    SaldoDiario.objects.bulk_create(saldos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0016_alter_categoria_options_categoria_categoria_pai'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('entradas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('saidas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('saldo_acumulado', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Saldo Diário',
+                'verbose_name_plural': 'Saldos Diários',
+                'ordering': ['data'],
+            },
+        ),
+        migrations.RunPython(popular_saldos, migrations.RunPython.noop),
+    ]
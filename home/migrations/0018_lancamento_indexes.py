@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2025-09-12 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0017_saldodiario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['tipo', 'data'], name='lanc_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['metodo_pagamento', 'data'], name='lanc_metodo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['cartao_credito', 'tipo', 'data'], name='lanc_cartao_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['-data', '-id'], name='lanc_data_id_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2025-09-14 16:42
+
+from django.db import migrations, models
+
+
+def marcar_compras_quitadas(apps, schema_editor):
+    """
+    Até aqui o pagamento da fatura só resetava o limite, sem registro no
+    ledger. Para cada cartão, assume que as compras mais recentes somam o
+    limite hoje em uso e marca as mais antigas como quitadas.
+    """
+    CartaoCredito = apps.get_model('home', 'CartaoCredito')
+    Lancamento = apps.get_model('home', 'Lancamento')
+
+    for cartao in CartaoCredito.objects.all():
+        em_uso = cartao.limite_total - cartao.limite_disponivel
+        compras = Lancamento.objects.filter(
+            cartao_credito=cartao, tipo='saida', metodo_pagamento='cartao_credito'
+        ).order_by('-data', '-id').values_list('id', 'valor')
+
+        acumulado = 0
+        quitadas = []
+        for lancamento_id, valor in compras:
+            if quitadas or acumulado + valor > em_uso:
+                quitadas.append(lancamento_id)
+            else:
+                acumulado += valor
+        Lancamento.objects.filter(id__in=quitadas).update(quitado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0018_lancamento_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lancamento',
+            name='quitado',
+            field=models.BooleanField(default=False, help_text='Compra no cartão já paga na fatura; não consome mais limite'),
+        ),
+        migrations.RunPython(marcar_compras_quitadas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2025-09-18 20:12
+
+from django.db import migrations, models
+
+
+def popular_caminhos(apps, schema_editor):
+    """Preenche caminho/nivel percorrendo a árvore nível a nível a partir das raízes."""
+    Categoria = apps.get_model('home', 'Categoria')
+
+    pais = {}
+    for categoria in Categoria.objects.filter(categoria_pai__isnull=True):
+        categoria.caminho, categoria.nivel = f"/{categoria.pk}/", 0
+        pais[categoria.pk] = categoria
+    Categoria.objects.bulk_update(pais.values(), ['caminho', 'nivel'])
+
+    while pais:
+        filhas = list(Categoria.objects.filter(categoria_pai_id__in=pais.keys()))
+        for categoria in filhas:
+            pai = pais[categoria.categoria_pai_id]
+            categoria.caminho, categoria.nivel = f"{pai.caminho}{categoria.pk}/", pai.nivel + 1
+        Categoria.objects.bulk_update(filhas, ['caminho', 'nivel'])
+        pais = {categoria.pk: categoria for categoria in filhas}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0019_lancamento_quitado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='caminho',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(popular_caminhos, migrations.RunPython.noop),
+    ]
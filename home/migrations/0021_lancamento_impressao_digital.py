@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2025-09-19 18:40
+
+import hashlib
+import re
+import unicodedata
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Cópias congeladas de home.models.normalizar_descricao e calcular_impressao_digital
+# como eram nesta migration: mudanças futuras na fórmula não podem alterar o backfill
+def normalizar_descricao(descricao):
+    texto = unicodedata.normalize('NFKD', descricao or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', texto.lower()).split())
+
+
+def calcular_impressao_digital(data, tipo, valor, descricao, fornecedor_id):
+    chave = f"{data}|{tipo}|{Decimal(valor):.2f}|{normalizar_descricao(descricao)}|{fornecedor_id or ''}"
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+
+def popular_impressoes_digitais(apps, schema_editor):
+    Lancamento = apps.get_model('home', 'Lancamento')
+    lote = []
+    for lancamento in Lancamento.objects.only('data', 'tipo', 'valor', 'descricao', 'fornecedor_id').iterator(chunk_size=2000):
+        lancamento.impressao_digital = calcular_impressao_digital(
+            lancamento.data, lancamento.tipo, lancamento.valor, lancamento.descricao, lancamento.fornecedor_id
+        )
+        lote.append(lancamento)
+        if len(lote) >= 2000:
+            Lancamento.objects.bulk_update(lote, ['impressao_digital'])
+            lote = []
+    Lancamento.objects.bulk_update(lote, ['impressao_digital'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0020_categoria_caminho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lancamento',
+            name='impressao_digital',
+            field=models.CharField(default='', editable=False, help_text='Detecção de lançamentos duplicados', max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['impressao_digital'], name='lanc_impressao_idx'),
+        ),
+        migrations.RunPython(popular_impressoes_digitais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2025-09-21 09:15
+
+from django.db import migrations
+
+# Índice de busca textual específico de cada banco, congelado como era nesta
+# migration (home/busca.py mantém a versão atual e o reparo no post_migrate)
+SQL_SQLITE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS home_lancamento_busca USING fts5(
+        descricao, observacoes, content='home_lancamento', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS home_lancamento_busca_ai AFTER INSERT ON home_lancamento BEGIN
+        INSERT INTO home_lancamento_busca(rowid, descricao, observacoes) VALUES (new.id, new.descricao, new.observacoes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS home_lancamento_busca_ad AFTER DELETE ON home_lancamento BEGIN
+        INSERT INTO home_lancamento_busca(home_lancamento_busca, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS home_lancamento_busca_au AFTER UPDATE OF descricao, observacoes ON home_lancamento BEGIN
+        INSERT INTO home_lancamento_busca(home_lancamento_busca, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+        INSERT INTO home_lancamento_busca(rowid, descricao, observacoes) VALUES (new.id, new.descricao, new.observacoes);
+    END""",
+    # Indexa os lançamentos que já existem
+    "INSERT INTO home_lancamento_busca(home_lancamento_busca) VALUES ('rebuild')",
+]
+
+SQL_SQLITE_REVERSO = [
+    "DROP TRIGGER IF EXISTS home_lancamento_busca_ai",
+    "DROP TRIGGER IF EXISTS home_lancamento_busca_ad",
+    "DROP TRIGGER IF EXISTS home_lancamento_busca_au",
+    "DROP TABLE IF EXISTS home_lancamento_busca",
+]
+
+SQL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS lanc_busca_trgm_idx ON home_lancamento "
+    "USING gin ((descricao || ' ' || COALESCE(observacoes, '')) gin_trgm_ops)",
+]
+
+SQL_POSTGRESQL_REVERSO = [
+    "DROP INDEX IF EXISTS lanc_busca_trgm_idx",
+]
+
+
+def _executar(schema_editor, por_banco):
+    for sql in por_banco.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQL_SQLITE, 'postgresql': SQL_POSTGRESQL})
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQL_SQLITE_REVERSO, 'postgresql': SQL_POSTGRESQL_REVERSO})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0021_lancamento_impressao_digital'),
+    ]
+
+    operations = [
+        # Índice de busca textual específico de cada banco (ver home/busca.py)
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2025-09-22 08:30
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópia congelada de home.models.normalizar_descricao como era nesta migration
+def normalizar_descricao(descricao):
+    texto = unicodedata.normalize('NFKD', descricao or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', texto.lower()).split())
+
+
+def popular_nome_busca(apps, schema_editor):
+    for modelo, tamanho in (('Categoria', 50), ('Fornecedor', 100)):
+        Modelo = apps.get_model('home', modelo)
+        registros = list(Modelo.objects.only('nome'))
+        for registro in registros:
+            registro.nome_busca = normalizar_descricao(registro.nome)[:tamanho]
+        Modelo.objects.bulk_update(registros, ['nome_busca'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0022_lancamento_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='fornecedor',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['nome_busca'], name='categoria_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='fornecedor',
+            index=models.Index(fields=['nome_busca'], name='fornecedor_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(popular_nome_busca, migrations.RunPython.noop),
+    ]
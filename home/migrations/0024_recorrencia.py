@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2025-09-23 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0023_nome_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=255)),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('saida', 'Saida')], max_length=10)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('metodo_pagamento', models.CharField(blank=True, choices=[('dinheiro', 'Dinheiro'), ('pix', 'PIX'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('caderno', 'Caderno')], max_length=100, null=True)),
+                ('observacoes', models.TextField(blank=True, null=True)),
+                ('frequencia', models.CharField(choices=[('semanal', 'Semanal'), ('mensal', 'Mensal'), ('anual', 'Anual')], default='mensal', max_length=10)),
+                ('intervalo', models.PositiveSmallIntegerField(default=1, help_text='A cada quantas semanas/meses/anos (ex: 3 meses = trimestral)')),
+                ('data_inicio', models.DateField(help_text='Primeira ocorrência')),
+                ('data_fim', models.DateField(blank=True, help_text='Última data possível; vazio para sem fim', null=True)),
+                ('proxima_data', models.DateField(blank=True, editable=False, help_text='Próxima ocorrência ainda não lançada', null=True)),
+                ('ativa', models.BooleanField(default=True)),
+                ('cartao_credito', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.cartaocredito')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.categoria')),
+                ('fornecedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.fornecedor')),
+            ],
+            options={
+                'verbose_name': 'Recorrência',
+                'verbose_name_plural': 'Recorrências',
+                'ordering': ['proxima_data', 'descricao'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lancamento',
+            name='recorrencia',
+            field=models.ForeignKey(blank=True, help_text='Regra que gerou este lançamento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos', to='home.recorrencia'),
+        ),
+        migrations.AddConstraint(
+            model_name='lancamento',
+            constraint=models.UniqueConstraint(condition=models.Q(('recorrencia__isnull', False)), fields=('recorrencia', 'data'), name='lanc_recorrencia_data_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='recorrencia',
+            index=models.Index(condition=models.Q(('ativa', True)), fields=['proxima_data'], name='recorrencia_vencidas_idx'),
+        ),
+    ]
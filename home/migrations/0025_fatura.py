@@ -0,0 +1,109 @@
+# Generated by Django 5.2.5 on 2025-09-26 10:15
+
+import calendar
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+
+
+# Cópias congeladas das regras de ciclo de home.models como eram nesta migration
+def dia_do_mes(ano, mes, dia):
+    return date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+
+
+def fechamento_do_ciclo(dia_fechamento, data):
+    fechamento = dia_do_mes(data.year, data.month, dia_fechamento)
+    if fechamento <= data:
+        seguinte = data.replace(day=1) + relativedelta(months=1)
+        fechamento = dia_do_mes(seguinte.year, seguinte.month, dia_fechamento)
+    return fechamento
+
+
+def abertura_do_ciclo(dia_fechamento, fechamento):
+    anterior = fechamento.replace(day=1) - relativedelta(months=1)
+    return dia_do_mes(anterior.year, anterior.month, dia_fechamento)
+
+
+def vencimento_da_fatura(dia_vencimento, fechamento):
+    vencimento = dia_do_mes(fechamento.year, fechamento.month, dia_vencimento)
+    if vencimento <= fechamento:
+        seguinte = fechamento.replace(day=1) + relativedelta(months=1)
+        vencimento = dia_do_mes(seguinte.year, seguinte.month, dia_vencimento)
+    return vencimento
+
+
+def popular_faturas(apps, schema_editor):
+    """Cria as faturas das compras no cartão já lançadas e distribui as compras nelas."""
+    CartaoCredito = apps.get_model('home', 'CartaoCredito')
+    Fatura = apps.get_model('home', 'Fatura')
+    Lancamento = apps.get_model('home', 'Lancamento')
+
+    for cartao in CartaoCredito.objects.all():
+        compras = list(Lancamento.objects.filter(
+            cartao_credito=cartao, tipo='saida', metodo_pagamento='cartao_credito',
+        ).only('pk', 'data', 'valor', 'quitado'))
+        if not compras:
+            continue
+
+        totais = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+        for lancamento in compras:
+            lancamento.fechamento = fechamento_do_ciclo(cartao.dia_fechamento, lancamento.data)
+            totais[lancamento.fechamento][0] += lancamento.valor
+            if not lancamento.quitado:
+                totais[lancamento.fechamento][1] += lancamento.valor
+
+        faturas = Fatura.objects.bulk_create([
+            Fatura(
+                cartao=cartao, fechamento=fechamento,
+                abertura=abertura_do_ciclo(cartao.dia_fechamento, fechamento),
+                vencimento=vencimento_da_fatura(cartao.dia_vencimento, fechamento),
+                total=total, em_aberto=em_aberto,
+            )
+            for fechamento, (total, em_aberto) in totais.items()
+        ])
+        por_fechamento = {fatura.fechamento: fatura.pk for fatura in faturas}
+        for lancamento in compras:
+            lancamento.fatura_id = por_fechamento[lancamento.fechamento]
+        Lancamento.objects.bulk_update(compras, ['fatura'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0024_recorrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fatura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('abertura', models.DateField()),
+                ('fechamento', models.DateField()),
+                ('vencimento', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('em_aberto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('data_pagamento', models.DateField(blank=True, null=True)),
+                ('cartao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='faturas', to='home.cartaocredito')),
+            ],
+            options={
+                'verbose_name': 'Fatura',
+                'verbose_name_plural': 'Faturas',
+                'ordering': ['cartao', '-fechamento'],
+                'constraints': [models.UniqueConstraint(fields=('cartao', 'fechamento'), name='fatura_cartao_fechamento_uniq')],
+            },
+        ),
+        migrations.AddField(
+            model_name='lancamento',
+            name='fatura',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Fatura do cartão em que a compra entra', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos', to='home.fatura'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['fatura', '-data', '-id'], name='lanc_fatura_data_idx'),
+        ),
+        migrations.RunPython(popular_faturas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2025-09-28 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0025_fatura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lancamento',
+            name='parcela',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text='Número da parcela (1, 2, ...) na compra parcelada', null=True),
+        ),
+        migrations.CreateModel(
+            name='CompraParcelada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=255)),
+                ('valor_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('numero_parcelas', models.PositiveSmallIntegerField()),
+                ('data', models.DateField(help_text='Data da compra')),
+                ('observacoes', models.TextField(blank=True, null=True)),
+                ('cartao_credito', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='compras_parceladas', to='home.cartaocredito')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.categoria')),
+                ('fornecedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.fornecedor')),
+            ],
+            options={
+                'verbose_name': 'Compra Parcelada',
+                'verbose_name_plural': 'Compras Parceladas',
+                'ordering': ['-data', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lancamento',
+            name='compra_parcelada',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parcelas', to='home.compraparcelada'),
+        ),
+        migrations.AddConstraint(
+            model_name='lancamento',
+            constraint=models.UniqueConstraint(condition=models.Q(('compra_parcelada__isnull', False)), fields=('compra_parcelada', 'parcela'), name='lanc_parcela_uniq'),
+        ),
+    ]
@@ -1,7 +1,17 @@
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Sum, Q, F
+from django.db.models.functions import Least, Concat, Substr
+from django.db.models import Value
 from django.core.exceptions import ValidationError
-from decimal import Decimal
+from decimal import ROUND_DOWN, Decimal
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+import calendar
+import hashlib
+import re
+import unicodedata
+
+from gerente.cache import invalidar_ledger
 
 class Categoria(models.Model):
     nome = models.CharField(max_length=50, unique=True)
@@ -15,25 +25,91 @@ class Categoria(models.Model):
         related_name = "subcategorias",
         verbose_name = "Categoria Pai" 
     )
+
+    # Caminho materializado da raiz até a categoria (ex: "/1/5/12/") e sua
+    # profundidade. Mantidos no save() e no pre_delete (home/signals.py);
+    # permitem somar uma subárvore inteira com um filtro por prefixo.
+    caminho = models.CharField(max_length=1000, db_index=True, editable=False, default='')
+    nivel = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Nome normalizado (normalizar_descricao) para o autocompletar por prefixo
+    nome_busca = models.CharField(max_length=50, editable=False, default='')
     
     class Meta:
         ordering = ["categoria_pai__nome", "nome"]
         verbose_name = "Categoria"
         verbose_name_plural = "Categorias"
+        indexes = [
+            # varchar_pattern_ops: no PostgreSQL o LIKE 'prefixo%' usa o índice em qualquer collation
+            models.Index(fields=['nome_busca'], name='categoria_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         if self.categoria_pai:
             return f"{self.categoria_pai.nome} -> {self.nome}"
         return self.nome
 
+    def clean(self):
+        super().clean()
+        if self.pk and self.categoria_pai_id:
+            caminho_pai = Categoria.objects.filter(pk=self.categoria_pai_id).values_list('caminho', flat=True).first()
+            if self.caminho and caminho_pai and caminho_pai.startswith(self.caminho):
+                raise ValidationError({'categoria_pai': "Uma categoria não pode ficar dentro dela mesma ou de uma subcategoria."})
+
+    def save(self, *args, **kwargs):
+        self.nome_busca = normalizar_descricao(self.nome)[:50]
+        with transaction.atomic():
+            caminho_anterior = None
+            if self.pk:
+                caminho_anterior = Categoria.objects.filter(pk=self.pk).values_list('caminho', flat=True).first()
+            super().save(*args, **kwargs)
+
+            if self.categoria_pai_id:
+                caminho_pai, nivel_pai = Categoria.objects.values_list('caminho', 'nivel').get(pk=self.categoria_pai_id)
+                caminho, nivel = f"{caminho_pai}{self.pk}/", nivel_pai + 1
+            else:
+                caminho, nivel = f"/{self.pk}/", 0
+
+            if caminho == caminho_anterior:
+                return
+            Categoria.objects.filter(pk=self.pk).update(caminho=caminho, nivel=nivel)
+            if caminho_anterior:
+                # Categoria movida: troca o prefixo de todas as descendentes de uma vez
+                Categoria.objects.filter(caminho__startswith=caminho_anterior).exclude(pk=self.pk).update(
+                    caminho=Concat(Value(caminho), Substr('caminho', len(caminho_anterior) + 1)),
+                    nivel=F('nivel') + (nivel - caminho_anterior.count('/') + 2),
+                )
+            self.caminho, self.nivel = caminho, nivel
+
+    def filtro_subarvore(self, prefixo='categoria__', incluir_raiz=True):
+        """
+        Q que seleciona a subárvore desta categoria por prefixo do caminho
+        (uma busca indexada, qualquer que seja a profundidade). Use `prefixo`
+        para filtrar modelos relacionados, ex: Lancamento com 'categoria__'.
+        """
+        filtro = Q(**{f'{prefixo}caminho__startswith': self.caminho})
+        if not incluir_raiz:
+            filtro &= Q(**{f'{prefixo}nivel__gt': self.nivel})
+        return filtro
+
 class Fornecedor(models.Model):
     nome = models.CharField(max_length=100)
     cnpj = models.CharField(max_length=14, unique=True, blank=True, null=True)
     contato = models.CharField(max_length=200, blank=True, null=True)
+    # Nome normalizado (normalizar_descricao) para o autocompletar por prefixo
+    nome_busca = models.CharField(max_length=100, editable=False, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome_busca'], name='fornecedor_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        self.nome_busca = normalizar_descricao(self.nome)[:100]
+        super().save(*args, **kwargs)
+
 class Cofrinho(models.Model):
     nome = models.CharField(max_length=100)
     objetivo = models.TextField(blank=True)
@@ -74,19 +150,184 @@ class CartaoCredito(models.Model):
         return self.limite_disponivel >= valor
     
     def usar_limite(self, valor):
-        """Usa uma parte do limite do cartão"""
-        if not self.tem_limite_disponivel(valor):
+        """
+        Usa uma parte do limite do cartão.
+
+        A verificação e o débito acontecem em um único UPDATE condicional
+        (limite_disponivel >= valor), então compras concorrentes nunca perdem
+        atualizações nem estouram o limite.
+        """
+        atualizados = CartaoCredito.objects.filter(pk=self.pk, limite_disponivel__gte=valor).update(
+            limite_disponivel=F('limite_disponivel') - valor
+        )
+        invalidar_ledger()
+        self.refresh_from_db(fields=['limite_disponivel'])
+        if not atualizados:
             raise ValidationError(f"Limite insuficiente. Disponível: R$ {self.limite_disponivel}, Solicitado: R$ {valor}")
-        self.limite_disponivel -= valor
-        self.save(update_fields=['limite_disponivel'])
     
     def liberar_limite(self, valor):
-        """Libera limite do cartão (para estornos ou exclusão de compras)"""
-        novo_limite = self.limite_disponivel + valor
-        if novo_limite > self.limite_total:
-            novo_limite = self.limite_total
-        self.limite_disponivel = novo_limite
-        self.save(update_fields=['limite_disponivel'])
+        """Libera limite do cartão (para estornos ou exclusão de compras), sem passar do limite total"""
+        CartaoCredito.objects.filter(pk=self.pk).update(
+            limite_disponivel=Least(F('limite_disponivel') + valor, F('limite_total'))
+        )
+        invalidar_ledger()
+        self.refresh_from_db(fields=['limite_disponivel'])
+
+    def fechamento_para(self, data):
+        """Data de fechamento da fatura em que entra uma compra feita em `data`."""
+        return fechamento_do_ciclo(self.dia_fechamento, data)
+
+    def vencimento_para(self, fechamento):
+        """Vencimento da fatura que fecha em `fechamento`."""
+        return vencimento_da_fatura(self.dia_vencimento, fechamento)
+
+    def proximo_vencimento(self, hoje):
+        """
+        Próximo vencimento a partir de `hoje`: o da fatura que já fechou, se
+        ainda não venceu, senão o da fatura aberta.
+        """
+        fechamento = self.fechamento_para(hoje)
+        vencimento = self.vencimento_para(abertura_do_ciclo(self.dia_fechamento, fechamento))
+        return vencimento if vencimento >= hoje else self.vencimento_para(fechamento)
+
+def dia_do_mes(ano, mes, dia):
+    """O `dia` do mês, ou o último dia se o mês for mais curto (31 em abril -> 30/04)."""
+    return date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+
+def fechamento_do_ciclo(dia_fechamento, data):
+    """
+    Primeiro fechamento depois de `data`: compras feitas até a véspera do
+    fechamento entram na fatura do mês; a partir do dia do fechamento, na seguinte.
+    """
+    fechamento = dia_do_mes(data.year, data.month, dia_fechamento)
+    if fechamento <= data:
+        seguinte = data.replace(day=1) + relativedelta(months=1)
+        fechamento = dia_do_mes(seguinte.year, seguinte.month, dia_fechamento)
+    return fechamento
+
+def abertura_do_ciclo(dia_fechamento, fechamento):
+    """Fechamento anterior: primeiro dia de compras da fatura que fecha em `fechamento`."""
+    anterior = fechamento.replace(day=1) - relativedelta(months=1)
+    return dia_do_mes(anterior.year, anterior.month, dia_fechamento)
+
+def vencimento_da_fatura(dia_vencimento, fechamento):
+    """Primeiro dia de vencimento depois do fechamento."""
+    vencimento = dia_do_mes(fechamento.year, fechamento.month, dia_vencimento)
+    if vencimento <= fechamento:
+        seguinte = fechamento.replace(day=1) + relativedelta(months=1)
+        vencimento = dia_do_mes(seguinte.year, seguinte.month, dia_vencimento)
+    return vencimento
+
+class Fatura(models.Model):
+    """
+    Fatura de um cartão: as compras feitas de `abertura` até a véspera de
+    `fechamento` (ver fechamento_do_ciclo), a pagar em `vencimento`.
+
+    `total` é a soma das compras da fatura e `em_aberto` a parte ainda não
+    paga (compras não quitadas, que ocupam limite do cartão). Os dois são
+    mantidos incrementalmente pelos signals de Lancamento e pelos caminhos em
+    lote (`atribuir_em_lote`), e conferidos por `manage.py reconciliar`.
+    """
+    cartao = models.ForeignKey(CartaoCredito, on_delete=models.CASCADE, related_name="faturas")
+    abertura = models.DateField()
+    fechamento = models.DateField()
+    vencimento = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    em_aberto = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    data_pagamento = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["cartao", "-fechamento"]
+        verbose_name = "Fatura"
+        verbose_name_plural = "Faturas"
+        constraints = [
+            models.UniqueConstraint(fields=['cartao', 'fechamento'], name='fatura_cartao_fechamento_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Fatura {self.cartao.nome} - venc. {self.vencimento:%d/%m/%Y} - R$ {self.total}"
+
+    def esta_fechada(self, hoje):
+        return self.fechamento <= hoje
+
+    @staticmethod
+    def contribuicao(lancamento):
+        """(total, em_aberto) que o lançamento soma na sua fatura."""
+        if lancamento.fatura_id is None or not lancamento.entra_em_fatura():
+            return Decimal('0.00'), Decimal('0.00')
+        return lancamento.valor, Decimal('0.00') if lancamento.quitado else lancamento.valor
+
+    @classmethod
+    def nova(cls, cartao, fechamento):
+        """Fatura (não salva) do ciclo do cartão que fecha em `fechamento`."""
+        return cls(
+            cartao=cartao, fechamento=fechamento,
+            abertura=abertura_do_ciclo(cartao.dia_fechamento, fechamento),
+            vencimento=cartao.vencimento_para(fechamento),
+        )
+
+    @classmethod
+    def do_ciclo(cls, cartao, fechamento):
+        """A fatura do cartão que fecha em `fechamento`, criando-a se preciso."""
+        nova = cls.nova(cartao, fechamento)
+        fatura, _ = cls.objects.get_or_create(cartao=cartao, fechamento=fechamento, defaults={
+            'abertura': nova.abertura, 'vencimento': nova.vencimento,
+        })
+        return fatura
+
+    @classmethod
+    def registrar(cls, deltas):
+        """Aplica `deltas` {fatura_id: (total, em_aberto)} com um UPDATE por fatura."""
+        for fatura_id, (total, em_aberto) in deltas.items():
+            if total or em_aberto:
+                cls.objects.filter(pk=fatura_id).update(total=F('total') + total, em_aberto=F('em_aberto') + em_aberto)
+
+    @classmethod
+    def atribuir_em_lote(cls, lancamentos):
+        """
+        Para os caminhos com bulk_create: põe cada compra no cartão na fatura
+        do seu ciclo (criando as que faltam com uma consulta e um bulk_create)
+        e soma os valores nas faturas. Chame antes do bulk_create, na mesma transação.
+        """
+        compras = [lancamento for lancamento in lancamentos if lancamento.entra_em_fatura()]
+        if not compras:
+            return
+        cartoes = CartaoCredito.objects.in_bulk({lancamento.cartao_credito_id for lancamento in compras})
+        ciclos = []
+        for lancamento in compras:
+            cartao = cartoes[lancamento.cartao_credito_id]
+            data = Lancamento._meta.get_field('data').to_python(lancamento.data)
+            ciclos.append((cartao.pk, cartao.fechamento_para(data)))
+
+        chaves = set(ciclos)
+        existentes = {
+            (fatura.cartao_id, fatura.fechamento): fatura.pk
+            for fatura in cls.objects.filter(
+                cartao_id__in={cartao_id for cartao_id, _ in chaves},
+                fechamento__in={fechamento for _, fechamento in chaves},
+            ).only('pk', 'cartao_id', 'fechamento')
+        }
+        novas = [cls.nova(cartoes[cartao_id], fechamento) for cartao_id, fechamento in chaves - set(existentes)]
+        for fatura in cls.objects.bulk_create(novas):
+            existentes[(fatura.cartao_id, fatura.fechamento)] = fatura.pk
+
+        deltas = {}
+        for lancamento, chave in zip(compras, ciclos):
+            lancamento.fatura_id = existentes[chave]
+            total, em_aberto = cls.contribuicao(lancamento)
+            atual_total, atual_em_aberto = deltas.get(lancamento.fatura_id, (Decimal('0.00'), Decimal('0.00')))
+            deltas[lancamento.fatura_id] = (atual_total + total, atual_em_aberto + em_aberto)
+        cls.registrar(deltas)
+
+def normalizar_descricao(descricao):
+    """Minúsculas, sem acentos, sem pontuação e com espaços colapsados."""
+    texto = unicodedata.normalize('NFKD', descricao or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', texto.lower()).split())
+
+def calcular_impressao_digital(data, tipo, valor, descricao, fornecedor_id):
+    """Impressão digital de um lançamento: data, tipo, valor, descrição normalizada e fornecedor."""
+    chave = f"{data}|{tipo}|{Decimal(valor):.2f}|{normalizar_descricao(descricao)}|{fornecedor_id or ''}"
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
 
 class Lancamento(models.Model):
     TIPO_CHOICES = [
@@ -120,8 +361,394 @@ class Lancamento(models.Model):
     cofrinho_destino = models.ForeignKey("Cofrinho", on_delete=models.SET_NULL, null=True, blank=True, related_name="transferencias")
 
     cartao_credito = models.ForeignKey("CartaoCredito", on_delete=models.SET_NULL, null=True, blank=True, related_name="lancamentos")
-    
+
+    quitado = models.BooleanField(default=False, help_text="Compra no cartão já paga na fatura; não consome mais limite")
+
+    impressao_digital = models.CharField(max_length=40, default='', editable=False, help_text="Detecção de lançamentos duplicados")
+
+    recorrencia = models.ForeignKey("Recorrencia", on_delete=models.SET_NULL, null=True, blank=True, related_name="lancamentos", help_text="Regra que gerou este lançamento")
+
+    fatura = models.ForeignKey("Fatura", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="lancamentos", help_text="Fatura do cartão em que a compra entra")
+
+    compra_parcelada = models.ForeignKey("CompraParcelada", on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name="parcelas")
+
+    parcela = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, help_text="Número da parcela (1, 2, ...) na compra parcelada")
+
+    class Meta:
+        constraints = [
+            # Cada ocorrência de uma regra vira no máximo um lançamento (gerar_recorrentes é idempotente)
+            models.UniqueConstraint(
+                fields=['recorrencia', 'data'], condition=Q(recorrencia__isnull=False), name='lanc_recorrencia_data_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['compra_parcelada', 'parcela'], condition=Q(compra_parcelada__isnull=False), name='lanc_parcela_uniq',
+            ),
+        ]
+        indexes = [
+            # Totais do período por tipo (calcular_total_entradas/saidas, DRE)
+            models.Index(fields=['tipo', 'data'], name='lanc_tipo_data_idx'),
+            # Filtros por método de pagamento nos relatórios
+            models.Index(fields=['metodo_pagamento', 'data'], name='lanc_metodo_data_idx'),
+            # Lançamentos e gasto do mês por cartão
+            models.Index(fields=['cartao_credito', 'tipo', 'data'], name='lanc_cartao_tipo_data_idx'),
+            # Listagens ordenadas pelos mais recentes e filtros só por período
+            models.Index(fields=['-data', '-id'], name='lanc_data_id_idx'),
+            # Detecção de duplicados por igualdade da impressão digital
+            models.Index(fields=['impressao_digital'], name='lanc_impressao_idx'),
+            # Lançamentos de uma fatura, mais recentes primeiro (detalhes do cartão)
+            models.Index(fields=['fatura', '-data', '-id'], name='lanc_fatura_data_idx'),
+        ]
     
     def __str__(self):
         cartao_info = f" - {self.cartao_credito.nome}" if self.cartao_credito else ""
         return f"{self.descricao} ({self.tipo.capitalize()}) - R$ {self.valor}{cartao_info}"
+
+    def save(self, *args, **kwargs):
+        self.atualizar_impressao_digital()
+        self.atribuir_fatura()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'impressao_digital', 'fatura'}
+        super().save(*args, **kwargs)
+
+    def atribuir_fatura(self):
+        """
+        Põe a compra no cartão na fatura do ciclo da sua data (criando a
+        fatura se preciso). Os totais da fatura são ajustados pelos signals;
+        caminhos com bulk_create usam Fatura.atribuir_em_lote.
+        """
+        if not self.entra_em_fatura():
+            self.fatura = None
+            return
+        data = Lancamento._meta.get_field('data').to_python(self.data)
+        fechamento = self.cartao_credito.fechamento_para(data)
+        if self.fatura_id is None or (self.fatura.cartao_id, self.fatura.fechamento) != (self.cartao_credito_id, fechamento):
+            self.fatura = Fatura.do_ciclo(self.cartao_credito, fechamento)
+
+    def atualizar_impressao_digital(self):
+        """Recalcula a impressão digital. Caminhos com bulk_create precisam chamar antes de gravar."""
+        data = Lancamento._meta.get_field('data').to_python(self.data)
+        self.impressao_digital = calcular_impressao_digital(data, self.tipo, self.valor, self.descricao, self.fornecedor_id)
+        return self.impressao_digital
+
+    def duplicados(self):
+        """Outros lançamentos com a mesma impressão digital (uma leitura indexada)."""
+        self.atualizar_impressao_digital()
+        return Lancamento.objects.filter(impressao_digital=self.impressao_digital).exclude(pk=self.pk)
+
+    def entra_em_fatura(self):
+        """Indica se o lançamento é uma compra no cartão de crédito (entra numa fatura)."""
+        return (
+            self.tipo == 'saida'
+            and self.metodo_pagamento == 'cartao_credito'
+            and self.cartao_credito_id is not None
+        )
+
+    def consome_limite(self):
+        """Indica se o lançamento ocupa limite do cartão de crédito."""
+        return self.entra_em_fatura() and not self.quitado
+
+    def movimento_de_caixa(self):
+        """
+        Retorna a tupla (entradas, saidas) que este lançamento gera no caixa.
+        Saídas no cartão de crédito não movimentam o caixa.
+        """
+        if self.tipo == 'entrada':
+            return self.valor, Decimal('0.00')
+        if self.tipo == 'saida' and self.metodo_pagamento != 'cartao_credito':
+            return Decimal('0.00'), self.valor
+        return Decimal('0.00'), Decimal('0.00')
+
+class Recorrencia(models.Model):
+    """
+    Regra de um lançamento que se repete (aluguel, salários, assinaturas).
+
+    Os campos do lançamento servem de modelo para cada ocorrência. As datas
+    são sempre calculadas a partir de `data_inicio` (a ocorrência n é
+    data_inicio + n * intervalo), então uma regra mensal do dia 31 cai no
+    último dia dos meses curtos sem escorregar para o dia 28 depois de
+    fevereiro. `proxima_data` é a primeira ocorrência ainda não lançada;
+    `manage.py gerar_recorrentes` (home/recorrencias.py) a avança.
+    """
+    FREQUENCIA_CHOICES = [
+        ("semanal", "Semanal"),
+        ("mensal", "Mensal"),
+        ("anual", "Anual"),
+    ]
+
+    descricao = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=10, choices=Lancamento.TIPO_CHOICES)
+    valor = models.DecimalField(max_digits=10, decimal_places=2)
+    categoria = models.ForeignKey("Categoria", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    fornecedor = models.ForeignKey("Fornecedor", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    metodo_pagamento = models.CharField(max_length=100, choices=Lancamento.PAGAMENTO_CHOICES, null=True, blank=True)
+    cartao_credito = models.ForeignKey("CartaoCredito", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    observacoes = models.TextField(blank=True, null=True)
+
+    frequencia = models.CharField(max_length=10, choices=FREQUENCIA_CHOICES, default="mensal")
+    intervalo = models.PositiveSmallIntegerField(default=1, help_text="A cada quantas semanas/meses/anos (ex: 3 meses = trimestral)")
+    data_inicio = models.DateField(help_text="Primeira ocorrência")
+    data_fim = models.DateField(null=True, blank=True, help_text="Última data possível; vazio para sem fim")
+    proxima_data = models.DateField(null=True, blank=True, editable=False, help_text="Próxima ocorrência ainda não lançada")
+    ativa = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["proxima_data", "descricao"]
+        verbose_name = "Recorrência"
+        verbose_name_plural = "Recorrências"
+        indexes = [
+            # Varredura do gerar_recorrentes: regras ativas vencidas até uma data
+            models.Index(fields=['proxima_data'], condition=Q(ativa=True), name='recorrencia_vencidas_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.descricao} ({self.get_frequencia_display().lower()}) - R$ {self.valor}"
+
+    def clean(self):
+        super().clean()
+        if self.data_fim and self.data_inicio and self.data_fim < self.data_inicio:
+            raise ValidationError({'data_fim': "A data final não pode ser anterior à data de início."})
+        if self.tipo == 'saida' and self.metodo_pagamento == 'cartao_credito' and not self.cartao_credito_id:
+            raise ValidationError({'cartao_credito': "Para uma saída no cartão, você deve selecionar o cartão."})
+
+    def save(self, *args, **kwargs):
+        if self.ativa:
+            # Regra nova (ou reativada) começa em data_inicio; se a frequência
+            # ou as datas mudaram, a próxima ocorrência é realinhada
+            self.proxima_data = self.proxima_a_partir_de(self.proxima_data or self.data_inicio)
+            self.ativa = self.proxima_data is not None
+        super().save(*args, **kwargs)
+
+    def ocorrencia(self, n):
+        """Data da n-ésima ocorrência (a primeira é n=0)."""
+        passo = n * self.intervalo
+        if self.frequencia == 'semanal':
+            return self.data_inicio + timedelta(weeks=passo)
+        if self.frequencia == 'anual':
+            return self.data_inicio + relativedelta(years=passo)
+        return self.data_inicio + relativedelta(months=passo)
+
+    def _indice_a_partir_de(self, data):
+        """Menor n com ocorrencia(n) >= data."""
+        if data <= self.data_inicio:
+            return 0
+        if self.frequencia == 'semanal':
+            n = (data - self.data_inicio).days // (7 * self.intervalo)
+        else:
+            meses = (data.year - self.data_inicio.year) * 12 + data.month - self.data_inicio.month
+            n = meses // (self.intervalo * (12 if self.frequencia == 'anual' else 1))
+        # A estimativa erra no máximo por uma ocorrência
+        while n > 0 and self.ocorrencia(n - 1) >= data:
+            n -= 1
+        while self.ocorrencia(n) < data:
+            n += 1
+        return n
+
+    def datas(self, de, ate):
+        """Datas das ocorrências entre `de` e `ate` (inclusive), respeitando data_fim."""
+        if self.data_fim and self.data_fim < ate:
+            ate = self.data_fim
+        n = self._indice_a_partir_de(de)
+        data = self.ocorrencia(n)
+        while data <= ate:
+            yield data
+            n += 1
+            data = self.ocorrencia(n)
+
+    def proxima_a_partir_de(self, data):
+        """Primeira ocorrência em `data` ou depois, ou None se a regra já terminou."""
+        proxima = self.ocorrencia(self._indice_a_partir_de(data))
+        if self.data_fim and proxima > self.data_fim:
+            return None
+        return proxima
+
+    def novo_lancamento(self, data):
+        """O lançamento (não salvo) da ocorrência em `data`."""
+        return Lancamento(
+            descricao=self.descricao, tipo=self.tipo, valor=self.valor, data=data,
+            categoria_id=self.categoria_id, fornecedor_id=self.fornecedor_id,
+            metodo_pagamento=self.metodo_pagamento, cartao_credito_id=self.cartao_credito_id,
+            observacoes=self.observacoes, recorrencia=self,
+        )
+
+class CompraParcelada(models.Model):
+    """
+    Compra no cartão dividida em parcelas, uma por fatura.
+
+    A compra reserva o limite do valor total de uma vez (um único UPDATE no
+    cartão) e cada parcela é um Lancamento na fatura do seu ciclo: a primeira
+    na fatura da data da compra, as seguintes nas faturas dos meses
+    seguintes. Pagar uma fatura quita só a parcela dela e libera só o seu
+    valor. Criação e exclusão passam por home/services.py.
+    """
+    MAXIMO_PARCELAS = 24
+
+    descricao = models.CharField(max_length=255)
+    valor_total = models.DecimalField(max_digits=10, decimal_places=2)
+    numero_parcelas = models.PositiveSmallIntegerField()
+    data = models.DateField(help_text="Data da compra")
+    cartao_credito = models.ForeignKey("CartaoCredito", on_delete=models.SET_NULL, null=True, related_name="compras_parceladas")
+    categoria = models.ForeignKey("Categoria", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    fornecedor = models.ForeignKey("Fornecedor", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    observacoes = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-data", "-id"]
+        verbose_name = "Compra Parcelada"
+        verbose_name_plural = "Compras Parceladas"
+
+    def __str__(self):
+        return f"{self.descricao} - {self.numero_parcelas}x - R$ {self.valor_total}"
+
+    def valores_das_parcelas(self):
+        """Valores das parcelas: iguais, com os centavos que sobram na primeira."""
+        parcela = (self.valor_total / self.numero_parcelas).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+        return [self.valor_total - parcela * (self.numero_parcelas - 1)] + [parcela] * (self.numero_parcelas - 1)
+
+    def datas_das_parcelas(self):
+        """
+        A primeira parcela na data da compra; cada seguinte no fechamento da
+        fatura anterior, que é o primeiro dia do ciclo seguinte.
+        """
+        datas = [self.data]
+        fechamento = self.cartao_credito.fechamento_para(self.data)
+        for _ in range(self.numero_parcelas - 1):
+            datas.append(fechamento)
+            fechamento = self.cartao_credito.fechamento_para(fechamento)
+        return datas
+
+    def gerar_parcelas(self):
+        """Os lançamentos (não salvos) das parcelas."""
+        return [
+            Lancamento(
+                descricao=f"{self.descricao} ({numero}/{self.numero_parcelas})", tipo='saida', valor=valor, data=data,
+                categoria_id=self.categoria_id, fornecedor_id=self.fornecedor_id, observacoes=self.observacoes,
+                metodo_pagamento='cartao_credito', cartao_credito=self.cartao_credito,
+                compra_parcelada=self, parcela=numero,
+            )
+            for numero, (valor, data) in enumerate(zip(self.valores_das_parcelas(), self.datas_das_parcelas()), start=1)
+        ]
+
+class SaldoDiario(models.Model):
+    """
+    Snapshot materializado do caixa, uma linha por dia com movimento.
+
+    `entradas` e `saidas` são o movimento de caixa do dia (mesmas regras de
+    `calcular_total_entradas`/`calcular_total_saidas`) e `saldo_acumulado` é o
+    saldo histórico no fim do dia. Mantido pelos signals de Lancamento e
+    reconstruído com `manage.py recalcular_saldos`.
+    """
+    data = models.DateField(unique=True)
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    saidas = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    saldo_acumulado = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ["data"]
+        verbose_name = "Saldo Diário"
+        verbose_name_plural = "Saldos Diários"
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - Saldo: R$ {self.saldo_acumulado}"
+
+    @classmethod
+    def saldo_ate(cls, data):
+        """Saldo acumulado no fim do dia `data` (uma leitura indexada)."""
+        saldo = cls.objects.filter(data__lte=data).order_by('-data').values_list(
+            'saldo_acumulado', flat=True
+        ).first()
+        return saldo if saldo is not None else Decimal('0.00')
+
+    @classmethod
+    def registrar_movimentos(cls, movimentos):
+        """
+        Aplica variações de caixa de forma incremental.
+
+        `movimentos` é um dict {data: (entradas, saidas)} com os deltas de cada
+        dia. O saldo acumulado é ajustado por faixas entre os dias alterados,
+        cada uma com o delta acumulado até ali, então cada snapshot é
+        atualizado uma única vez mesmo quando muitos dias mudam (importações).
+        """
+        dias = sorted(
+            (data, entradas, saidas) for data, (entradas, saidas) in movimentos.items()
+            if entradas or saidas
+        )
+        with transaction.atomic():
+            for data, entradas, saidas in dias:
+                cls.objects.get_or_create(
+                    data=data,
+                    defaults={'saldo_acumulado': lambda: cls.saldo_ate(data - timedelta(days=1))},
+                )
+                cls.objects.filter(data=data).update(
+                    entradas=F('entradas') + entradas,
+                    saidas=F('saidas') + saidas,
+                )
+
+            delta = Decimal('0.00')
+            for indice, (data, entradas, saidas) in enumerate(dias):
+                delta += entradas - saidas
+                faixa = cls.objects.filter(data__gte=data)
+                if indice + 1 < len(dias):
+                    faixa = faixa.filter(data__lt=dias[indice + 1][0])
+                if delta:
+                    faixa.update(saldo_acumulado=F('saldo_acumulado') + delta)
+
+    @classmethod
+    def calcular_do_ledger(cls):
+        """
+        Recalcula os snapshots a partir de todos os lançamentos, com uma única
+        consulta agrupada por dia. Retorna instâncias não salvas.
+        """
+        por_dia = Lancamento.objects.values('data').annotate(
+            total_entradas=Sum('valor', filter=Q(tipo='entrada')),
+            total_saidas=Sum('valor', filter=Q(tipo='saida') & ~Q(metodo_pagamento='cartao_credito')),
+        ).order_by('data')
+
+        saldos = []
+        saldo = Decimal('0.00')
+        for dia in por_dia:
+            # No SQLite a soma de decimais volta com ruído de ponto flutuante
+            entradas = (dia['total_entradas'] or Decimal('0.00')).quantize(Decimal('0.01'))
+            saidas = (dia['total_saidas'] or Decimal('0.00')).quantize(Decimal('0.01'))
+            if not entradas and not saidas:
+                continue
+            saldo += entradas - saidas
+            saldos.append(cls(data=dia['data'], entradas=entradas, saidas=saidas, saldo_acumulado=saldo))
+        return saldos
+
+    @classmethod
+    def reconstruir(cls):
+        """Apaga e recria todos os snapshots a partir do ledger."""
+        saldos = cls.calcular_do_ledger()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(saldos, batch_size=1000)
+        return len(saldos)
+
+    @classmethod
+    def divergencias(cls):
+        """
+        Compara os snapshots gravados com um recálculo completo do ledger.
+        Retorna uma lista de tuplas (data, gravado, esperado), onde cada lado é
+        uma tupla (entradas, saidas, saldo_acumulado) ou None.
+        """
+        esperados = {s.data: (s.entradas, s.saidas, s.saldo_acumulado) for s in cls.calcular_do_ledger()}
+        gravados = {
+            s['data']: (s['entradas'], s['saidas'], s['saldo_acumulado'])
+            for s in cls.objects.values('data', 'entradas', 'saidas', 'saldo_acumulado')
+        }
+
+        divergencias = []
+        saldo_corrente = Decimal('0.00')
+        for data in sorted(set(esperados) | set(gravados)):
+            gravado = gravados.get(data)
+            esperado = esperados.get(data)
+            if esperado is not None:
+                saldo_corrente = esperado[2]
+            else:
+                # Dias que ficaram sem movimento (ex.: lançamento excluído) só
+                # precisam manter o saldo acumulado correto.
+                esperado = (Decimal('0.00'), Decimal('0.00'), saldo_corrente)
+            if gravado != esperado:
+                divergencias.append((data, gravado, esperado))
+        return divergencias
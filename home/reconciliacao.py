@@ -0,0 +1,124 @@
+"""
+Reconciliação dos contadores desnormalizados com o ledger.
+
+`Cofrinho.saldo` e `CartaoCredito.limite_disponivel` são mantidos de forma
+incremental pelas views e serviços. Aqui eles são recalculados a partir dos
+lançamentos, com uma consulta agrupada por modelo:
+
+- saldo do cofrinho = transferências para ele (saídas) - resgates (entradas);
+- limite disponível = limite total - compras no cartão ainda não quitadas;
+- total e em aberto da fatura = suas compras e as ainda não quitadas.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from gerente.cache import invalidar_ledger
+
+from .models import Cofrinho, CartaoCredito, Fatura
+
+CENTAVO = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def divergencias_cartoes():
+    """Retorna os cartões cujo limite disponível não bate com o ledger."""
+    cartoes = CartaoCredito.objects.annotate(
+        usado=Coalesce(
+            Sum('lancamentos__valor', filter=Q(
+                lancamentos__tipo='saida',
+                lancamentos__metodo_pagamento='cartao_credito',
+                lancamentos__quitado=False,
+            )),
+            ZERO,
+        )
+    ).values_list('id', 'nome', 'limite_total', 'limite_disponivel', 'usado').order_by()
+
+    divergencias = []
+    for cartao_id, nome, limite_total, limite_disponivel, usado in cartoes.iterator(chunk_size=2000):
+        esperado = (limite_total - usado).quantize(CENTAVO)
+        if limite_disponivel != esperado:
+            divergencias.append({'id': cartao_id, 'nome': nome, 'gravado': limite_disponivel, 'esperado': esperado})
+    return divergencias
+
+
+def divergencias_cofrinhos():
+    """Retorna os cofrinhos cujo saldo não bate com o ledger."""
+    cofrinhos = Cofrinho.objects.annotate(
+        aportes=Coalesce(Sum('transferencias__valor', filter=Q(transferencias__tipo='saida')), ZERO),
+        resgates=Coalesce(Sum('transferencias__valor', filter=Q(transferencias__tipo='entrada')), ZERO),
+    ).values_list('id', 'nome', 'saldo', 'aportes', 'resgates').order_by()
+
+    divergencias = []
+    for cofrinho_id, nome, saldo, aportes, resgates in cofrinhos.iterator(chunk_size=2000):
+        esperado = (aportes - resgates).quantize(CENTAVO)
+        if saldo != esperado:
+            divergencias.append({'id': cofrinho_id, 'nome': nome, 'gravado': saldo, 'esperado': esperado})
+    return divergencias
+
+
+def divergencias_faturas():
+    """Retorna as faturas cujo total ou valor em aberto não bate com as compras."""
+    compras = Q(lancamentos__tipo='saida', lancamentos__metodo_pagamento='cartao_credito')
+    faturas = Fatura.objects.annotate(
+        total_esperado=Coalesce(Sum('lancamentos__valor', filter=compras), ZERO),
+        em_aberto_esperado=Coalesce(Sum('lancamentos__valor', filter=compras & Q(lancamentos__quitado=False)), ZERO),
+    ).values_list('id', 'cartao__nome', 'fechamento', 'total', 'em_aberto', 'total_esperado', 'em_aberto_esperado').order_by()
+
+    divergencias = []
+    for fatura_id, cartao, fechamento, total, em_aberto, total_esperado, em_aberto_esperado in faturas.iterator(chunk_size=2000):
+        total_esperado = total_esperado.quantize(CENTAVO)
+        em_aberto_esperado = em_aberto_esperado.quantize(CENTAVO)
+        if (total, em_aberto) != (total_esperado, em_aberto_esperado):
+            divergencias.append({
+                'id': fatura_id, 'nome': f"{cartao}, fecha em {fechamento:%d/%m/%Y}",
+                'gravado': em_aberto, 'esperado': em_aberto_esperado,
+                'total_gravado': total, 'total_esperado': total_esperado,
+            })
+    return divergencias
+
+
+def reconciliar(corrigir=False):
+    """
+    Calcula a divergência dos cartões, cofrinhos e faturas e, se `corrigir`,
+    aplica a diferença em lote.
+
+    A correção é gravada como delta (F(campo) + esperado - lido), e não como
+    valor absoluto: uma compra ou transferência que confirmar entre a leitura
+    e a escrita já moveu o contador e o ledger juntos, e o delta a preserva.
+    Retorna {'cartoes': [...], 'cofrinhos': [...], 'faturas': [...]}.
+    """
+    with transaction.atomic():
+        cartoes = divergencias_cartoes()
+        cofrinhos = divergencias_cofrinhos()
+        faturas = divergencias_faturas()
+
+        if corrigir:
+            CartaoCredito.objects.bulk_update(
+                [CartaoCredito(id=d['id'], limite_disponivel=_corrigido('limite_disponivel', d)) for d in cartoes],
+                ['limite_disponivel'], batch_size=500,
+            )
+            Cofrinho.objects.bulk_update(
+                [Cofrinho(id=d['id'], saldo=_corrigido('saldo', d)) for d in cofrinhos],
+                ['saldo'], batch_size=500,
+            )
+            Fatura.objects.bulk_update(
+                [
+                    Fatura(
+                        id=d['id'],
+                        total=F('total') + (d['total_esperado'] - d['total_gravado']),
+                        em_aberto=_corrigido('em_aberto', d),
+                    )
+                    for d in faturas
+                ],
+                ['total', 'em_aberto'], batch_size=500,
+            )
+            invalidar_ledger()
+
+    return {'cartoes': cartoes, 'cofrinhos': cofrinhos, 'faturas': faturas}
+
+
+def _corrigido(campo, divergencia):
+    return F(campo) + (divergencia['esperado'] - divergencia['gravado'])
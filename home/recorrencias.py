@@ -0,0 +1,121 @@
+"""
+Lançamentos recorrentes: materialização das ocorrências vencidas
+(`manage.py gerar_recorrentes`) e previsão do fluxo de caixa a partir das
+regras ativas.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lancamento, Recorrencia, SaldoDiario
+from .services import criar_lancamentos_em_lote
+
+ZERO = Decimal('0.00')
+
+
+def gerar_recorrentes(ate=None):
+    """
+    Lança todas as ocorrências vencidas até `ate` (padrão: hoje) de todas as
+    regras ativas.
+
+    Uma consulta (indexada por proxima_data) traz as regras vencidas, outra as
+    ocorrências que já existem, e os lançamentos novos vão num único
+    criar_lancamentos_em_lote (limite dos cartões, SaldoDiario, DRE e cache).
+    Rodar de novo não duplica nada: proxima_data avança na mesma transação e
+    a restrição única (recorrencia, data) garante o resto. Uma ocorrência
+    recusada (limite do cartão) mantém a regra parada nela, para a próxima
+    execução tentar de novo.
+
+    Retorna {'regras', 'criados', 'recusados': [(regra, data, erro), ...]}.
+    """
+    ate = ate or timezone.localdate()
+    with transaction.atomic():
+        regras = list(Recorrencia.objects.select_for_update().filter(ativa=True, proxima_data__lte=ate).order_by())
+        if not regras:
+            return {'regras': 0, 'criados': 0, 'recusados': []}
+
+        existentes = set(Lancamento.objects.filter(
+            recorrencia__in=regras, data__gte=min(regra.proxima_data for regra in regras),
+        ).values_list('recorrencia_id', 'data'))
+
+        novos = [
+            regra.novo_lancamento(data)
+            for regra in regras
+            for data in regra.datas(regra.proxima_data, ate)
+            if (regra.pk, data) not in existentes
+        ]
+        # Na ordem das datas: o limite do cartão é consumido pelas compras mais antigas primeiro
+        novos.sort(key=lambda lancamento: lancamento.data)
+        # A restrição única (recorrencia, data) já impede ocorrências repetidas
+        erros = criar_lancamentos_em_lote(novos, ignorar_duplicidade=True)
+
+        recusados = []
+        primeira_recusa = {}
+        for lancamento, erro in zip(novos, erros):
+            if erro is not None:
+                recusados.append((lancamento.recorrencia, lancamento.data, erro))
+                primeira_recusa.setdefault(lancamento.recorrencia_id, lancamento.data)
+
+        for regra in regras:
+            regra.proxima_data = primeira_recusa.get(regra.pk) or regra.proxima_a_partir_de(ate + timedelta(days=1))
+            regra.ativa = regra.proxima_data is not None
+        Recorrencia.objects.bulk_update(regras, ['proxima_data', 'ativa'])
+
+    return {'regras': len(regras), 'criados': len(novos) - len(recusados), 'recusados': recusados}
+
+
+def prever_recorrentes(data_inicio, data_fim, regras=None):
+    """
+    Movimento de caixa {data: (entradas, saidas)} das ocorrências ainda não
+    lançadas entre as datas, calculado em memória a partir das regras ativas
+    (uma consulta). `regras` permite simular regras não salvas.
+    """
+    if regras is None:
+        regras = Recorrencia.objects.filter(ativa=True)
+    movimentos = defaultdict(lambda: (ZERO, ZERO))
+    for regra in regras:
+        if regra.proxima_data is None:
+            continue
+        # Todas as ocorrências de uma regra movimentam o caixa do mesmo jeito
+        entradas, saidas = regra.novo_lancamento(regra.proxima_data).movimento_de_caixa()
+        if not entradas and not saidas:
+            continue
+        for data in regra.datas(max(data_inicio, regra.proxima_data), data_fim):
+            atual_entradas, atual_saidas = movimentos[data]
+            movimentos[data] = (atual_entradas + entradas, atual_saidas + saidas)
+    return dict(movimentos)
+
+
+def previsao_fluxo_caixa(meses=3, hoje=None):
+    """
+    Saldo de caixa projetado para os próximos `meses` meses só com as
+    recorrências: uma linha por mês com entradas, saídas e saldo no fim do
+    mês, partindo do saldo atual (SaldoDiario).
+
+    Ocorrências já vencidas que o gerar_recorrentes ainda não lançou (cron
+    atrasado) não estão no saldo atual: contam a partir de proxima_data e
+    entram amanhã, quando serão lançadas.
+    """
+    hoje = hoje or timezone.localdate()
+    amanha = hoje + timedelta(days=1)
+    primeiro_mes = hoje.replace(day=1)
+    fim = primeiro_mes + relativedelta(months=meses) - timedelta(days=1)
+    por_mes = defaultdict(lambda: (ZERO, ZERO))
+    # date.min: cada regra começa na sua proxima_data (ver prever_recorrentes)
+    for data, (entradas, saidas) in prever_recorrentes(date.min, fim).items():
+        mes = max(data, amanha).replace(day=1)
+        atual_entradas, atual_saidas = por_mes[mes]
+        por_mes[mes] = (atual_entradas + entradas, atual_saidas + saidas)
+
+    saldo = SaldoDiario.saldo_ate(hoje)
+    previsao = []
+    for indice in range(meses):
+        mes = primeiro_mes + relativedelta(months=indice)
+        entradas, saidas = por_mes[mes]
+        saldo += entradas - saidas
+        previsao.append({'mes': mes, 'entradas': entradas, 'saidas': saidas, 'saldo_final': saldo})
+    return previsao
@@ -0,0 +1,266 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from gerente.utils import get_periodo_contabil_atual, resumo_periodo
+
+from gerente.cache import invalidar_ledger
+
+from .models import CartaoCredito, Cofrinho, Fatura, Lancamento
+from .signals import lancamentos_em_lote
+
+MENSAGEM_DUPLICADO = "Já existe um lançamento igual (mesma data, tipo, valor, descrição e fornecedor)."
+
+# Chave do advisory lock que serializa as operações que dependem do saldo de caixa.
+CHAVE_LOCK_CAIXA = 0x46494E4D  # "FINM"
+
+
+def travar_caixa():
+    """
+    Serializa, até o fim da transação atual, as operações que verificam o
+    saldo de caixa antes de gastar dele.
+
+    No PostgreSQL usa um advisory lock de transação. No SQLite as transações
+    já começam com BEGIN IMMEDIATE (ver settings), o que trava o banco para
+    escrita desde o início.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHAVE_LOCK_CAIXA])
+
+
+def transferir_para_cofrinho(cofrinho, valor, data=None):
+    """
+    Transfere `valor` do caixa para o cofrinho.
+
+    A verificação do saldo disponível, o crédito no cofrinho (UPDATE com F())
+    e o lançamento de saída acontecem na mesma transação, com o caixa travado,
+    então transferências simultâneas não se sobrescrevem nem deixam o caixa
+    negativo. Levanta ValidationError se não houver saldo.
+    """
+    data = data or timezone.localdate()
+
+    with transaction.atomic():
+        travar_caixa()
+
+        data_inicio, data_fim = get_periodo_contabil_atual()
+        # Leitura direta do banco: o cache pode não refletir transferências recém-confirmadas
+        saldo_disponivel = resumo_periodo.sem_cache(data_inicio, data_fim)['saldo_final']
+        if valor > saldo_disponivel:
+            raise ValidationError('Saldo insuficiente para a transferência.')
+
+        Cofrinho.objects.filter(pk=cofrinho.pk).update(saldo=F('saldo') + valor)
+        lancamento = Lancamento.objects.create(
+            descricao=f'Transferência para cofrinho {cofrinho.nome}',
+            tipo='saida',
+            valor=valor,
+            data=data,
+            cofrinho_destino=cofrinho,
+            observacoes='Transferência interna.'
+        )
+
+    cofrinho.refresh_from_db(fields=['saldo'])
+    return lancamento
+
+
+def salvar_lancamento(lancamento):
+    """
+    Cria ou atualiza o lançamento aplicando o efeito no limite do cartão.
+
+    Na edição, a linha antiga é travada (select_for_update) para que duas
+    edições simultâneas não revertam o mesmo efeito duas vezes; o limite da
+    versão antiga é liberado e o da nova, consumido. Tudo na mesma transação:
+    se o limite não comportar a compra (ValidationError), nada é gravado.
+    """
+    with transaction.atomic():
+        if lancamento.pk:
+            anterior = Lancamento.objects.select_for_update().select_related('cartao_credito').get(pk=lancamento.pk)
+            if anterior.consome_limite():
+                anterior.cartao_credito.liberar_limite(anterior.valor)
+        if lancamento.consome_limite():
+            lancamento.cartao_credito.usar_limite(lancamento.valor)
+        lancamento.save()
+    return lancamento
+
+
+def excluir_lancamento(lancamento):
+    """
+    Exclui o lançamento devolvendo ao cartão o limite que ele ocupava.
+
+    A linha é relida e travada (select_for_update), como na edição: se outra
+    exclusão (duplo clique, DELETE repetido) já a removeu, nada é feito e o
+    limite não é devolvido duas vezes.
+    """
+    with transaction.atomic():
+        atual = Lancamento.objects.select_for_update().select_related('cartao_credito').filter(pk=lancamento.pk).first()
+        if atual is None:
+            return
+        if atual.consome_limite():
+            atual.cartao_credito.liberar_limite(atual.valor)
+        atual.delete()
+
+
+def atualizar_cartao(cartao, campos):
+    """
+    Grava só `campos` do cartão: limite_disponivel é mantido pelos UPDATEs
+    atômicos. Mudar o limite total desloca o disponível na mesma proporção.
+    """
+    with transaction.atomic():
+        limite_total_anterior = CartaoCredito.objects.select_for_update().values_list(
+            'limite_total', flat=True
+        ).get(pk=cartao.pk)
+        cartao.save(update_fields=[campo for campo in campos if campo != 'limite_disponivel'])
+
+        diferenca = cartao.limite_total - limite_total_anterior
+        if diferenca:
+            CartaoCredito.objects.filter(pk=cartao.pk).update(
+                limite_disponivel=F('limite_disponivel') + diferenca
+            )
+            cartao.refresh_from_db(fields=['limite_disponivel'])
+    return cartao
+
+
+def pagar_fatura(fatura):
+    """
+    Paga a fatura: as compras ainda em aberto ficam quitadas e o limite que
+    ocupavam volta para o cartão. Só faturas fechadas com saldo em aberto
+    podem ser pagas (ValidationError). Retorna o valor pago.
+    """
+    hoje = timezone.localdate()
+    with transaction.atomic():
+        travada = Fatura.objects.select_for_update().select_related('cartao').get(pk=fatura.pk)
+        if not travada.esta_fechada(hoje):
+            raise ValidationError(f"A fatura ainda está aberta: fecha em {travada.fechamento:%d/%m/%Y}.")
+        if not travada.em_aberto:
+            raise ValidationError("Esta fatura já está paga.")
+
+        valor = travada.em_aberto
+        travada.lancamentos.filter(quitado=False).update(quitado=True)
+        travada.cartao.liberar_limite(valor)
+        Fatura.objects.filter(pk=travada.pk).update(em_aberto=F('em_aberto') - valor, data_pagamento=hoje)
+
+    fatura.refresh_from_db(fields=['em_aberto', 'data_pagamento'])
+    fatura.cartao = travada.cartao
+    return valor
+
+
+def criar_lancamentos_em_lote(lancamentos, ignorar_duplicidade=False):
+    """
+    Cria vários lançamentos (não salvos, com os cartões já atribuídos) numa
+    única transação, com bulk_create.
+
+    O limite de cada cartão é verificado em memória, na ordem recebida, a
+    partir do valor travado no banco; compras que não cabem são recusadas
+    individualmente. Depois, um único UPDATE condicional por cartão debita o
+    total aceito. SaldoDiario, cache e DRE são atualizados pelo signal
+    `lancamentos_em_lote`.
+
+    Lançamentos iguais a um já gravado ou a um anterior do mesmo lote (mesma
+    impressão digital; uma consulta para o lote inteiro) são recusados com
+    MENSAGEM_DUPLICADO, a menos que `ignorar_duplicidade` seja True (lote
+    inteiro) ou uma sequência com um bool por lançamento.
+
+    Retorna uma lista com um item por lançamento: None se foi criado, ou a
+    mensagem de erro.
+    """
+    erros = [None] * len(lancamentos)
+    zero = Decimal('0.00')
+    if isinstance(ignorar_duplicidade, bool):
+        ignorar_duplicidade = [ignorar_duplicidade] * len(lancamentos)
+
+    with transaction.atomic():
+        if not all(ignorar_duplicidade):
+            impressoes = [lancamento.atualizar_impressao_digital() for lancamento in lancamentos]
+            vistas = set(Lancamento.objects.filter(impressao_digital__in={
+                impressao for impressao, ignorar in zip(impressoes, ignorar_duplicidade) if not ignorar
+            }).values_list('impressao_digital', flat=True))
+            for indice, impressao in enumerate(impressoes):
+                if impressao in vistas and not ignorar_duplicidade[indice]:
+                    erros[indice] = MENSAGEM_DUPLICADO
+                vistas.add(impressao)
+
+        ids_cartoes = {
+            lancamento.cartao_credito_id
+            for indice, lancamento in enumerate(lancamentos) if erros[indice] is None and lancamento.consome_limite()
+        }
+        disponivel = dict(
+            CartaoCredito.objects.select_for_update().filter(pk__in=ids_cartoes).values_list('pk', 'limite_disponivel')
+        )
+        uso_por_cartao = defaultdict(lambda: zero)
+        for indice, lancamento in enumerate(lancamentos):
+            if erros[indice] is not None or not lancamento.consome_limite():
+                continue
+            cartao_id = lancamento.cartao_credito_id
+            if uso_por_cartao[cartao_id] + lancamento.valor > disponivel[cartao_id]:
+                erros[indice] = (
+                    f"Limite insuficiente. Disponível: R$ {disponivel[cartao_id] - uso_por_cartao[cartao_id]}, "
+                    f"Solicitado: R$ {lancamento.valor}"
+                )
+                continue
+            uso_por_cartao[cartao_id] += lancamento.valor
+
+        aceitos = [lancamento for indice, lancamento in enumerate(lancamentos) if erros[indice] is None]
+        _gravar_em_lote(aceitos)
+
+        for cartao_id, total in uso_por_cartao.items():
+            atualizados = CartaoCredito.objects.filter(pk=cartao_id, limite_disponivel__gte=total).update(
+                limite_disponivel=F('limite_disponivel') - total
+            )
+            if not atualizados:
+                # Não deveria acontecer com a linha travada; desfaz o lote inteiro por segurança
+                raise ValidationError("O limite do cartão mudou durante a gravação do lote.")
+        if uso_por_cartao:
+            invalidar_ledger()
+
+    return erros
+
+
+def _gravar_em_lote(lancamentos):
+    """
+    bulk_create dos lançamentos com os efeitos que os signals não aplicam:
+    faturas, SaldoDiario, cache e DRE. O limite dos cartões fica com quem chama.
+    """
+    if not lancamentos:
+        return
+    zero = Decimal('0.00')
+    for lancamento in lancamentos:
+        lancamento.atualizar_impressao_digital()
+    Fatura.atribuir_em_lote(lancamentos)
+    Lancamento.objects.bulk_create(lancamentos)
+
+    movimentos = defaultdict(lambda: (zero, zero))
+    for lancamento in lancamentos:
+        entradas, saidas = lancamento.movimento_de_caixa()
+        atual_entradas, atual_saidas = movimentos[lancamento.data]
+        movimentos[lancamento.data] = (atual_entradas + entradas, atual_saidas + saidas)
+    lancamentos_em_lote.send(sender=Lancamento, movimentos=dict(movimentos))
+
+
+def criar_compra_parcelada(compra):
+    """
+    Grava a compra parcelada (não salva) e suas parcelas.
+
+    O limite do valor total é reservado com um único UPDATE condicional no
+    cartão; se não couber, levanta ValidationError e nada é gravado. As
+    parcelas vão num bulk_create, cada uma na fatura do seu ciclo (as faturas
+    futuras que faltam são criadas juntas). Retorna as parcelas.
+    """
+    with transaction.atomic():
+        compra.cartao_credito.usar_limite(compra.valor_total)
+        compra.save()
+        parcelas = compra.gerar_parcelas()
+        _gravar_em_lote(parcelas)
+    return parcelas
+
+
+def excluir_compra_parcelada(compra):
+    """Exclui a compra e as parcelas, devolvendo ao cartão o limite das parcelas ainda não pagas."""
+    with transaction.atomic():
+        em_aberto = compra.parcelas.filter(quitado=False).aggregate(total=Sum('valor'))['total']
+        if em_aberto and compra.cartao_credito_id:
+            compra.cartao_credito.liberar_limite(em_aberto)
+        compra.delete()
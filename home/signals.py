@@ -0,0 +1,110 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import Signal, receiver
+
+from gerente.cache import invalidar_ledger
+
+from .models import Categoria, Lancamento, SaldoDiario, Cofrinho, CartaoCredito, Fatura, Fornecedor, Recorrencia
+
+# Enviado pelos caminhos em lote (bulk_create não dispara post_save) com
+# movimentos={data: (entradas, saidas)} de todos os dias afetados.
+lancamentos_em_lote = Signal()
+
+
+def _somar_movimento(movimentos, data, lancamento, sinal=1):
+    # `data` pode ter sido atribuída como string ou datetime antes do save.
+    data = Lancamento._meta.get_field('data').to_python(data)
+    entradas, saidas = lancamento.movimento_de_caixa()
+    atual_entradas, atual_saidas = movimentos[data]
+    movimentos[data] = (atual_entradas + sinal * entradas, atual_saidas + sinal * saidas)
+
+
+@receiver(pre_save, sender=Lancamento)
+def guardar_estado_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda o lançamento como está no banco para desfazer seu efeito depois do save."""
+    instance._estado_anterior = None
+    if instance.pk and not raw:
+        instance._estado_anterior = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Lancamento)
+def atualizar_saldo_diario_ao_salvar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    movimentos = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00')))
+    anterior = getattr(instance, '_estado_anterior', None)
+    if anterior is not None:
+        _somar_movimento(movimentos, anterior.data, anterior, sinal=-1)
+    _somar_movimento(movimentos, instance.data, instance)
+    SaldoDiario.registrar_movimentos(movimentos)
+
+
+@receiver(post_delete, sender=Lancamento)
+def atualizar_saldo_diario_ao_excluir(sender, instance, **kwargs):
+    movimentos = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00')))
+    _somar_movimento(movimentos, instance.data, instance, sinal=-1)
+    SaldoDiario.registrar_movimentos(movimentos)
+
+
+def _somar_fatura(deltas, lancamento, sinal=1):
+    total, em_aberto = Fatura.contribuicao(lancamento)
+    if total or em_aberto:
+        atual_total, atual_em_aberto = deltas[lancamento.fatura_id]
+        deltas[lancamento.fatura_id] = (atual_total + sinal * total, atual_em_aberto + sinal * em_aberto)
+
+
+@receiver(post_save, sender=Lancamento)
+def atualizar_fatura_ao_salvar(sender, instance, raw=False, **kwargs):
+    """Desfaz nos totais da fatura antiga a versão anterior e soma a nova na fatura atual."""
+    if raw:
+        return
+    deltas = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00')))
+    anterior = getattr(instance, '_estado_anterior', None)
+    if anterior is not None:
+        _somar_fatura(deltas, anterior, sinal=-1)
+    _somar_fatura(deltas, instance)
+    Fatura.registrar(deltas)
+
+
+@receiver(post_delete, sender=Lancamento)
+def atualizar_fatura_ao_excluir(sender, instance, **kwargs):
+    deltas = defaultdict(lambda: (Decimal('0.00'), Decimal('0.00')))
+    _somar_fatura(deltas, instance, sinal=-1)
+    Fatura.registrar(deltas)
+
+
+@receiver(lancamentos_em_lote)
+def atualizar_saldo_diario_em_lote(sender, movimentos, **kwargs):
+    SaldoDiario.registrar_movimentos(movimentos)
+    invalidar_ledger()
+
+
+@receiver(pre_delete, sender=Categoria)
+def promover_subcategorias(sender, instance, **kwargs):
+    """
+    As filhas de uma categoria excluída viram raízes (on_delete=SET_NULL), então
+    o prefixo do caminho de toda a subárvore é cortado em um único UPDATE.
+    """
+    if not instance.caminho:
+        return
+    sender.objects.filter(caminho__startswith=instance.caminho).exclude(pk=instance.pk).update(
+        caminho=Concat(Value('/'), Substr('caminho', len(instance.caminho) + 1)),
+        nivel=F('nivel') - (instance.nivel + 1),
+    )
+
+
+@receiver([post_save, post_delete], sender=Lancamento)
+@receiver([post_save, post_delete], sender=Cofrinho)
+@receiver([post_save, post_delete], sender=CartaoCredito)
+@receiver([post_save, post_delete], sender=Categoria)
+@receiver([post_save, post_delete], sender=Fornecedor)
+@receiver([post_save, post_delete], sender=Recorrencia)
+@receiver([post_save, post_delete], sender=Fatura)
+def invalidar_cache_do_ledger(sender, raw=False, **kwargs):
+    """Qualquer escrita no ledger invalida os cálculos em cache (gerente/cache.py)."""
+    if not raw:
+        invalidar_ledger()
@@ -0,0 +1,48 @@
+// Selects com data-autocompletar (home/autocompletar.py): vêm só com a opção
+// selecionada e buscam as demais na URL do atributo conforme o usuário digita.
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-autocompletar]').forEach(function(select) {
+        const url = select.dataset.autocompletar;
+        const busca = document.createElement('input');
+        busca.type = 'search';
+        busca.className = 'form-control mb-1';
+        busca.placeholder = 'Digite para buscar...';
+        busca.autocomplete = 'off';
+        select.parentNode.insertBefore(busca, select);
+
+        let espera = null;
+        let ultimaBusca = null;
+
+        function carregar(termo) {
+            if (termo === ultimaBusca) {
+                return;
+            }
+            ultimaBusca = termo;
+            fetch(url + '?q=' + encodeURIComponent(termo), {headers: {'Accept': 'application/json'}})
+                .then(function(resposta) { return resposta.json(); })
+                .then(function(dados) {
+                    if (termo !== ultimaBusca) {
+                        return;  // chegou depois de uma busca mais nova
+                    }
+                    const selecionado = select.options[select.selectedIndex];
+                    const manter = Array.from(select.options).filter(function(opcao) {
+                        return opcao.value === '' || opcao === selecionado;
+                    });
+                    select.replaceChildren(...manter);
+                    dados.resultados.forEach(function(item) {
+                        if (selecionado && String(item.id) === selecionado.value) {
+                            return;
+                        }
+                        select.add(new Option(item.texto, item.id));
+                    });
+                });
+        }
+
+        busca.addEventListener('input', function() {
+            clearTimeout(espera);
+            espera = setTimeout(function() { carregar(busca.value.trim()); }, 200);
+        });
+        // Sem digitar nada, a primeira interação com o select traz as primeiras opções
+        select.addEventListener('focus', function() { carregar(busca.value.trim()); });
+    });
+});
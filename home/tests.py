@@ -1,3 +1,1113 @@
-from django.test import TestCase
+import io
+import random
+import re
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+
+from gerente.cache import estatisticas_cache, zerar_estatisticas
+from gerente.instrumentacao import OrcamentoConsultasTestMixin
+from gerente.utils import resumo_periodo
+
+from .autocompletar import _sugestoes, sugestoes
+from .benchmarks import executar_em_threads
+from .busca import buscar_por_relevancia, filtrar
+from .dados_sinteticos import gerar_dados_sinteticos
+from .forms import LancamentoForm
+from .importacao import importar_extrato
+from .models import Lancamento, CartaoCredito, Categoria, Cofrinho, CompraParcelada, Fatura, Fornecedor, Recorrencia, SaldoDiario, fechamento_do_ciclo, vencimento_da_fatura
+from .reconciliacao import divergencias_cofrinhos, divergencias_faturas, reconciliar
+from .recorrencias import gerar_recorrentes, prever_recorrentes, previsao_fluxo_caixa
+from .services import criar_compra_parcelada, criar_lancamentos_em_lote, excluir_compra_parcelada, excluir_lancamento, pagar_fatura, salvar_lancamento, transferir_para_cofrinho
+
+
+class LancamentoQueryPlanTests(TestCase):
+    """
+    Garante que as consultas quentes sobre Lancamento usam os índices
+    compostos em vez de varrer a tabela inteira.
+    """
+
+    VOLUME = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        cls.cartoes = CartaoCredito.objects.bulk_create([
+            CartaoCredito(
+                nome=f"Cartão {i}", limite_total=Decimal('5000.00'), limite_disponivel=Decimal('5000.00'),
+                dia_vencimento=10, dia_fechamento=3,
+            )
+            for i in range(20)
+        ])
+        metodos = [codigo for codigo, _ in Lancamento.PAGAMENTO_CHOICES]
+        hoje = date.today()
+
+        lancamentos = []
+        for i in range(cls.VOLUME):
+            metodo = rng.choice(metodos)
+            lancamentos.append(Lancamento(
+                descricao=f"Lançamento {i}",
+                tipo=rng.choice(['entrada', 'saida']),
+                valor=Decimal(rng.randint(100, 100000)) / 100,
+                data=hoje - timedelta(days=rng.randint(0, 5 * 365)),
+                metodo_pagamento=metodo,
+                cartao_credito=rng.choice(cls.cartoes) if metodo == 'cartao_credito' else None,
+            ))
+        Lancamento.objects.bulk_create(lancamentos, batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertSemScanSequencial(self, queryset):
+        plano = queryset.explain()
+        tabela = Lancamento._meta.db_table
+        if connection.vendor == 'postgresql':
+            scan_sequencial = re.search(rf'Seq Scan on "?{tabela}"?', plano)
+        else:
+            # SQLite: "SCAN tabela" sem "USING ... INDEX" é varredura completa.
+            scan_sequencial = re.search(rf'\bSCAN {tabela}\b(?! USING)', plano)
+        self.assertIsNone(scan_sequencial, f"Consulta caiu em scan sequencial:\n{queryset.query}\n{plano}")
+
+    def test_consultas_quentes_usam_indices(self):
+        fim = date.today()
+        inicio = fim - timedelta(days=30)
+        cartao = self.cartoes[0]
+
+        consultas = {
+            'total_entradas': Lancamento.objects.filter(tipo='entrada', data__gte=inicio, data__lte=fim),
+            'total_saidas': Lancamento.objects.filter(
+                tipo='saida', data__gte=inicio, data__lte=fim
+            ).exclude(metodo_pagamento='cartao_credito'),
+            'gasto_mes_cartao': Lancamento.objects.filter(cartao_credito=cartao, tipo='saida', data__gte=inicio),
+            'lancamentos_cartao': Lancamento.objects.filter(cartao_credito=cartao).order_by('-data'),
+            'relatorio_por_metodo': Lancamento.objects.filter(
+                data__gte=inicio, data__lte=fim, metodo_pagamento='pix'
+            ),
+            'periodo': Lancamento.objects.filter(data__gte=inicio, data__lte=fim),
+            'lista_recentes': Lancamento.objects.order_by('-data', '-id')[:50],
+        }
+        for nome, queryset in consultas.items():
+            with self.subTest(consulta=nome):
+                self.assertSemScanSequencial(queryset)
+
+
+class LimiteCartaoConcorrenciaTests(TransactionTestCase):
+    """
+    Várias threads comprando no mesmo cartão ao mesmo tempo: o limite final
+    tem que ser exato e nenhuma compra pode passar do limite.
+    """
+
+    THREADS = 8
+    COMPRAS_POR_THREAD = 25
+    VALOR = Decimal('10.00')
+
+    def test_compras_concorrentes_nao_perdem_atualizacoes(self):
+        total_compras = self.THREADS * self.COMPRAS_POR_THREAD
+        # Limite para só metade das compras: metade precisa ser recusada.
+        limite = self.VALOR * total_compras / 2
+        cartao = CartaoCredito.objects.create(
+            nome="Concorrência", limite_total=limite, limite_disponivel=limite,
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        aprovadas = []
+        recusadas = []
+
+        def comprar():
+            cartao_local = CartaoCredito.objects.get(pk=cartao.pk)
+            for _ in range(self.COMPRAS_POR_THREAD):
+                try:
+                    cartao_local.usar_limite(self.VALOR)
+                    aprovadas.append(1)
+                except ValidationError:
+                    recusadas.append(1)
+
+        duracao = executar_em_threads(comprar, self.THREADS)
+
+        cartao.refresh_from_db()
+        self.assertEqual(len(aprovadas), total_compras // 2)
+        self.assertEqual(len(recusadas), total_compras // 2)
+        self.assertEqual(cartao.limite_disponivel, Decimal('0.00'))
+        sys.stderr.write(
+            f"\n[limite] {total_compras} operações em {duracao:.3f}s "
+            f"({total_compras / duracao:.0f} ops/s, {self.THREADS} threads)\n"
+        )
+
+    def test_liberacoes_concorrentes_respeitam_limite_total(self):
+        cartao = CartaoCredito.objects.create(
+            nome="Estornos", limite_total=Decimal('100.00'), limite_disponivel=Decimal('0.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+
+        def estornar():
+            cartao_local = CartaoCredito.objects.get(pk=cartao.pk)
+            for _ in range(self.COMPRAS_POR_THREAD):
+                cartao_local.liberar_limite(self.VALOR)
+
+        executar_em_threads(estornar, self.THREADS)
+
+        cartao.refresh_from_db()
+        self.assertEqual(cartao.limite_disponivel, Decimal('100.00'))
+
+
+    def test_exclusoes_concorrentes_devolvem_o_limite_uma_vez(self):
+        cartao = CartaoCredito.objects.create(
+            nome="Exclusões", limite_total=Decimal('100.00'), limite_disponivel=Decimal('100.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        # Outra compra em aberto: o teto do limite total não esconde uma devolução em dobro
+        salvar_lancamento(Lancamento(
+            descricao="Outra compra", tipo='saida', valor=Decimal('50.00'), data=date(2025, 3, 1),
+            metodo_pagamento='cartao_credito', cartao_credito=cartao,
+        ))
+        compra = salvar_lancamento(Lancamento(
+            descricao="Compra", tipo='saida', valor=self.VALOR, data=date(2025, 3, 1),
+            metodo_pagamento='cartao_credito', cartao_credito=cartao,
+        ))
+
+        # Cada thread recebe uma cópia carregada antes de qualquer exclusão
+        copias = [Lancamento.objects.select_related('cartao_credito').get(pk=compra.pk) for _ in range(self.THREADS)]
+        executar_em_threads(lambda: excluir_lancamento(copias.pop()), self.THREADS)
+
+        cartao.refresh_from_db()
+        self.assertEqual(cartao.limite_disponivel, Decimal('50.00'))
+        self.assertFalse(Lancamento.objects.filter(pk=compra.pk).exists())
+
+
+class TransferenciaCofrinhoConcorrenciaTests(TransactionTestCase):
+    """
+    Transferências simultâneas para cofrinhos: nenhum crédito pode se perder e
+    o caixa não pode ficar negativo.
+    """
+
+    THREADS = 8
+    TRANSFERENCIAS_POR_THREAD = 10
+    VALOR = Decimal('10.00')
+
+    def test_transferencias_concorrentes_sem_perda_nem_saldo_negativo(self):
+        total = self.THREADS * self.TRANSFERENCIAS_POR_THREAD
+        # Caixa suficiente para só metade das transferências.
+        Lancamento.objects.create(
+            descricao="Aporte", tipo='entrada', valor=self.VALOR * total / 2,
+            data=date.today(), metodo_pagamento='dinheiro',
+        )
+        cofrinhos = [Cofrinho.objects.create(nome=f"Cofrinho {i}") for i in range(2)]
+        aprovadas = []
+
+        def transferir():
+            for i in range(self.TRANSFERENCIAS_POR_THREAD):
+                try:
+                    transferir_para_cofrinho(cofrinhos[i % 2], self.VALOR)
+                    aprovadas.append(1)
+                except ValidationError:
+                    pass
+
+        executar_em_threads(transferir, self.THREADS)
+
+        self.assertEqual(len(aprovadas), total // 2)
+        saldo_cofrinhos = sum(Cofrinho.objects.values_list('saldo', flat=True))
+        self.assertEqual(saldo_cofrinhos, self.VALOR * len(aprovadas))
+        self.assertEqual(Lancamento.objects.filter(cofrinho_destino__isnull=False).count(), len(aprovadas))
+        self.assertEqual(SaldoDiario.saldo_ate(date.today()), Decimal('0.00'))
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+
+class CacheLedgerTests(TestCase):
+    """O cache dos cálculos do dashboard é invalidado por qualquer escrita no ledger."""
+
+    def test_escrita_invalida_resumo_em_cache(self):
+        hoje = date.today()
+        zerar_estatisticas()
+        Lancamento.objects.create(
+            descricao="Venda", tipo='entrada', valor=Decimal('100.00'), data=hoje, metodo_pagamento='pix',
+        )
+        self.assertEqual(resumo_periodo(hoje, hoje)['entradas'], Decimal('100.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(resumo_periodo(hoje, hoje)['entradas'], Decimal('100.00'))
+
+        Lancamento.objects.create(
+            descricao="Venda", tipo='entrada', valor=Decimal('50.00'), data=hoje, metodo_pagamento='pix',
+        )
+        self.assertEqual(resumo_periodo(hoje, hoje)['entradas'], Decimal('150.00'))
+
+        estatisticas = estatisticas_cache()
+        self.assertEqual((estatisticas['acertos'], estatisticas['falhas']), (1, 2))
+
+
+class SaldoDiarioTests(TestCase):
+
+    DIAS = [date(2025, 3, 1) + timedelta(days=i) for i in range(12)]
+
+    def saldo_do_ledger(self, data):
+        lancamentos = Lancamento.objects.filter(data__lte=data)
+        entradas = lancamentos.filter(tipo='entrada').aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
+        saidas = lancamentos.filter(tipo='saida').exclude(
+            metodo_pagamento='cartao_credito'
+        ).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
+        return (entradas - saidas).quantize(Decimal('0.01'))
+
+    def assertSnapshotsBatemComLedger(self):
+        for dia in self.DIAS:
+            self.assertEqual(SaldoDiario.saldo_ate(dia), self.saldo_do_ledger(dia), dia)
+        recalculados = {s.data: s.saldo_acumulado for s in SaldoDiario.calcular_do_ledger()}
+        for data, saldo in recalculados.items():
+            self.assertEqual(SaldoDiario.saldo_ate(data), saldo, data)
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+    def test_signals_mantem_os_snapshots(self):
+        cartao = CartaoCredito.objects.create(
+            nome="Visa", limite_total=Decimal('500.00'), limite_disponivel=Decimal('500.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        venda = Lancamento.objects.create(
+            descricao="Venda", tipo='entrada', valor=Decimal('300.00'), data=self.DIAS[2], metodo_pagamento='pix',
+        )
+        aluguel = Lancamento.objects.create(
+            descricao="Aluguel", tipo='saida', valor=Decimal('120.00'), data=self.DIAS[5], metodo_pagamento='pix',
+        )
+        Lancamento.objects.create(
+            descricao="Troco", tipo='entrada', valor=Decimal('15.50'), data=self.DIAS[8], metodo_pagamento='dinheiro',
+        )
+        # Compra no cartão não movimenta o caixa
+        salvar_lancamento(Lancamento(
+            descricao="Farinha", tipo='saida', valor=Decimal('80.00'), data=self.DIAS[5],
+            metodo_pagamento='cartao_credito', cartao_credito=cartao,
+        ))
+        self.assertSnapshotsBatemComLedger()
+        self.assertEqual(SaldoDiario.saldo_ate(self.DIAS[11]), Decimal('195.50'))
+
+        # Editar valor e data de uma vez: sai de um dia e entra em outro, antes dele
+        aluguel.valor = Decimal('150.00')
+        aluguel.data = self.DIAS[1]
+        aluguel.save()
+        self.assertSnapshotsBatemComLedger()
+        self.assertEqual(SaldoDiario.saldo_ate(self.DIAS[1]), Decimal('-150.00'))
+
+        # E depois para um dia mais à frente
+        venda.data = self.DIAS[10]
+        venda.save()
+        self.assertSnapshotsBatemComLedger()
+
+        venda.delete()
+        self.assertSnapshotsBatemComLedger()
+        self.assertEqual(SaldoDiario.saldo_ate(self.DIAS[11]), Decimal('-134.50'))
+
+    def test_verificar_detecta_snapshot_corrompido(self):
+        for i, dia in enumerate(self.DIAS[:4]):
+            Lancamento.objects.create(
+                descricao=f"Venda {i}", tipo='entrada', valor=Decimal('10.00'), data=dia, metodo_pagamento='pix',
+            )
+        saida = io.StringIO()
+        call_command('recalcular_saldos', '--verificar', stdout=saida)
+        self.assertIn("consistentes", saida.getvalue())
+
+        SaldoDiario.objects.filter(data=self.DIAS[2]).update(saldo_acumulado=Decimal('999.00'))
+        saida = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "1 dia(s) divergente(s)"):
+            call_command('recalcular_saldos', '--verificar', stdout=saida)
+        self.assertIn("03/03/2025: gravado=", saida.getvalue())
+
+        call_command('recalcular_saldos', stdout=io.StringIO())
+        self.assertEqual(SaldoDiario.divergencias(), [])
+        self.assertEqual(SaldoDiario.saldo_ate(self.DIAS[2]), Decimal('30.00'))
+
+
+class PaginacaoKeysetTests(TestCase):
+
+    TAMANHO_PAGINA = 50  # LancamentoListView.paginate_by
+
+    @classmethod
+    def setUpTestData(cls):
+        # Três dias, o do meio com mais linhas que uma página inteira
+        quantidades = {date(2025, 3, 1): 20, date(2025, 3, 2): 70, date(2025, 3, 3): 15}
+        Lancamento.objects.bulk_create([
+            Lancamento(descricao=f"Venda {data} {i}", tipo='entrada', valor=Decimal('1.00'), data=data, metodo_pagamento='pix')
+            for data, quantidade in quantidades.items()
+            for i in range(quantidade)
+        ])
+        cls.esperado = list(Lancamento.objects.order_by('-data', '-id').values_list('id', flat=True))
+
+    def pagina(self, consulta=''):
+        resposta = self.client.get(reverse('lista_lancamentos') + consulta)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.context['page_obj']
+
+    def test_percorre_para_frente_e_para_tras_sem_repetir_nem_pular(self):
+        paginas = [self.pagina()]
+        self.assertFalse(paginas[0].has_previous())
+        while paginas[-1].has_next():
+            paginas.append(self.pagina(paginas[-1].url_proxima))
+        self.assertEqual(len(paginas), 3)
+        self.assertEqual([l.pk for pagina in paginas for l in pagina], self.esperado)
+
+        # Voltando da última página, cada página é igual à vista na ida
+        pagina = paginas[-1]
+        for anterior in reversed(paginas[:-1]):
+            pagina = self.pagina(pagina.url_anterior)
+            self.assertEqual([l.pk for l in pagina], [l.pk for l in anterior])
+        self.assertFalse(pagina.has_previous())
+        self.assertTrue(pagina.has_next())
+
+    def test_cursor_invalido_responde_404(self):
+        url = reverse('lista_lancamentos')
+        cursores = [
+            'lixo',
+            'WyIyMDI1LTAzLTAyIl0=',  # ["2025-03-02"]: falta o id
+            'WyIyMDI1LTAyLTMwIiwgIjEiXQ==',  # data inexistente
+            'WyIyMDI1LTAzLTAyIiwgImFiYyJd',  # id não numérico
+            'eyJkYXRhIjogMX0=',  # objeto em vez de lista
+        ]
+        for parametro in ('apos', 'antes'):
+            for cursor in cursores:
+                with self.subTest(parametro=parametro, cursor=cursor):
+                    self.assertEqual(self.client.get(url, {parametro: cursor}).status_code, 404)
+
+
+class CategoriaCaminhoTests(TestCase):
+    """Caminho materializado e nível mantidos no save() e na exclusão."""
+
+    def setUp(self):
+        # raiz -> meio -> folha -> neta, e outra raiz
+        self.raiz = Categoria.objects.create(nome="Despesas")
+        self.meio = Categoria.objects.create(nome="Insumos", categoria_pai=self.raiz)
+        self.folha = Categoria.objects.create(nome="Farinha", categoria_pai=self.meio)
+        self.neta = Categoria.objects.create(nome="Farinha integral", categoria_pai=self.folha)
+        self.outra = Categoria.objects.create(nome="Custos")
+
+    def caminhos(self):
+        return {c.nome: (c.caminho, c.nivel) for c in Categoria.objects.all()}
+
+    def test_caminho_na_criacao(self):
+        r, m, f, n = (c.pk for c in (self.raiz, self.meio, self.folha, self.neta))
+        self.assertEqual(self.caminhos()["Farinha integral"], (f"/{r}/{m}/{f}/{n}/", 3))
+        self.assertEqual(self.caminhos()["Custos"], (f"/{self.outra.pk}/", 0))
+
+    def test_mover_subarvore_reescreve_descendentes(self):
+        self.meio.categoria_pai = self.outra
+        self.meio.save()
+
+        o, m, f, n = (c.pk for c in (self.outra, self.meio, self.folha, self.neta))
+        caminhos = self.caminhos()
+        self.assertEqual(caminhos["Insumos"], (f"/{o}/{m}/", 1))
+        self.assertEqual(caminhos["Farinha"], (f"/{o}/{m}/{f}/", 2))
+        self.assertEqual(caminhos["Farinha integral"], (f"/{o}/{m}/{f}/{n}/", 3))
+        self.assertEqual(caminhos["Despesas"], (f"/{self.raiz.pk}/", 0))
+
+        # Virar raiz encurta o caminho de todos
+        self.meio.categoria_pai = None
+        self.meio.save()
+        self.assertEqual(self.caminhos()["Farinha integral"], (f"/{m}/{f}/{n}/", 2))
+
+    def test_excluir_no_do_meio_promove_as_filhas(self):
+        self.meio.delete()
+
+        f, n = self.folha.pk, self.neta.pk
+        caminhos = self.caminhos()
+        self.assertEqual(caminhos["Farinha"], (f"/{f}/", 0))
+        self.assertEqual(caminhos["Farinha integral"], (f"/{f}/{n}/", 1))
+        self.folha.refresh_from_db()
+        self.assertIsNone(self.folha.categoria_pai)
+        self.assertEqual(
+            set(Categoria.objects.filter(self.folha.filtro_subarvore(prefixo='')).values_list('nome', flat=True)),
+            {"Farinha", "Farinha integral"},
+        )
+
+    def test_recusa_ciclo(self):
+        for novo_pai in (self.meio, self.folha, self.neta):
+            with self.subTest(novo_pai=novo_pai.nome):
+                self.meio.categoria_pai = novo_pai
+                with self.assertRaises(ValidationError) as contexto:
+                    self.meio.full_clean()
+                self.assertIn('categoria_pai', contexto.exception.message_dict)
+
+        # Para outra subárvore ou para cima pode
+        self.neta.categoria_pai = self.raiz
+        self.neta.full_clean()
+        self.meio.refresh_from_db()
+        self.meio.categoria_pai = self.outra
+        self.meio.full_clean()
+
+
+class ReconciliacaoTests(TestCase):
+
+    def setUp(self):
+        hoje = date.today()
+        Lancamento.objects.create(
+            descricao="Venda", tipo='entrada', valor=Decimal('1000.00'), data=hoje, metodo_pagamento='pix',
+        )
+        self.cartao = CartaoCredito.objects.create(
+            nome="Visa", limite_total=Decimal('500.00'), limite_disponivel=Decimal('500.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        self.compra = salvar_lancamento(Lancamento(
+            descricao="Farinha", tipo='saida', valor=Decimal('120.00'), data=hoje,
+            metodo_pagamento='cartao_credito', cartao_credito=self.cartao,
+        ))
+        self.cofrinho = Cofrinho.objects.create(nome="Reserva")
+        transferir_para_cofrinho(self.cofrinho, Decimal('200.00'))
+
+        # Contadores fora do ledger
+        CartaoCredito.objects.filter(pk=self.cartao.pk).update(limite_disponivel=Decimal('400.00'))
+        Cofrinho.objects.filter(pk=self.cofrinho.pk).update(saldo=Decimal('150.00'))
+        Fatura.objects.filter(pk=self.compra.fatura_id).update(total=Decimal('100.00'), em_aberto=Decimal('90.00'))
+
+    def valores_gravados(self):
+        self.cartao.refresh_from_db()
+        self.cofrinho.refresh_from_db()
+        fatura = Fatura.objects.get(pk=self.compra.fatura_id)
+        return self.cartao.limite_disponivel, self.cofrinho.saldo, fatura.total, fatura.em_aberto
+
+    def test_relata_sem_corrigir_e_corrige(self):
+        resultado = reconciliar()
+        self.assertEqual(
+            [(d['gravado'], d['esperado']) for d in resultado['cartoes']], [(Decimal('400.00'), Decimal('380.00'))],
+        )
+        self.assertEqual(
+            [(d['gravado'], d['esperado']) for d in resultado['cofrinhos']], [(Decimal('150.00'), Decimal('200.00'))],
+        )
+        self.assertEqual(
+            [(d['total_gravado'], d['total_esperado'], d['gravado'], d['esperado']) for d in resultado['faturas']],
+            [(Decimal('100.00'), Decimal('120.00'), Decimal('90.00'), Decimal('120.00'))],
+        )
+        self.assertEqual(
+            self.valores_gravados(), (Decimal('400.00'), Decimal('150.00'), Decimal('100.00'), Decimal('90.00')),
+        )
+
+        reconciliar(corrigir=True)
+
+        self.assertEqual(
+            self.valores_gravados(), (Decimal('380.00'), Decimal('200.00'), Decimal('120.00'), Decimal('120.00')),
+        )
+        self.assertEqual(reconciliar(), {'cartoes': [], 'cofrinhos': [], 'faturas': []})
+
+    def test_correcao_preserva_escrita_entre_leitura_e_gravacao(self):
+        ler_cofrinhos = divergencias_cofrinhos
+
+        def ler_e_transferir():
+            divergencias = ler_cofrinhos()
+            # Transferência confirmada depois da leitura e antes da correção
+            transferir_para_cofrinho(self.cofrinho, Decimal('30.00'))
+            return divergencias
+
+        with mock.patch('home.reconciliacao.divergencias_cofrinhos', ler_e_transferir):
+            reconciliar(corrigir=True)
+
+        self.cofrinho.refresh_from_db()
+        self.assertEqual(self.cofrinho.saldo, Decimal('230.00'))
+        self.assertEqual(divergencias_cofrinhos(), [])
+
+    def test_comando(self):
+        saida = io.StringIO()
+        call_command('reconciliar', stdout=saida)
+        self.assertIn("3 divergência(s) encontrada(s)", saida.getvalue())
+        self.assertIn(f"Cartão #{self.cartao.pk} (Visa): gravado R$ 400.00, esperado R$ 380.00", saida.getvalue())
+        self.assertEqual(self.valores_gravados()[0], Decimal('400.00'))
+
+        saida = io.StringIO()
+        call_command('reconciliar', '--corrigir', stdout=saida)
+        self.assertIn("3 divergência(s) corrigida(s).", saida.getvalue())
+        self.assertIn("total da fatura: gravado R$ 100.00, esperado R$ 120.00", saida.getvalue())
+
+        saida = io.StringIO()
+        call_command('reconciliar', stdout=saida)
+        self.assertIn("Nenhuma divergência encontrada.", saida.getvalue())
+
+
+class ImportarExtratoTests(TestCase):
+
+    CSV = [
+        "data;descricao;valor;categoria;fornecedor\n",
+        "05/03/2025;Venda balcão;1.200,50;Vendas;\n",
+        "06/03/2025;Compra de farinha;-300,00;Insumos;Moinho\n",
+        "01/02/2025;Aluguel;-900.00;;\n",
+    ]
+
+    OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250310120000[-3:BRT]
+<TRNAMT>-45.90
+<FITID>1
+<MEMO>Padaria
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250311
+<TRNAMT>-54.10
+<FITID>2
+<NAME>Posto
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+    def test_csv_resolve_referencias_e_atualiza_saldos(self):
+        vendas = Categoria.objects.create(nome="Vendas")
+        insumos = Categoria.objects.create(nome="Insumos")
+        moinho = Fornecedor.objects.create(nome="Moinho")
+
+        resultado = importar_extrato(self.CSV, formato='csv', metodo_pagamento='pix', tamanho_lote=2)
+
+        self.assertEqual(resultado['importados'], 3)
+        self.assertEqual(resultado['entradas'], Decimal('1200.50'))
+        self.assertEqual(resultado['saidas'], Decimal('1200.00'))
+        compra = Lancamento.objects.get(descricao="Compra de farinha")
+        self.assertEqual((compra.tipo, compra.valor, compra.categoria, compra.fornecedor), ('saida', Decimal('300.00'), insumos, moinho))
+        self.assertEqual(Lancamento.objects.get(descricao="Venda balcão").categoria, vendas)
+        self.assertEqual(SaldoDiario.divergencias(), [])
+        self.assertEqual(SaldoDiario.saldo_ate(date(2025, 3, 31)), Decimal('0.50'))
+
+    def test_ofx_como_fatura_consome_limite_uma_vez_por_cartao(self):
+        cartao = CartaoCredito.objects.create(
+            nome="Fatura", limite_total=Decimal('500.00'), limite_disponivel=Decimal('500.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+
+        importar_extrato(self.OFX.splitlines(keepends=True), formato='ofx', cartao=cartao)
+
+        cartao.refresh_from_db()
+        self.assertEqual(cartao.limite_disponivel, Decimal('400.00'))
+        self.assertEqual(
+            list(Lancamento.objects.order_by('data').values_list('descricao', 'data', 'metodo_pagamento')),
+            [('Padaria', date(2025, 3, 10), 'cartao_credito'), ('Posto', date(2025, 3, 11), 'cartao_credito')],
+        )
+        # Compras no cartão não movimentam o caixa
+        self.assertFalse(SaldoDiario.objects.exists())
+
+    def test_upload_com_quebra_de_linha_dentro_de_campo(self):
+        conteudo = (
+            'data;descricao;valor\r\n'
+            '05/03/2025;"Venda balcão\r\nmesa 2";100,00\r\n'
+            '06/03/2025;Troco;-10,00\r\n'
+        ).encode('utf-8-sig')
+        resposta = self.client.post(reverse('importar_extrato'), {
+            'arquivo': SimpleUploadedFile('extrato.csv', conteudo), 'metodo_pagamento': 'pix',
+        })
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(
+            list(Lancamento.objects.order_by('data').values_list('descricao', 'valor')),
+            [("Venda balcão\r\nmesa 2", Decimal('100.00')), ("Troco", Decimal('10.00'))],
+        )
+
+    def test_linha_invalida_desfaz_importacao(self):
+        linhas = self.CSV + ["31/02/2025;Data impossível;10,00;;\n"]
+        with self.assertRaisesMessage(ValidationError, "Linha 5"):
+            importar_extrato(linhas, formato='csv', tamanho_lote=2)
+        self.assertFalse(Lancamento.objects.exists())
+        self.assertFalse(SaldoDiario.objects.exists())
+
+    def test_compra_no_cartao_sem_cartao_escolhido_e_recusada(self):
+        linhas = [
+            "data;descricao;valor;metodo_pagamento\n",
+            "05/03/2025;Venda balcão;100,00;pix\n",
+            "06/03/2025;Farinha;-30,00;cartao_credito\n",
+        ]
+        with self.assertRaisesMessage(ValidationError, "Linha 3"):
+            importar_extrato(linhas, formato='csv')
+        with self.assertRaisesMessage(ValidationError, "Escolha o cartão"):
+            importar_extrato(linhas[:2], formato='csv', metodo_pagamento='cartao_credito')
+        self.assertFalse(Lancamento.objects.exists())
+
+
+class DuplicidadeLancamentoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fornecedor = Fornecedor.objects.create(nome="Moinho")
+        cls.original = Lancamento.objects.create(
+            descricao="Compra de Farinha", tipo='saida', valor=Decimal('300.00'),
+            data=date(2025, 3, 6), metodo_pagamento='pix', fornecedor=cls.fornecedor,
+        )
+
+    def dados_formulario(self, **extra):
+        dados = {
+            'descricao': "  compra de farinha!", 'tipo': 'saida', 'valor': '300.00', 'data': '2025-03-06',
+            'metodo_pagamento': 'pix', 'fornecedor': self.fornecedor.pk,
+        }
+        dados.update(extra)
+        return dados
+
+    def test_formulario_recusa_duplicado_com_descricao_normalizada(self):
+        form = LancamentoForm(data=self.dados_formulario())
+        self.assertFalse(form.is_valid())
+        self.assertIn("Já existe um lançamento igual", form.non_field_errors()[0])
+
+        self.assertTrue(LancamentoForm(data=self.dados_formulario(ignorar_duplicidade='on')).is_valid())
+        self.assertTrue(LancamentoForm(data=self.dados_formulario(valor='300.01')).is_valid())
+        # Estorno (entrada) com os mesmos dados da compra não é duplicidade
+        self.assertTrue(LancamentoForm(data=self.dados_formulario(tipo='entrada')).is_valid())
+        # Editar o próprio lançamento não é duplicidade
+        self.assertTrue(LancamentoForm(data=self.dados_formulario(), instance=self.original).is_valid())
+
+    def test_importacao_ignora_lancamentos_ja_existentes(self):
+        linhas = [
+            "data;descricao;valor;fornecedor\n",
+            "06/03/2025;Compra de farinha;-300,00;Moinho\n",
+            "07/03/2025;Café;-5,00;\n",
+            "07/03/2025;Café;-5,00;\n",
+        ]
+        resultado = importar_extrato(linhas, formato='csv', metodo_pagamento='pix', tamanho_lote=2)
+        self.assertEqual((resultado['importados'], resultado['duplicados']), (2, 1))
+
+        resultado = importar_extrato(linhas, formato='csv', metodo_pagamento='pix')
+        self.assertEqual((resultado['importados'], resultado['duplicados']), (0, 3))
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+    def test_relatorio_de_duplicados(self):
+        Lancamento.objects.create(
+            descricao="compra de farinha", tipo='saida', valor=Decimal('300'),
+            data=date(2025, 3, 6), metodo_pagamento='dinheiro', fornecedor=self.fornecedor,
+        )
+        saida = io.StringIO()
+        call_command('relatorio_duplicados', stdout=saida)
+        self.assertIn("06/03/2025 R$ 300.00 \"Compra de Farinha\" (Moinho): 2x", saida.getvalue())
+        self.assertIn("1 grupo(s) de duplicados", saida.getvalue())
+
+
+class OrcamentoConsultasTests(OrcamentoConsultasTestMixin, TestCase):
+    """
+    Toda view HTML de home e relatorios declara `orcamento_consultas` e o
+    cumpre com mais de uma linha em cada tabela, então um N+1 estoura o orçamento.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados_sinteticos(90, fornecedores=3, cartoes=3, cofrinhos=3, dias=60)
+        cls.objetos = {
+            'lancamento': Lancamento.objects.first(),
+            'categoria': Categoria.objects.filter(categoria_pai__isnull=False).first(),
+            'fornecedor': Fornecedor.objects.first(),
+            'cartao': CartaoCredito.objects.first(),
+            'cofrinho': Cofrinho.objects.first(),
+        }
+
+    def urls_html(self):
+        for prefixo, modulo in (('', 'home.urls'), ('relatorios:', 'relatorios.urls')):
+            for padrao in get_resolver(modulo).url_patterns:
+                if not isinstance(padrao, URLPattern) or not hasattr(padrao.callback.view_class, 'get'):
+                    continue
+                # O sufixo do nome da rota diz o objeto: editar_lancamento, detalhes_cartao...
+                kwargs = {'pk': self.objetos[padrao.name.rsplit('_', 1)[1]].pk} if 'pk' in padrao.pattern.converters else {}
+                yield reverse(prefixo + padrao.name, kwargs=kwargs)
+
+    def test_views_cumprem_o_orcamento(self):
+        urls = list(self.urls_html())
+        self.assertGreater(len(urls), 20)
+        for url in urls:
+            with self.subTest(url=url):
+                resposta = self.assertDentroDoOrcamento(url, data={'data_inicio': '2020-01-01', 'data_fim': '2030-12-31'})
+                self.assertEqual(resposta.status_code, 200)
+
+    def test_server_timing_e_log_estruturado(self):
+        with self.assertLogs('gerente.instrumentacao', level='INFO') as logs:
+            resposta = self.client.get(reverse('lista_lancamentos'))
+        self.assertRegex(resposta['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn('"view": "home.views.LancamentoListView"', logs.output[0])
+        self.assertIn('"consultas_lentas": [{"ms"', logs.output[0])
+
+
+class DadosSinteticosTests(TestCase):
+
+    def test_ledger_gerado_e_consistente(self):
+        gerar_dados_sinteticos(500, fornecedores=10, cartoes=2, cofrinhos=2, dias=90, lote=120)
+
+        self.assertEqual(Lancamento.objects.count(), 500)
+        self.assertEqual(Fornecedor.objects.count(), 10)
+        self.assertEqual(SaldoDiario.divergencias(), [])
+        self.assertEqual(
+            resumo_periodo.sem_cache(date.today() - timedelta(days=90), date.today())['entradas'],
+            Lancamento.objects.filter(tipo='entrada').aggregate(total=Sum('valor'))['total'].quantize(Decimal('0.01')),
+        )
+        for cartao in CartaoCredito.objects.all():
+            em_aberto = sum(l.valor for l in cartao.lancamentos.all() if l.consome_limite())
+            self.assertEqual(cartao.limite_usado(), em_aberto)
+            self.assertGreaterEqual(cartao.limite_disponivel, 0)
+        self.assertEqual(divergencias_faturas(), [])
+
+        # Rodar de novo acrescenta lançamentos e reaproveita o resto
+        gerar_dados_sinteticos(100, fornecedores=10, cartoes=2, cofrinhos=2, semente=7)
+        self.assertEqual(Lancamento.objects.count(), 600)
+        self.assertEqual(CartaoCredito.objects.count(), 2)
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+
+class BuscaTests(OrcamentoConsultasTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = date.today()
+        cls.aluguel = Lancamento.objects.create(
+            descricao="Aluguel da loja", tipo='saida', valor=Decimal('1500.00'), data=cls.hoje,
+            metodo_pagamento='pix', observacoes="Referente a março",
+        )
+        cls.energia = Lancamento.objects.create(
+            descricao="Energia elétrica", tipo='saida', valor=Decimal('300.00'), data=cls.hoje,
+            metodo_pagamento='pix', observacoes="Conta de luz da loja",
+        )
+        cls.venda = Lancamento.objects.create(
+            descricao="Venda balcão", tipo='entrada', valor=Decimal('80.00'), data=cls.hoje - timedelta(days=3),
+            metodo_pagamento='dinheiro',
+        )
+
+    def encontrados(self, termo, lancamentos=None):
+        return set(filtrar(lancamentos or Lancamento.objects.all(), termo))
+
+    def test_prefixo_sem_acentos_e_observacoes(self):
+        self.assertEqual(self.encontrados("alug"), {self.aluguel})
+        self.assertEqual(self.encontrados("eletrica"), {self.energia})
+        self.assertEqual(self.encontrados("MARCO"), {self.aluguel})
+        self.assertEqual(self.encontrados("loja"), {self.aluguel, self.energia})
+        self.assertEqual(self.encontrados("loja luz"), {self.energia})
+        # Sintaxe do FTS5 digitada pelo usuário é tratada como texto
+        self.assertEqual(self.encontrados('"loja*: ('), {self.aluguel, self.energia})
+        self.assertEqual(self.encontrados("  "), set())
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        self.venda.descricao = "Venda de bolo"
+        self.venda.save()
+        self.assertEqual(self.encontrados("bolo"), {self.venda})
+        self.assertEqual(self.encontrados("balcao"), set())
+
+        self.energia.delete()
+        self.assertEqual(self.encontrados("luz"), set())
+
+        Lancamento.objects.bulk_create([Lancamento(
+            descricao="Frete do bolo", tipo='saida', valor=Decimal('20.00'), data=self.hoje, metodo_pagamento='pix',
+        )])
+        self.assertEqual(len(self.encontrados("bolo")), 2)
+
+    def test_relevancia_e_filtros(self):
+        Lancamento.objects.create(
+            descricao="Loja: reforma da loja", tipo='saida', valor=Decimal('900.00'), data=self.hoje - timedelta(days=10),
+            metodo_pagamento='pix', observacoes="Pintura da loja",
+        )
+        resultado = buscar_por_relevancia(Lancamento.objects.all(), "loja", 10)
+        self.assertEqual(resultado[0].descricao, "Loja: reforma da loja")
+        self.assertEqual(len(resultado), 3)
+        self.assertGreaterEqual(resultado[0].relevancia, resultado[1].relevancia)
+
+        recentes = buscar_por_relevancia(Lancamento.objects.filter(data__gte=self.hoje), "loja", 10)
+        self.assertEqual(set(recentes), {self.aluguel, self.energia})
+        self.assertEqual(buscar_por_relevancia(Lancamento.objects.all(), "loja", 10, deslocamento=2), resultado[2:])
+
+    def test_lista_de_lancamentos_filtra_pela_busca(self):
+        resposta = self.assertDentroDoOrcamento(reverse('lista_lancamentos'), data={'q': 'venda'})
+        self.assertEqual(list(resposta.context['lancamentos']), [self.venda])
+        self.assertContains(resposta, 'value="venda"')
+
+
+class AutocompletarTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.despesas = Categoria.objects.create(nome="Despesas")
+        cls.energia = Categoria.objects.create(nome="Energia elétrica", categoria_pai=cls.despesas)
+        for i in range(30):
+            Fornecedor.objects.create(nome=f"Fornecedor {i:03d}")
+        cls.eletro = Fornecedor.objects.create(nome="Élétro Sul Ltda.")
+        Fornecedor.objects.create(nome="Elevadores Norte")
+
+    def setUp(self):
+        _sugestoes.cache_clear()
+
+    def test_prefixo_sem_acentos_e_limitado(self):
+        self.assertEqual([texto for _, texto in sugestoes('fornecedores', 'ELE')], ["Élétro Sul Ltda.", "Elevadores Norte"])
+        self.assertEqual(sugestoes('fornecedores', 'eletro s'), ((self.eletro.pk, "Élétro Sul Ltda."),))
+        self.assertEqual(len(sugestoes('fornecedores', '')), 20)
+        self.assertEqual(sugestoes('categorias', 'energia'), ((self.energia.pk, "Despesas -> Energia elétrica"),))
+        self.assertEqual(sugestoes('fornecedores', 'zz'), ())
+
+    def test_lru_por_processo_invalidado_por_escrita(self):
+        sugestoes('fornecedores', 'ele')
+        with self.assertNumQueries(0):
+            sugestoes('fornecedores', 'Elé')
+        Fornecedor.objects.create(nome="Elétrica Central")
+        self.assertEqual(len(sugestoes('fornecedores', 'ele')), 3)
+
+    def test_endpoint_e_formulario_sem_lista_completa(self):
+        resposta = self.client.get(reverse('autocompletar_categorias'), {'q': 'desp'})
+        self.assertEqual(resposta.json(), {'resultados': [{'id': self.despesas.pk, 'texto': "Despesas"}]})
+
+        lancamento = Lancamento.objects.create(
+            descricao="Conta de luz", tipo='saida', valor=Decimal('100.00'), data=date.today(),
+            metodo_pagamento='pix', fornecedor=self.eletro, categoria=self.energia,
+        )
+        formulario = str(LancamentoForm(instance=lancamento)['fornecedor'])
+        self.assertIn(f'data-autocompletar="{reverse("autocompletar_fornecedores")}"', formulario)
+        self.assertEqual(re.findall(r'<option value="(\d*)"', formulario), ['', str(self.eletro.pk)])
+
+
+class RecorrenciaTests(TestCase):
+
+    def test_datas_mensais_do_dia_31_nao_escorregam(self):
+        regra = Recorrencia(descricao="Aluguel", tipo='saida', valor=Decimal('1000.00'), data_inicio=date(2025, 1, 31))
+        self.assertEqual(
+            list(regra.datas(date(2025, 1, 1), date(2025, 5, 31))),
+            [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30), date(2025, 5, 31)],
+        )
+        quinzenal = Recorrencia(frequencia='semanal', intervalo=2, data_inicio=date(2025, 1, 6), data_fim=date(2025, 2, 10))
+        self.assertEqual(
+            list(quinzenal.datas(date(2025, 1, 7), date(2025, 12, 31))),
+            [date(2025, 1, 20), date(2025, 2, 3)],
+        )
+
+    def test_gerar_e_idempotente_e_atualiza_o_caixa(self):
+        aluguel = Recorrencia.objects.create(
+            descricao="Aluguel", tipo='saida', valor=Decimal('1000.00'), metodo_pagamento='pix',
+            data_inicio=date(2025, 1, 31), data_fim=date(2025, 6, 30),
+        )
+        salario = Recorrencia.objects.create(
+            descricao="Pró-labore", tipo='entrada', valor=Decimal('5000.00'), metodo_pagamento='pix',
+            data_inicio=date(2025, 1, 5),
+        )
+
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = gerar_recorrentes(date(2025, 3, 31))
+        self.assertEqual(resultado['criados'], 6)
+        inserts = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('INSERT INTO "home_lancamento"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(gerar_recorrentes(date(2025, 3, 31))['criados'], 0)
+
+        # Mesmo com proxima_data voltada para trás, nada é duplicado
+        Recorrencia.objects.filter(pk=salario.pk).update(proxima_data=date(2025, 1, 5))
+        self.assertEqual(gerar_recorrentes(date(2025, 4, 30))['criados'], 2)
+        self.assertEqual(salario.lancamentos.count(), 4)
+        self.assertEqual(SaldoDiario.saldo_ate(date(2025, 4, 30)), Decimal('16000.00'))
+        self.assertEqual(SaldoDiario.divergencias(), [])
+
+        gerar_recorrentes(date(2025, 12, 31))
+        aluguel.refresh_from_db()
+        self.assertEqual(aluguel.lancamentos.count(), 6)
+        self.assertFalse(aluguel.ativa)
+        self.assertIsNone(aluguel.proxima_data)
+
+    def test_ocorrencia_recusada_pelo_limite_fica_para_a_proxima_execucao(self):
+        cartao = CartaoCredito.objects.create(
+            nome="Visa", limite_total=Decimal('100.00'), limite_disponivel=Decimal('100.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        assinatura = Recorrencia.objects.create(
+            descricao="Software", tipo='saida', valor=Decimal('60.00'), metodo_pagamento='cartao_credito',
+            cartao_credito=cartao, data_inicio=date(2025, 1, 10),
+        )
+        resultado = gerar_recorrentes(date(2025, 2, 28))
+        self.assertEqual((resultado['criados'], len(resultado['recusados'])), (1, 1))
+        assinatura.refresh_from_db()
+        self.assertEqual(assinatura.proxima_data, date(2025, 2, 10))
+
+        CartaoCredito.objects.filter(pk=cartao.pk).update(limite_disponivel=Decimal('100.00'))
+        self.assertEqual(gerar_recorrentes(date(2025, 2, 28))['criados'], 1)
+        self.assertEqual(assinatura.lancamentos.count(), 2)
+
+    def test_previsao_bate_com_o_que_sera_lancado(self):
+        Recorrencia.objects.create(
+            descricao="Pró-labore", tipo='entrada', valor=Decimal('5000.00'), metodo_pagamento='pix',
+            data_inicio=date(2025, 1, 5),
+        )
+        Recorrencia.objects.create(
+            descricao="Seguro", tipo='saida', valor=Decimal('1200.00'), metodo_pagamento='pix',
+            frequencia='anual', data_inicio=date(2025, 3, 15),
+        )
+        with self.assertNumQueries(1):
+            previstos = prever_recorrentes(date(2025, 1, 1), date(2025, 6, 30))
+        self.assertEqual(sum(saidas for _, saidas in previstos.values()), Decimal('1200.00'))
+
+        previsao = previsao_fluxo_caixa(3, hoje=date(2025, 2, 10))
+        self.assertEqual([mes['mes'] for mes in previsao], [date(2025, 2, 1), date(2025, 3, 1), date(2025, 4, 1)])
+        # 05/01 e 05/02 já venceram sem ser lançadas (cron atrasado): entram amanhã, não somem
+        self.assertEqual(previsao[0]['entradas'], Decimal('10000.00'))
+        self.assertEqual([mes['saldo_final'] for mes in previsao], [Decimal('10000.00'), Decimal('13800.00'), Decimal('18800.00')])
+
+        # Depois de lançadas, as mesmas ocorrências vêm do saldo atual, sem contar duas vezes
+        gerar_recorrentes(date(2025, 2, 10))
+        previsao = previsao_fluxo_caixa(3, hoje=date(2025, 2, 10))
+        self.assertEqual(previsao[0]['entradas'], Decimal('0.00'))
+        self.assertEqual([mes['saldo_final'] for mes in previsao], [Decimal('10000.00'), Decimal('13800.00'), Decimal('18800.00')])
+
+        gerar_recorrentes(date(2025, 6, 30))
+        self.assertEqual(SaldoDiario.saldo_ate(date(2025, 6, 30)), Decimal('28800.00'))
+
+
+class FaturaTests(OrcamentoConsultasTestMixin, TestCase):
+
+    def setUp(self):
+        self.cartao = CartaoCredito.objects.create(
+            nome="Visa", limite_total=Decimal('1000.00'), limite_disponivel=Decimal('1000.00'),
+            dia_vencimento=5, dia_fechamento=31,
+        )
+
+    def compra(self, data, valor='100.00'):
+        return salvar_lancamento(Lancamento(
+            descricao=f"Compra {data}", tipo='saida', valor=Decimal(valor), data=data,
+            metodo_pagamento='cartao_credito', cartao_credito=self.cartao,
+        ))
+
+    def test_ciclos_com_dia_31_em_meses_curtos(self):
+        self.assertEqual(fechamento_do_ciclo(31, date(2025, 2, 10)), date(2025, 2, 28))
+        # No dia do fechamento a compra já vai para a fatura seguinte
+        self.assertEqual(fechamento_do_ciclo(31, date(2025, 2, 28)), date(2025, 3, 31))
+        self.assertEqual(fechamento_do_ciclo(31, date(2025, 12, 31)), date(2026, 1, 31))
+        self.assertEqual(vencimento_da_fatura(5, date(2025, 2, 28)), date(2025, 3, 5))
+        self.assertEqual(vencimento_da_fatura(31, date(2025, 4, 10)), date(2025, 4, 30))
+        self.assertEqual(self.cartao.proximo_vencimento(date(2025, 3, 3)), date(2025, 3, 5))
+        self.assertEqual(self.cartao.proximo_vencimento(date(2025, 3, 6)), date(2025, 4, 5))
+
+    def test_totais_mantidos_em_cada_caminho(self):
+        fevereiro = self.compra(date(2025, 2, 10))
+        self.compra(date(2025, 2, 27), '50.00')
+        marco = self.compra(date(2025, 2, 28), '30.00')
+        criar_lancamentos_em_lote([Lancamento(
+            descricao="Lote", tipo='saida', valor=Decimal('20.00'), data=date(2025, 3, 1),
+            metodo_pagamento='cartao_credito', cartao_credito=self.cartao,
+        )])
+        faturas = {f.fechamento: (f.total, f.em_aberto) for f in self.cartao.faturas.all()}
+        self.assertEqual(faturas, {
+            date(2025, 2, 28): (Decimal('150.00'), Decimal('150.00')),
+            date(2025, 3, 31): (Decimal('50.00'), Decimal('50.00')),
+        })
+
+        # Mudar a data move a compra de fatura; excluir tira o valor
+        fevereiro.data = date(2025, 3, 10)
+        salvar_lancamento(fevereiro)
+        excluir_lancamento(marco)
+        faturas = {f.fechamento: f.total for f in self.cartao.faturas.all()}
+        self.assertEqual(faturas, {date(2025, 2, 28): Decimal('50.00'), date(2025, 3, 31): Decimal('120.00')})
+        self.assertEqual(divergencias_faturas(), [])
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_usado(), self.cartao.faturas.aggregate(s=Sum('em_aberto'))['s'])
+
+    def test_pagar_fatura_libera_o_limite_dela(self):
+        hoje = date.today()
+        fechada = self.compra(hoje - relativedelta(months=2), '300.00').fatura
+        aberta = self.compra(hoje, '200.00').fatura
+        self.assertTrue(fechada.esta_fechada(hoje))
+
+        with self.assertRaises(ValidationError):
+            pagar_fatura(aberta)
+        resposta = self.client.post(reverse('pagar_fatura', kwargs={'pk': self.cartao.pk, 'fatura_pk': fechada.pk}), follow=True)
+        self.assertContains(resposta, 'paga: R$ 300.00')
+
+        fechada.refresh_from_db()
+        self.cartao.refresh_from_db()
+        self.assertEqual((fechada.em_aberto, fechada.data_pagamento), (Decimal('0.00'), hoje))
+        self.assertFalse(fechada.lancamentos.filter(quitado=False).exists())
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('800.00'))
+        with self.assertRaises(ValidationError):
+            pagar_fatura(fechada)
+
+    def test_detalhes_paginados_por_fatura(self):
+        hoje = date.today()
+        lancamentos = [
+            Lancamento(
+                descricao=f"Compra {i}", tipo='saida', valor=Decimal('1.00'), data=hoje - timedelta(days=i),
+                metodo_pagamento='cartao_credito', cartao_credito=self.cartao,
+            )
+            for i in range(80)
+        ]
+        criar_lancamentos_em_lote(lancamentos)
+        fatura = self.cartao.faturas.order_by('-fechamento')[1]
+
+        url = reverse('detalhes_cartao', kwargs={'pk': self.cartao.pk})
+        resposta = self.assertDentroDoOrcamento(url)
+        self.assertEqual(len(resposta.context['lancamentos']), 30)
+        self.assertTrue(resposta.context['page_obj'].has_next())
+
+        resposta = self.assertDentroDoOrcamento(url, data={'fatura': fatura.pk})
+        self.assertEqual({l.fatura_id for l in resposta.context['lancamentos']}, {fatura.pk})
+        self.assertEqual(len(resposta.context['lancamentos']), min(30, fatura.lancamentos.count()))
+        self.assertEqual(resposta.context['fatura_selecionada'], fatura)
+
+
+class CompraParceladaTests(TestCase):
+
+    def setUp(self):
+        self.cartao = CartaoCredito.objects.create(
+            nome="Master", limite_total=Decimal('1000.00'), limite_disponivel=Decimal('1000.00'),
+            dia_vencimento=10, dia_fechamento=31,
+        )
+
+    def parcelar(self, valor, parcelas, data):
+        return CompraParcelada(
+            descricao="Geladeira", valor_total=Decimal(valor), numero_parcelas=parcelas, data=data,
+            cartao_credito=self.cartao,
+        )
+
+    def test_uma_parcela_por_fatura_e_uma_reserva_de_limite(self):
+        with CaptureQueriesContext(connection) as consultas:
+            parcelas = criar_compra_parcelada(self.parcelar('1000.00', 3, date(2025, 1, 30)))
+        reservas = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('UPDATE "home_cartaocredito"')]
+        self.assertEqual(len(reservas), 1)
+        inserts = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('INSERT INTO "home_lancamento"')]
+        self.assertEqual(len(inserts), 1)
+
+        # Centavos que sobram na primeira; o dia 31 cai no fim de fevereiro sem pular a fatura
+        self.assertEqual([p.valor for p in parcelas], [Decimal('333.34'), Decimal('333.33'), Decimal('333.33')])
+        self.assertEqual(
+            list(self.cartao.faturas.order_by('fechamento').values_list('fechamento', 'total')),
+            [(date(2025, 1, 31), Decimal('333.34')), (date(2025, 2, 28), Decimal('333.33')), (date(2025, 3, 31), Decimal('333.33'))],
+        )
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('0.00'))
+
+        # Sem limite para outra compra parcelada: nada é gravado
+        with self.assertRaises(ValidationError):
+            criar_compra_parcelada(self.parcelar('10.00', 2, date(2025, 1, 30)))
+        self.assertEqual(CompraParcelada.objects.count(), 1)
+
+    def test_admin_nao_edita_a_compra(self):
+        compra = self.parcelar('300.00', 3, date(2025, 1, 10))
+        criar_compra_parcelada(compra)
+        self.client.force_login(User.objects.create_superuser('admin', password='senha'))
+        url = reverse('admin:home_compraparcelada_change', args=[compra.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        resposta = self.client.post(url, {'descricao': "Fogão", 'observacoes': "trocado"})
+        self.assertEqual(resposta.status_code, 403)
+        compra.refresh_from_db()
+        self.assertEqual(compra.descricao, "Geladeira")
+
+    def test_pagar_fatura_libera_so_a_parcela_dela(self):
+        hoje = date.today()
+        compra = self.parcelar('600.00', 6, hoje - relativedelta(months=1))
+        criar_compra_parcelada(compra)
+        primeira = Fatura.objects.get(lancamentos__parcela=1)
+        pagar_fatura(primeira)
+
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('500.00'))
+        self.assertEqual(self.cartao.limite_usado(), self.cartao.faturas.aggregate(s=Sum('em_aberto'))['s'])
+        self.assertEqual(divergencias_faturas(), [])
+
+        excluir_compra_parcelada(compra)
+        self.cartao.refresh_from_db()
+        self.assertEqual(self.cartao.limite_disponivel, Decimal('1000.00'))
+        self.assertFalse(Lancamento.objects.exists())
+        self.assertEqual(set(self.cartao.faturas.values_list('total', flat=True)), {Decimal('0.00')})
+
+    def test_formulario_cria_as_parcelas(self):
+        dados = {
+            'descricao': 'Notebook', 'tipo': 'saida', 'valor': '900.00', 'data': '2025-03-10',
+            'metodo_pagamento': 'cartao_credito', 'cartao_credito': self.cartao.pk, 'parcelas': 3,
+        }
+        resposta = self.client.post(reverse('adicionar_lancamento'), dados, follow=True)
+        self.assertContains(resposta, 'Compra parcelada em 3x')
+        self.assertEqual(
+            list(Lancamento.objects.order_by('parcela').values_list('descricao', 'data')),
+            [('Notebook (1/3)', date(2025, 3, 10)), ('Notebook (2/3)', date(2025, 3, 31)), ('Notebook (3/3)', date(2025, 4, 30))],
+        )
+
+        resposta = self.client.post(reverse('adicionar_lancamento'), {**dados, 'metodo_pagamento': 'pix', 'descricao': 'Outro'})
+        self.assertFormError(resposta.context['form'], 'parcelas', "Só compras no cartão de crédito podem ser parceladas.")
 
-# Create your tests here.
@@ -1,11 +1,11 @@
 from django.urls import path
 from .views import (
     HomeView,
-    LancamentoListView, LancamentoCreateView, LancamentoUpdateView, LancamentoDeleteView,
+    LancamentoListView, LancamentoCreateView, LancamentoUpdateView, LancamentoDeleteView, ImportarExtratoView, AutocompletarView,
     FornecedorListView, FornecedorCreateView, FornecedorUpdateView, FornecedorDeleteView,
     CategoriaListView, CategoriaCreateView, CategoriaUpdateView, CategoriaDeleteView,
     CofrinhoListView, CofrinhoCreateView, CofrinhoUpdateView, CofrinhoDeleteView, TransferirParaCofrinhoView,
-    TransferirParaCofrinhoView, CartaoCreditoCreateView, CartaoCreditoDeleteView, CartaoCreditoDetailView, CartaoCreditoListView, CartaoCreditoUpdateView, ResetarLimiteCartaoView
+    TransferirParaCofrinhoView, CartaoCreditoCreateView, CartaoCreditoDeleteView, CartaoCreditoDetailView, CartaoCreditoListView, CartaoCreditoUpdateView, PagarFaturaView
 )
 
 urlpatterns = [
@@ -17,6 +17,9 @@ urlpatterns = [
     path('lancamentos/adicionar/', LancamentoCreateView.as_view(), name='adicionar_lancamento'),
     path('lancamentos/editar/<int:pk>/', LancamentoUpdateView.as_view(), name='editar_lancamento'),
     path('lancamentos/deletar/<int:pk>/', LancamentoDeleteView.as_view(), name='deletar_lancamento'),
+    path('lancamentos/importar/', ImportarExtratoView.as_view(), name='importar_extrato'),
+    path('autocompletar/fornecedores/', AutocompletarView.as_view(tipo='fornecedores'), name='autocompletar_fornecedores'),
+    path('autocompletar/categorias/', AutocompletarView.as_view(tipo='categorias'), name='autocompletar_categorias'),
 
     # Rotas de Cofrinhos
     path('cofrinhos/', CofrinhoListView.as_view(), name='lista_cofrinhos'),
@@ -44,6 +47,6 @@ urlpatterns = [
     path('cartoes/<int:pk>/editar/', CartaoCreditoUpdateView.as_view(), name='editar_cartao'),
     path('cartoes/<int:pk>/deletar/', CartaoCreditoDeleteView.as_view(), name='deletar_cartao'),
     path('cartoes/<int:pk>/detalhes/', CartaoCreditoDetailView.as_view(), name='detalhes_cartao'),
-    path('cartoes/<int:pk>/resetar-limite/', ResetarLimiteCartaoView.as_view(), name='resetar_limite_cartao'),
+    path('cartoes/<int:pk>/faturas/<int:fatura_pk>/pagar/', PagarFaturaView.as_view(), name='pagar_fatura'),
     
 ]
\ No newline at end of file
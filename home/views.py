@@ -1,45 +1,56 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
 from django.db import models
 from django.db.models import Sum
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, FormView, View
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db import transaction
 from django.core.exceptions import ValidationError
-from .models import Lancamento, Cofrinho, Fornecedor, Categoria, CartaoCredito
+from .models import Lancamento, Cofrinho, Fornecedor, Categoria, CartaoCredito, Fatura
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models.functions import TruncWeek
-from django.db.models import F
+from django.db.models import Count, F, OuterRef, Q, Prefetch, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
-from .forms import LancamentoForm, CofrinhoForm, FornecedorForm, CategoriaForm, RelatorioPeriodoForm, TransferirParaCofrinhoForm, CartaoCreditoForm
+from .forms import LancamentoForm, CofrinhoForm, FornecedorForm, CategoriaForm, RelatorioPeriodoForm, TransferirParaCofrinhoForm, CartaoCreditoForm, ImportarExtratoForm
 from datetime import date
+import io
 
-from gerente.utils import (
-    get_periodo_contabil_atual,
-    calcular_total_entradas,
-    calcular_total_saidas,
-    calcular_saldo_total_com_inicial
-)
+from gerente.utils import get_periodo_contabil_atual, resumo_periodo, calcular_resumo_por_metodo
+from gerente.paginacao import KeysetPaginationMixin
+from .services import transferir_para_cofrinho, salvar_lancamento, excluir_lancamento, atualizar_cartao, pagar_fatura, criar_compra_parcelada
+from .importacao import importar_extrato
+from . import busca
+from .autocompletar import sugestoes
 
 # --- Views de Lançamentos ---
-class LancamentoListView(ListView):
+class LancamentoListView(KeysetPaginationMixin, ListView):
     model = Lancamento
     template_name = 'lancamentos/lista.html'
     context_object_name = 'lancamentos'
-    ordering = ['-data']
+    paginate_by = 50
+    cursor_fields = ('data', 'id')
+    orcamento_consultas = 2
+
+    def get_queryset(self):
+        lancamentos = super().get_queryset().select_related('fornecedor', 'categoria__categoria_pai', 'cartao_credito')
+        termo = self.request.GET.get('q', '').strip()
+        if termo:
+            # Filtra pelo índice de busca; a ordem (e o cursor) continua sendo por data
+            lancamentos = busca.filtrar(lancamentos, termo)
+        return lancamentos
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['termo_busca'] = self.request.GET.get('q', '').strip()
         
         # Usa o mesmo período contábil da HomeView para consistência
         data_inicio, data_fim = get_periodo_contabil_atual()
         
-        # Calcula totais com funções modulares
-        total_entradas = calcular_total_entradas(data_inicio, data_fim)
-        total_saidas = calcular_total_saidas(data_inicio, data_fim)
-        saldo_total = calcular_saldo_total_com_inicial(data_inicio, data_fim)
+        # Entradas, saídas e saldo do período em uma única consulta
+        resumo = resumo_periodo(data_inicio, data_fim)
         
         # Mantém lógica existente para cartões
         context['cartoes_credito'] = CartaoCredito.objects.filter(ativo=True)
@@ -47,9 +58,9 @@ class LancamentoListView(ListView):
         context.update({
             'periodo_inicio': data_inicio,
             'periodo_fim': data_fim,
-            'total_entradas': total_entradas,
-            'total_saidas': total_saidas,
-            'saldo_total': saldo_total,
+            'total_entradas': resumo['entradas'],
+            'total_saidas': resumo['saidas'],
+            'saldo_total': resumo['saldo_final'],
         })
         
         return context
@@ -59,38 +70,40 @@ class LancamentoCreateView(CreateView):
     form_class = LancamentoForm
     template_name = 'lancamentos/adicionar.html'
     success_url = reverse_lazy('lista_lancamentos')
+    orcamento_consultas = 2
 
     def form_valid(self, form):
+        compra = form.compra_parcelada()
+        if compra is not None:
+            return self.criar_parcelas(form, compra)
+
         lancamento = form.save(commit=False)
-        
-        # A LÓGICA AGORA VIVE AQUI!
-        # Só executa a lógica de limite se for uma SAÍDA com cartão de crédito.
-        if lancamento.tipo == 'saida' and lancamento.metodo_pagamento == 'cartao_credito':
-            try:
-                cartao = lancamento.cartao_credito
-                valor = lancamento.valor
-                
-                # Verifica o limite antes de tentar salvar
-                if not cartao.tem_limite_disponivel(valor):
-                    messages.error(self.request, f"Limite insuficiente no cartão {cartao.nome}.")
-                    return self.form_invalid(form)
-
-                # Garante que ambas as operações (salvar e usar limite) funcionem
-                with transaction.atomic():
-                    cartao.usar_limite(valor)
-                    lancamento.save()
-                
-                messages.success(self.request, 'Lançamento de saída no cartão adicionado com sucesso!')
-                return redirect(self.success_url)
+        try:
+            # O débito do limite é um UPDATE condicional: se outra compra
+            # consumiu o limite nesse meio tempo, nada é salvo.
+            salvar_lancamento(lancamento)
+        except ValidationError as e:
+            messages.error(self.request, e.messages[0])
+            return self.form_invalid(form)
 
-            except ValidationError as e:
-                messages.error(self.request, str(e))
-                return self.form_invalid(form)
-        
-        # Para todos os outros casos (entradas, outras formas de pagamento),
-        # apenas salva o lançamento normalmente.
-        lancamento.save()
-        messages.success(self.request, 'Lançamento adicionado com sucesso!')
+        if lancamento.consome_limite():
+            messages.success(self.request, 'Lançamento de saída no cartão adicionado com sucesso!')
+        else:
+            messages.success(self.request, 'Lançamento adicionado com sucesso!')
+        return redirect(self.success_url)
+
+    def criar_parcelas(self, form, compra):
+        try:
+            parcelas = criar_compra_parcelada(compra)
+        except ValidationError as e:
+            messages.error(self.request, e.messages[0])
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f'Compra parcelada em {compra.numero_parcelas}x adicionada: primeira parcela R$ {parcelas[0].valor}, '
+            f'última em {parcelas[-1].data:%d/%m/%Y}.'
+        )
         return redirect(self.success_url)
 
 class LancamentoUpdateView(UpdateView):
@@ -98,62 +111,69 @@ class LancamentoUpdateView(UpdateView):
     form_class = LancamentoForm
     template_name = 'lancamentos/editar.html'
     success_url = reverse_lazy('lista_lancamentos')
+    orcamento_consultas = 5
 
     def form_valid(self, form):
-        novo_lancamento = form.save(commit=False)
-        antigo_lancamento = Lancamento.objects.get(pk=self.object.pk)
-
         try:
-            with transaction.atomic():
-                # 1. Reverte o efeito do lançamento antigo, SE ele era uma saída no cartão.
-                if antigo_lancamento.tipo == 'saida' and antigo_lancamento.metodo_pagamento == 'cartao_credito':
-                    antigo_lancamento.cartao_credito.liberar_limite(antigo_lancamento.valor)
-
-                # 2. Aplica o efeito do novo lançamento, SE ele é uma saída no cartão.
-                if novo_lancamento.tipo == 'saida' and novo_lancamento.metodo_pagamento == 'cartao_credito':
-                    novo_lancamento.cartao_credito.usar_limite(novo_lancamento.valor)
-                
-                # Salva o objeto no banco de dados
-                novo_lancamento.save()
-
-            messages.success(self.request, 'Lançamento atualizado com sucesso!')
-            return redirect(self.success_url)
+            salvar_lancamento(form.save(commit=False))
         except ValidationError as e:
-            messages.error(self.request, str(e))
+            messages.error(self.request, e.messages[0])
             return self.form_invalid(form)
 
+        messages.success(self.request, 'Lançamento atualizado com sucesso!')
+        return redirect(self.success_url)
+
 class LancamentoDeleteView(DeleteView):
     model = Lancamento
     template_name = 'lancamentos/deletar.html'
     success_url = reverse_lazy('lista_lancamentos')
+    orcamento_consultas = 1
 
     def form_valid(self, form):
-        lancamento = self.get_object()
-
-        # Libera o limite APENAS se for uma SAÍDA de cartão de crédito
-        if lancamento.tipo == 'saida' and lancamento.metodo_pagamento == 'cartao_credito':
-            try:
-                with transaction.atomic():
-                    lancamento.cartao_credito.liberar_limite(lancamento.valor)
-                    # A exclusão ocorre depois da liberação do limite
-                    response = super().form_valid(form)
-                messages.success(self.request, 'Lançamento excluído e limite do cartão restaurado!')
-                return response
-            except Exception as e:
-                messages.error(self.request, f"Erro ao excluir: {e}")
-                return redirect(self.success_url)
-
-        # Para todos os outros casos, apenas deleta
-        response = super().form_valid(form)
-        messages.success(self.request, 'Lançamento excluído com sucesso!')
-        return response
+        lancamento = self.object
+        restaura_limite = lancamento.consome_limite()
+        excluir_lancamento(lancamento)
+
+        if restaura_limite:
+            messages.success(self.request, 'Lançamento excluído e limite do cartão restaurado!')
+        else:
+            messages.success(self.request, 'Lançamento excluído com sucesso!')
+        return redirect(self.success_url)
 
 # --- Views de Cartões de Crédito ---
+def fatura_atual_do_cartao(hoje):
+    """Total da fatura aberta em `hoje`, como subconsulta para anotar os cartões."""
+    return Coalesce(
+        Subquery(
+            Fatura.objects.filter(cartao=OuterRef('pk'), fechamento__gt=hoje).order_by('fechamento').values('total')[:1]
+        ),
+        Decimal('0.00'),
+    )
+
 class CartaoCreditoListView(ListView):
     model = CartaoCredito
     template_name = 'cartoes/lista.html'
     context_object_name = 'cartoes'
     ordering = ['nome']
+    orcamento_consultas = 2
+
+    def get_queryset(self):
+        hoje = timezone.localdate()
+
+        # Últimos 5 lançamentos de cada cartão em uma única consulta
+        ultimos_lancamentos = Lancamento.objects.annotate(
+            posicao=Window(
+                expression=RowNumber(),
+                partition_by=F('cartao_credito'),
+                order_by=[F('data').desc(), F('id').desc()],
+            )
+        ).filter(posicao__lte=5).order_by('-data', '-id')
+
+        return super().get_queryset().annotate(
+            fatura_atual=fatura_atual_do_cartao(hoje),
+        ).prefetch_related(
+            Prefetch('lancamentos', queryset=ultimos_lancamentos, to_attr='ultimos_lancamentos')
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -163,20 +183,6 @@ class CartaoCreditoListView(ListView):
         for cartao in cartoes:
             cartao.limite_usado_valor = cartao.limite_usado()
             cartao.percentual_usado_valor = cartao.percentual_usado()
-            
-            # Últimos lançamentos do cartão
-            cartao.ultimos_lancamentos = Lancamento.objects.filter(
-                cartao_credito=cartao
-            ).order_by('-data')[:5]
-            
-            # Total gasto no mês atual
-            hoje = timezone.now().date()
-            primeiro_dia_mes = hoje.replace(day=1)
-            cartao.gasto_mes_atual = Lancamento.objects.filter(
-                cartao_credito=cartao,
-                data__gte=primeiro_dia_mes,
-                tipo='saida'
-            ).aggregate(Sum('valor'))['valor__sum'] or 0
         
         return context
 
@@ -185,6 +191,7 @@ class CartaoCreditoCreateView(CreateView):
     form_class = CartaoCreditoForm
     template_name = 'cartoes/adicionar.html'
     success_url = reverse_lazy('lista_cartoes')
+    orcamento_consultas = 0
 
     def form_valid(self, form):
         # Garantir que o limite disponível seja igual ao limite total para cartões novos
@@ -200,16 +207,18 @@ class CartaoCreditoUpdateView(UpdateView):
     form_class = CartaoCreditoForm
     template_name = 'cartoes/editar.html'
     success_url = reverse_lazy('lista_cartoes')
+    orcamento_consultas = 1
 
     def form_valid(self, form):
-        response = super().form_valid(form)
+        self.object = atualizar_cartao(form.save(commit=False), form._meta.fields)
         messages.success(self.request, 'Cartão de crédito atualizado com sucesso!')
-        return response
+        return redirect(self.get_success_url())
 
 class CartaoCreditoDeleteView(DeleteView):
     model = CartaoCredito
     template_name = 'cartoes/deletar.html'
     success_url = reverse_lazy('lista_cartoes')
+    orcamento_consultas = 3
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -237,65 +246,72 @@ class CartaoCreditoDeleteView(DeleteView):
         messages.success(self.request, 'Cartão de crédito excluído com sucesso!')
         return response
 
-class CartaoCreditoDetailView(TemplateView):
+class CartaoCreditoDetailView(KeysetPaginationMixin, ListView):
+    """Cartão, suas faturas mais recentes e as compras (de todas as faturas ou de `?fatura=`), paginadas."""
+    model = Lancamento
     template_name = 'cartoes/detalhes.html'
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        cartao_id = kwargs.get('pk')
-        cartao = get_object_or_404(CartaoCredito, pk=cartao_id)
-        
-        context['cartao'] = cartao
-        context['limite_usado_valor'] = cartao.limite_usado()
-        context['percentual_usado_valor'] = cartao.percentual_usado()
-        
-        # Lançamentos do cartão
-        context['lancamentos'] = Lancamento.objects.filter(
-            cartao_credito=cartao
-        ).order_by('-data')
-        
-        # Estatísticas por mês
-        hoje = timezone.now().date()
-        primeiro_dia_mes = hoje.replace(day=1)
-        
-        context['gasto_mes_atual'] = Lancamento.objects.filter(
-            cartao_credito=cartao,
-            data__gte=primeiro_dia_mes,
-            tipo='saida'
-        ).aggregate(Sum('valor'))['valor__sum'] or 0
-        
-        # Próximo vencimento
-        if cartao.dia_vencimento:
+    context_object_name = 'lancamentos'
+    paginate_by = 30
+    cursor_fields = ('data', 'id')
+    orcamento_consultas = 4
+    faturas_exibidas = 12
+
+    def get_queryset(self):
+        self.cartao = get_object_or_404(CartaoCredito, pk=self.kwargs['pk'])
+        lancamentos = super().get_queryset().filter(cartao_credito=self.cartao, tipo='saida')
+        self.fatura_id = None
+        if self.request.GET.get('fatura'):
             try:
-                proximo_vencimento = hoje.replace(day=cartao.dia_vencimento)
-                if proximo_vencimento <= hoje:
-                    # Se já passou este mês, próximo mês
-                    if proximo_vencimento.month == 12:
-                        proximo_vencimento = proximo_vencimento.replace(year=proximo_vencimento.year + 1, month=1)
-                    else:
-                        proximo_vencimento = proximo_vencimento.replace(month=proximo_vencimento.month + 1)
-                context['proximo_vencimento'] = proximo_vencimento
+                self.fatura_id = int(self.request.GET['fatura'])
             except ValueError:
-                # Dia inválido (ex: 31 em fevereiro)
-                context['proximo_vencimento'] = None
-        
+                raise Http404("Fatura inválida.")
+            lancamentos = lancamentos.filter(fatura_id=self.fatura_id)
+        return lancamentos
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cartao = self.cartao
+        hoje = timezone.localdate()
+
+        faturas = list(cartao.faturas.order_by('-fechamento')[:self.faturas_exibidas])
+        fechamento_atual = cartao.fechamento_para(hoje)
+        fatura_atual = next((fatura for fatura in faturas if fatura.fechamento == fechamento_atual), None)
+        # Parceladas com parcelas a pagar, somadas numa consulta só
+        compras_parceladas = cartao.compras_parceladas.annotate(
+            em_aberto=Coalesce(Sum('parcelas__valor', filter=Q(parcelas__quitado=False)), Decimal('0.00')),
+            parcelas_pagas=Count('parcelas', filter=Q(parcelas__quitado=True)),
+        ).filter(em_aberto__gt=0)
+
+        context.update({
+            'cartao': cartao,
+            'limite_usado_valor': cartao.limite_usado(),
+            'percentual_usado_valor': cartao.percentual_usado(),
+            'faturas': faturas,
+            'compras_parceladas': compras_parceladas,
+            'fatura_id': self.fatura_id,
+            'fatura_selecionada': next((fatura for fatura in faturas if fatura.pk == self.fatura_id), None),
+            'fatura_atual_total': fatura_atual.total if fatura_atual else Decimal('0.00'),
+            'proximo_fechamento': fechamento_atual,
+            'proximo_vencimento': cartao.proximo_vencimento(hoje),
+            'hoje': hoje,
+        })
         return context
 
-class ResetarLimiteCartaoView(View):
-    """View para resetar o limite do cartão (simular pagamento da fatura)"""
-    
-    def post(self, request, pk):
-        cartao = get_object_or_404(CartaoCredito, pk=pk)
-        
-        # Resetar limite disponível para o limite total
-        cartao.limite_disponivel = cartao.limite_total
-        cartao.save()
-        
-        messages.success(
-            request, 
-            f'Limite do cartão {cartao.nome} foi resetado. Limite disponível: R$ {cartao.limite_disponivel}'
-        )
-        
+class PagarFaturaView(View):
+    """Paga uma fatura fechada: quita suas compras e devolve o limite que elas ocupavam."""
+
+    def post(self, request, pk, fatura_pk):
+        fatura = get_object_or_404(Fatura.objects.select_related('cartao'), pk=fatura_pk, cartao_id=pk)
+        try:
+            valor = pagar_fatura(fatura)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(
+                request,
+                f'Fatura de {fatura.vencimento:%d/%m/%Y} do cartão {fatura.cartao.nome} paga: R$ {valor}. '
+                f'Limite disponível: R$ {fatura.cartao.limite_disponivel}'
+            )
         return redirect('detalhes_cartao', pk=pk)
 
 # --- Views de Cofrinhos ---
@@ -303,6 +319,7 @@ class CofrinhoListView(ListView):
     model = Cofrinho
     template_name = 'cofrinhos/lista.html'
     context_object_name = 'cofrinhos'
+    orcamento_consultas = 1
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -319,6 +336,7 @@ class CofrinhoCreateView(CreateView):
     form_class = CofrinhoForm
     template_name = 'cofrinhos/adicionar.html'
     success_url = reverse_lazy('lista_cofrinhos')
+    orcamento_consultas = 0
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -330,17 +348,21 @@ class CofrinhoUpdateView(UpdateView):
     form_class = CofrinhoForm
     template_name = 'cofrinhos/editar.html'
     success_url = reverse_lazy('lista_cofrinhos')
+    orcamento_consultas = 1
 
 class CofrinhoDeleteView(DeleteView):
     model = Cofrinho
     template_name = 'cofrinhos/deletar.html'
     success_url = reverse_lazy('lista_cofrinhos')
+    orcamento_consultas = 1
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, 'Cofrinho excluído com sucesso!')
         return response
 
 class TransferirParaCofrinhoView(View):
+    orcamento_consultas = 1
+
     def get(self, request):
         form = TransferirParaCofrinhoForm()
         return render(request, 'cofrinhos/transferir.html', {'form': form})
@@ -350,47 +372,72 @@ class TransferirParaCofrinhoView(View):
         if form.is_valid():
             valor = form.cleaned_data['valor']
             cofrinho = form.cleaned_data['cofrinho_destino']
-            
-            data_inicio, data_fim = get_periodo_contabil_atual()
-        
-            # Calcula totais usando funções modulares
-            total_entradas = calcular_total_entradas(data_inicio, data_fim)
-            total_saidas = calcular_total_saidas(data_inicio, data_fim)
-            saldo_total = calcular_saldo_total_com_inicial(data_inicio, data_fim)
 
-            if valor > saldo_total:
-                messages.error(request, 'Saldo insuficiente para a transferência.')
+            try:
+                transferir_para_cofrinho(cofrinho, valor)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
                 return redirect('transferir_cofrinho')
-
-            with transaction.atomic():
-                cofrinho.saldo += valor
-                cofrinho.save()
-                Lancamento.objects.create(
-                    descricao=f'Transferência para cofrinho {cofrinho.nome}',
-                    tipo='saida',
-                    valor=valor,
-                    data=timezone.now(),
-                    cofrinho_destino=cofrinho,
-                    observacoes='Transferência interna.'
-                )
             
             messages.success(request, f'R$ {valor} transferido com sucesso para o cofrinho {cofrinho.nome}.')
             return redirect('lista_cofrinhos')
         
         return render(request, 'cofrinhos/transferir.html', {'form': form})
 
+class ImportarExtratoView(FormView):
+    form_class = ImportarExtratoForm
+    template_name = 'lancamentos/importar.html'
+    success_url = reverse_lazy('lista_lancamentos')
+    orcamento_consultas = 1
+
+    def form_valid(self, form):
+        # O upload é lido em streaming, linha a linha
+        linhas = io.TextIOWrapper(form.cleaned_data['arquivo'].file, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            resultado = importar_extrato(
+                linhas,
+                formato=form.cleaned_data['formato'],
+                metodo_pagamento=form.cleaned_data['metodo_pagamento'] or None,
+                cartao=form.cleaned_data['cartao_credito'],
+            )
+        except ValidationError as e:
+            messages.error(self.request, e.messages[0])
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f"{resultado['importados']} lançamento(s) importado(s), {resultado['duplicados']} duplicado(s) ignorado(s): "
+            f"R$ {resultado['entradas']} em entradas e R$ {resultado['saidas']} em saídas.",
+        )
+        return redirect(self.get_success_url())
+
+
+class AutocompletarView(View):
+    """
+    Opções dos campos fornecedor/categoria do LancamentoForm em JSON:
+    ?q=prefixo -> {"resultados": [{"id", "texto"}, ...]}.
+    """
+    tipo = None  # 'fornecedores' ou 'categorias' (home/autocompletar.py)
+    orcamento_consultas = 1
+
+    def get(self, request):
+        resultados = sugestoes(self.tipo, request.GET.get('q', ''))
+        return JsonResponse({'resultados': [{'id': pk, 'texto': texto} for pk, texto in resultados]})
+
 
 # --- Views de Fornecedores ---
 class FornecedorListView(ListView):
     model = Fornecedor
     template_name = 'fornecedores/lista.html'
     context_object_name = 'fornecedores'
+    orcamento_consultas = 1
 
 class FornecedorCreateView(CreateView):
     model = Fornecedor
     form_class = FornecedorForm
     template_name = 'fornecedores/adicionar.html'
     success_url = reverse_lazy('lista_fornecedores')
+    orcamento_consultas = 0
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -402,6 +449,7 @@ class FornecedorUpdateView(UpdateView):
     form_class = FornecedorForm
     template_name = 'fornecedores/editar.html'
     success_url = reverse_lazy('lista_fornecedores')
+    orcamento_consultas = 1
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -412,6 +460,7 @@ class FornecedorDeleteView(DeleteView):
     model = Fornecedor
     template_name = 'fornecedores/deletar.html'
     success_url = reverse_lazy('lista_fornecedores')
+    orcamento_consultas = 1
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -423,12 +472,14 @@ class CategoriaListView(ListView):
     model = Categoria
     template_name = 'categorias/lista.html'
     context_object_name = 'categorias'
+    orcamento_consultas = 1
 
 class CategoriaCreateView(CreateView):
     model = Categoria
     form_class = CategoriaForm
     template_name = 'categorias/adicionar.html'
     success_url = reverse_lazy('lista_categorias')
+    orcamento_consultas = 0
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -440,6 +491,7 @@ class CategoriaUpdateView(UpdateView):
     form_class = CategoriaForm
     template_name = 'categorias/editar.html'
     success_url = reverse_lazy('lista_categorias')
+    orcamento_consultas = 2
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -455,6 +507,7 @@ class CategoriaDeleteView(DeleteView):
     model = Categoria
     template_name = 'categorias/deletar.html'
     success_url = reverse_lazy('lista_categorias')
+    orcamento_consultas = 1
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -464,6 +517,7 @@ class CategoriaDeleteView(DeleteView):
 # --- View da Home Page ---
 class HomeView(TemplateView):
     template_name = 'home/home.html'
+    orcamento_consultas = 5
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -471,10 +525,8 @@ class HomeView(TemplateView):
         # Obtém o período contábil atual
         data_inicio, data_fim = get_periodo_contabil_atual()
         
-        # Calcula totais usando funções modulares
-        total_entradas = calcular_total_entradas(data_inicio, data_fim)
-        total_saidas = calcular_total_saidas(data_inicio, data_fim)
-        saldo_total = calcular_saldo_total_com_inicial(data_inicio, data_fim)
+        # Entradas, saídas e saldo do período em uma única consulta
+        resumo = resumo_periodo(data_inicio, data_fim)
         
         # Mantém lógica existente para outros dados
         ultimos_lancamentos = Lancamento.objects.order_by("-data")[:5]
@@ -485,12 +537,11 @@ class HomeView(TemplateView):
             else:
                 cofrinho.progresso = 0
 
-        metodos_resumo = Lancamento.objects.values('metodo_pagamento').annotate(
-            total_entradas=Sum('valor', filter=models.Q(tipo='entrada')),
-            total_saidas=Sum('valor', filter=models.Q(tipo='saida'))
-        )
+        metodos_resumo = calcular_resumo_por_metodo()
         
-        cartoes_credito = CartaoCredito.objects.filter(ativo=True)
+        cartoes_credito = CartaoCredito.objects.filter(ativo=True).annotate(
+            fatura_atual=fatura_atual_do_cartao(timezone.localdate()),
+        )
         for cartao in cartoes_credito:
             cartao.limite_usado_valor = cartao.limite_usado()
             cartao.percentual_usado_valor = cartao.percentual_usado()
@@ -499,9 +550,9 @@ class HomeView(TemplateView):
             "periodo_inicio": data_inicio,
             "periodo_fim": data_fim,
             "ultimos_lancamentos": ultimos_lancamentos,
-            "total_entradas": total_entradas,
-            "total_saidas": total_saidas,
-            "saldo_total": saldo_total,
+            "total_entradas": resumo['entradas'],
+            "total_saidas": resumo['saidas'],
+            "saldo_total": resumo['saldo_final'],
             "cofrinhos": cofrinhos,
             "metodos_resumo": metodos_resumo,
             "cartoes_credito": cartoes_credito,
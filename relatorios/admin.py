@@ -1,3 +1,18 @@
 from django.contrib import admin
 
+from .models import DREPeriodo, ResumoDiario
+
 # Register your models here.
+
+
+@admin.register(DREPeriodo)
+class DREPeriodoAdmin(admin.ModelAdmin):
+    list_display = ('data_inicio', 'data_fim', 'receita_bruta', 'gerado_em')
+    readonly_fields = ('gerado_em',)
+
+
+@admin.register(ResumoDiario)
+class ResumoDiarioAdmin(admin.ModelAdmin):
+    list_display = ('data', 'tipo', 'metodo_pagamento', 'fornecedor', 'categoria', 'quantidade', 'total')
+    list_filter = ('tipo', 'metodo_pagamento')
+    date_hierarchy = 'data'
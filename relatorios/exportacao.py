@@ -0,0 +1,105 @@
+"""
+Exportação dos lançamentos em CSV e XLSX.
+
+As linhas são lidas com values_list().iterator(chunk_size=...), sem instanciar
+modelos nem carregar o queryset inteiro: o consumo de memória fica constante
+mesmo para milhões de lançamentos. O CSV é enviado em streaming; o XLSX é
+gravado em modo write_only num arquivo temporário (o formato é um zip, não
+dá para enviá-lo antes de terminar) e então devolvido como arquivo.
+
+XLSX usa o openpyxl (em requirements.txt); sem ele instalado, só o CSV
+fica disponível.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import openpyxl
+except ImportError:  # dependência opcional
+    openpyxl = None
+
+TAMANHO_LOTE = 2000
+
+COLUNAS = [
+    ('data', 'Data'),
+    ('descricao', 'Descrição'),
+    ('tipo', 'Tipo'),
+    ('valor', 'Valor'),
+    ('metodo_pagamento', 'Método de Pagamento'),
+    ('categoria__nome', 'Categoria'),
+    ('fornecedor__nome', 'Fornecedor'),
+    ('cartao_credito__nome', 'Cartão de Crédito'),
+    ('cofrinho_destino__nome', 'Cofrinho'),
+    ('observacoes', 'Observações'),
+]
+
+
+# Texto que o Excel/LibreOffice interpretariam como fórmula (descrições vêm de
+# usuários e de extratos importados): o apóstrofo faz a célula ficar como texto
+INICIOS_DE_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celula(valor):
+    if isinstance(valor, str) and valor.startswith(INICIOS_DE_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def linhas_exportacao(lancamentos):
+    """
+    Tuplas dos lançamentos na ordem de COLUNAS, lidas do banco em lotes, com
+    os textos que começariam uma fórmula neutralizados.
+    """
+    for linha in lancamentos.order_by('data', 'id').values_list(
+        *(campo for campo, _ in COLUNAS)
+    ).iterator(chunk_size=TAMANHO_LOTE):
+        yield [_celula(valor) for valor in linha]
+
+
+def _nome_arquivo(extensao):
+    return f"lancamentos_{timezone.localdate():%Y%m%d}.{extensao}"
+
+
+def resposta_csv(lancamentos):
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def gerar():
+        # BOM para o Excel reconhecer o UTF-8
+        yield '\ufeff' + escritor.writerow([titulo for _, titulo in COLUNAS])
+        for linha in linhas_exportacao(lancamentos):
+            yield escritor.writerow(linha)
+
+    resposta = StreamingHttpResponse(gerar(), content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{_nome_arquivo("csv")}"'
+    return resposta
+
+
+def resposta_xlsx(lancamentos):
+    if openpyxl is None:
+        raise Http404("Exportação XLSX indisponível: instale o pacote openpyxl.")
+
+    pasta = openpyxl.Workbook(write_only=True)
+    planilha = pasta.create_sheet('Lançamentos')
+    planilha.append([titulo for _, titulo in COLUNAS])
+    for linha in linhas_exportacao(lancamentos):
+        planilha.append(linha)
+
+    arquivo = tempfile.TemporaryFile()
+    pasta.save(arquivo)
+    arquivo.seek(0)
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=_nome_arquivo('xlsx'),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from relatorios.models import ResumoDiario
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o rollup diário (ResumoDiario) usado pelo relatório de entradas e saídas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help="Primeira data a reconstruir (AAAA-MM-DD). Padrão: todo o histórico.")
+        parser.add_argument('--fim', help="Última data a reconstruir (AAAA-MM-DD).")
+
+    def handle(self, *args, **options):
+        total = ResumoDiario.reconstruir(options['inicio'], options['fim'])
+        self.stdout.write(self.style.SUCCESS(f"{total} linha(s) de resumo diário reconstruída(s)."))
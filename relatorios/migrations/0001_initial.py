@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2025-09-16 09:31
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DREPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_inicio', models.DateField()),
+                ('data_fim', models.DateField()),
+                ('receita_bruta', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('custos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('despesas_operacionais', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('despesas_administrativas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('despesas_financeiras', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('gerado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'DRE do Período',
+                'verbose_name_plural': 'DREs dos Períodos',
+                'ordering': ['-data_inicio'],
+                'constraints': [models.UniqueConstraint(fields=('data_inicio', 'data_fim'), name='dre_periodo_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2025-09-20 10:12
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def popular_resumos(apps, schema_editor):
+    Lancamento = apps.get_model('home', 'Lancamento')
+    ResumoDiario = apps.get_model('relatorios', 'ResumoDiario')
+    grupos = Lancamento.objects.values(
+        'data', 'tipo', 'metodo_pagamento', 'fornecedor_id', 'categoria_id'
+    ).annotate(soma_quantidade=Count('id'), soma_total=Sum('valor')).order_by()
+    ResumoDiario.objects.bulk_create([
+        ResumoDiario(
+            data=grupo['data'], tipo=grupo['tipo'], metodo_pagamento=grupo['metodo_pagamento'] or None,
+            fornecedor_id=grupo['fornecedor_id'], categoria_id=grupo['categoria_id'],
+            quantidade=grupo['soma_quantidade'],
+            total=(grupo['soma_total'] or Decimal('0.00')).quantize(Decimal('0.01')),
+        )
+        for grupo in grupos
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0021_lancamento_impressao_digital'),
+        ('relatorios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo', models.CharField(max_length=10)),
+                ('metodo_pagamento', models.CharField(blank=True, max_length=100, null=True)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.categoria')),
+                ('fornecedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='home.fornecedor')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário',
+                'verbose_name_plural': 'Resumos Diários',
+                'ordering': ['data'],
+                'indexes': [models.Index(fields=['data', 'tipo'], name='resumo_data_tipo_idx'), models.Index(fields=['metodo_pagamento', 'data'], name='resumo_metodo_data_idx')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
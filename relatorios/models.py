@@ -1,5 +1,135 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from decimal import Decimal
 
 # Create your models here.
 
 
+class DREPeriodo(models.Model):
+    """
+    DRE materializado de um período contábil já fechado.
+
+    Guarda só as linhas base; as linhas derivadas (lucro bruto, EBITDA,
+    resultado) são calculadas em `como_dict`. Um lançamento criado, editado
+    ou excluído dentro do período apaga o snapshot (relatorios/signals.py),
+    que é recalculado no próximo acesso.
+    """
+    data_inicio = models.DateField()
+    data_fim = models.DateField()
+    receita_bruta = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    custos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    despesas_operacionais = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    despesas_administrativas = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    despesas_financeiras = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    gerado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-data_inicio"]
+        verbose_name = "DRE do Período"
+        verbose_name_plural = "DREs dos Períodos"
+        constraints = [
+            models.UniqueConstraint(fields=['data_inicio', 'data_fim'], name='dre_periodo_unico'),
+        ]
+
+    def __str__(self):
+        return f"DRE {self.data_inicio:%d/%m/%Y} a {self.data_fim:%d/%m/%Y}"
+
+    def como_dict(self):
+        from .services import montar_dre
+        return montar_dre({
+            'receita_bruta': self.receita_bruta,
+            'custos': self.custos,
+            'despesas_operacionais': self.despesas_operacionais,
+            'despesas_administrativas': self.despesas_administrativas,
+            'despesas_financeiras': self.despesas_financeiras,
+        })
+
+
+class ResumoDiario(models.Model):
+    """
+    Rollup diário dos lançamentos, uma linha por
+    (data, tipo, metodo_pagamento, fornecedor, categoria).
+
+    Os relatórios de entradas/saídas somam estas linhas (dezenas por dia) em
+    vez de varrer os lançamentos. Mantido incrementalmente pelos signals de
+    Lancamento (relatorios/signals.py) e reconstruído com
+    `manage.py recalcular_resumos`. Linhas repetidas para a mesma chave (ex.:
+    fornecedor excluído, que vira NULL) não são erro: os relatórios sempre somam.
+    """
+    data = models.DateField()
+    tipo = models.CharField(max_length=10)
+    metodo_pagamento = models.CharField(max_length=100, null=True, blank=True)
+    fornecedor = models.ForeignKey('home.Fornecedor', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    categoria = models.ForeignKey('home.Categoria', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    quantidade = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ["data"]
+        verbose_name = "Resumo Diário"
+        verbose_name_plural = "Resumos Diários"
+        indexes = [
+            models.Index(fields=['data', 'tipo'], name='resumo_data_tipo_idx'),
+            models.Index(fields=['metodo_pagamento', 'data'], name='resumo_metodo_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} {self.tipo} - R$ {self.total} ({self.quantidade})"
+
+    @staticmethod
+    def chave(lancamento):
+        from home.models import Lancamento
+        return (
+            Lancamento._meta.get_field('data').to_python(lancamento.data),
+            lancamento.tipo,
+            lancamento.metodo_pagamento or None,
+            lancamento.fornecedor_id,
+            lancamento.categoria_id,
+        )
+
+    @classmethod
+    def registrar(cls, chave, quantidade, total):
+        """Soma `quantidade` e `total` (podem ser negativos) na linha da chave, criando-a se preciso."""
+        data, tipo, metodo_pagamento, fornecedor_id, categoria_id = chave
+        filtro = {
+            'data': data, 'tipo': tipo, 'metodo_pagamento': metodo_pagamento,
+            'fornecedor_id': fornecedor_id, 'categoria_id': categoria_id,
+        }
+        pk = cls.objects.filter(**filtro).order_by('pk').values_list('pk', flat=True).first()
+        if pk is None:
+            cls.objects.create(quantidade=quantidade, total=total, **filtro)
+        else:
+            cls.objects.filter(pk=pk).update(quantidade=F('quantidade') + quantidade, total=F('total') + total)
+
+    @classmethod
+    def calcular_do_ledger(cls, lancamentos):
+        """Agrupa `lancamentos` (queryset) por chave, com uma consulta. Retorna instâncias não salvas."""
+        grupos = lancamentos.values(
+            'data', 'tipo', 'metodo_pagamento', 'fornecedor_id', 'categoria_id'
+        ).annotate(soma_quantidade=Count('id'), soma_total=Sum('valor')).order_by()
+        return [
+            cls(
+                data=grupo['data'], tipo=grupo['tipo'], metodo_pagamento=grupo['metodo_pagamento'] or None,
+                fornecedor_id=grupo['fornecedor_id'], categoria_id=grupo['categoria_id'],
+                quantidade=grupo['soma_quantidade'],
+                # No SQLite a soma de decimais volta com ruído de ponto flutuante
+                total=(grupo['soma_total'] or Decimal('0.00')).quantize(Decimal('0.01')),
+            )
+            for grupo in grupos
+        ]
+
+    @classmethod
+    def reconstruir(cls, data_inicio=None, data_fim=None):
+        """Apaga e recria as linhas do intervalo (ou de todo o histórico) a partir dos lançamentos."""
+        from home.models import Lancamento
+        lancamentos = Lancamento.objects.all()
+        resumos = cls.objects.all()
+        if data_inicio:
+            lancamentos = lancamentos.filter(data__gte=data_inicio)
+            resumos = resumos.filter(data__gte=data_inicio)
+        if data_fim:
+            lancamentos = lancamentos.filter(data__lte=data_fim)
+            resumos = resumos.filter(data__lte=data_fim)
+        with transaction.atomic():
+            resumos.delete()
+            return len(cls.objects.bulk_create(cls.calcular_do_ledger(lancamentos), batch_size=1000))
@@ -0,0 +1,220 @@
+"""
+Projeção do saldo de caixa e simulação de cenários ("e se...").
+
+O histórico vem do rollup diário (ResumoDiario), agrupado por dia, tipo e
+categoria numa única consulta, e vira matrizes NumPy com uma série por
+(tipo, categoria):
+
+- `mensal[s, m]`: total da série em cada mês fechado do histórico;
+- `perfil[s, d]`: fração do total da série que cai no dia d do mês.
+
+Cada série é projetada pelo nível recente (média dos últimos 12 meses)
+vezes o índice sazonal do mês do ano (com pelo menos um ano de histórico) e
+distribuída nos dias pelo perfil do dia do mês. Como no SaldoDiario, compras
+no cartão de crédito não movimentam o caixa e ficam de fora.
+
+Cenários multiplicam as séries das categorias cortadas (subárvore inteira)
+e somam custos recorrentes novos, calculados por prever_recorrentes com
+regras não salvas. Tudo é vetorizado: anos de histórico em milissegundos.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import Q, Sum
+
+from gerente.cache import cache_versionado
+from home.models import Categoria, Recorrencia, SaldoDiario
+from home.recorrencias import prever_recorrentes
+
+from .models import ResumoDiario
+
+ANOS_HISTORICO = 3
+CENTAVO = Decimal('0.01')
+
+Historico = namedtuple('Historico', 'series mensal perfil primeiro_mes')
+
+
+def _indice_mes(ano, mes, primeiro_mes):
+    return (ano - primeiro_mes.year) * 12 + mes - primeiro_mes.month
+
+
+def carregar_historico(primeiro_mes, ultimo_dia):
+    """Séries do caixa entre as datas, com uma consulta ao rollup diário."""
+    linhas = list(
+        ResumoDiario.objects.filter(data__gte=primeiro_mes, data__lte=ultimo_dia)
+        .exclude(tipo='saida', metodo_pagamento='cartao_credito')
+        .values_list('data', 'tipo', 'categoria_id')
+        .annotate(soma=Sum('total'))
+        .order_by()
+    )
+    series = {}
+    indices_serie = np.fromiter(
+        (series.setdefault((tipo, categoria_id), len(series)) for _, tipo, categoria_id, _ in linhas),
+        dtype=np.int64, count=len(linhas),
+    )
+    indices_mes = np.fromiter(
+        (_indice_mes(data.year, data.month, primeiro_mes) for data, _, _, _ in linhas), dtype=np.int64, count=len(linhas),
+    )
+    dias = np.fromiter((data.day - 1 for data, _, _, _ in linhas), dtype=np.int64, count=len(linhas))
+    valores = np.fromiter((float(soma or 0) for _, _, _, soma in linhas), dtype=np.float64, count=len(linhas))
+
+    # O histórico começa no primeiro mês com movimento: meses vazios antes disso não baixam a média
+    if len(linhas):
+        inicio = int(indices_mes.min())
+        indices_mes -= inicio
+        primeiro_mes += relativedelta(months=inicio)
+    quantidade_meses = _indice_mes(ultimo_dia.year, ultimo_dia.month, primeiro_mes) + 1 if len(linhas) else 0
+
+    mensal = np.zeros((len(series), quantidade_meses))
+    np.add.at(mensal, (indices_serie, indices_mes), valores)
+    perfil = np.zeros((len(series), 31))
+    np.add.at(perfil, (indices_serie, dias), valores)
+    somas = perfil.sum(axis=1, keepdims=True)
+    perfil = np.divide(perfil, somas, out=np.full_like(perfil, 1 / 31), where=somas != 0)
+    return Historico(list(series), mensal, perfil, primeiro_mes)
+
+
+def linha_de_base(historico):
+    """
+    Nível mensal de cada série (média dos últimos 12 meses) e índice sazonal
+    por mês do ano (12 colunas, 1.0 sem um ano completo de histórico).
+    """
+    mensal = historico.mensal
+    quantidade_series, quantidade_meses = mensal.shape
+    if not quantidade_meses:
+        return np.zeros(quantidade_series), np.ones((quantidade_series, 12))
+
+    nivel = mensal[:, -12:].mean(axis=1)
+    sazonal = np.ones((quantidade_series, 12))
+    if quantidade_meses >= 12:
+        mes_do_ano = (historico.primeiro_mes.month - 1 + np.arange(quantidade_meses)) % 12
+        somas = np.zeros((quantidade_series, 12))
+        np.add.at(somas, (slice(None), mes_do_ano), mensal)
+        medias_mes = somas / np.bincount(mes_do_ano, minlength=12)
+        media_geral = mensal.mean(axis=1, keepdims=True)
+        sazonal = np.divide(medias_mes, media_geral, out=sazonal, where=media_geral != 0)
+    return nivel, sazonal
+
+
+def _perfil_do_mes(perfil, dias_no_mes):
+    # Dias que o mês não tem (29 a 31) caem no último dia, como os vencimentos
+    perfil_mes = perfil[:, :dias_no_mes].copy()
+    perfil_mes[:, -1] += perfil[:, dias_no_mes:].sum(axis=1)
+    return perfil_mes
+
+
+def _fatores_de_corte(series, cortes):
+    """Fator de cada série: 1 - percentual/100 nas categorias cortadas e suas subcategorias."""
+    fatores = np.ones(len(series))
+    if not cortes:
+        return fatores
+    subarvore = Q()
+    for caminho, _ in cortes:
+        subarvore |= Q(caminho__startswith=caminho)
+    fator_categoria = {}
+    for categoria_id, caminho in Categoria.objects.filter(subarvore).values_list('pk', 'caminho'):
+        fator = 1.0
+        for prefixo, percentual in cortes:
+            if caminho.startswith(prefixo):
+                fator *= 1 - float(percentual) / 100
+        fator_categoria[categoria_id] = fator
+    for indice, (_, categoria_id) in enumerate(series):
+        fatores[indice] = fator_categoria.get(categoria_id, 1.0)
+    return fatores
+
+
+def _custos_simulados(custos):
+    regras = []
+    for valor, frequencia, data_inicio in custos:
+        regra = Recorrencia(
+            descricao="Custo simulado", tipo='saida', valor=valor, metodo_pagamento='pix',
+            frequencia=frequencia, data_inicio=data_inicio,
+        )
+        regra.proxima_data = data_inicio
+        regras.append(regra)
+    return regras
+
+
+def _resultado(saldo_inicial, entradas, saidas, mes_do_dia, quantidade_meses, primeiro_dia):
+    """Totais por mês, saldo no fim de cada mês e o menor saldo diário do horizonte."""
+    entradas_mes = np.bincount(mes_do_dia, weights=entradas, minlength=quantidade_meses)
+    saidas_mes = np.bincount(mes_do_dia, weights=saidas, minlength=quantidade_meses)
+    saldos_mes = float(saldo_inicial) + np.cumsum(entradas_mes - saidas_mes)
+    saldos = float(saldo_inicial) + np.cumsum(entradas - saidas)
+    minimo = int(np.argmin(saldos)) if len(saldos) else None
+
+    def decimal(valor):
+        return Decimal(repr(float(valor))).quantize(CENTAVO)
+
+    return {
+        'meses': [
+            {'entradas': decimal(e), 'saidas': decimal(s), 'saldo_final': decimal(saldo)}
+            for e, s, saldo in zip(entradas_mes, saidas_mes, saldos_mes)
+        ],
+        'saldo_minimo': decimal(saldos[minimo]) if minimo is not None else saldo_inicial,
+        'data_saldo_minimo': primeiro_dia + timedelta(days=minimo) if minimo is not None else None,
+    }
+
+
+@cache_versionado('projecao_fluxo_caixa')
+def simular_fluxo_caixa(hoje, meses, cortes=(), custos=()):
+    """
+    Saldo de caixa projetado do dia seguinte a `hoje` até o fim do mês
+    `meses` - 1 a partir do atual, com e sem o cenário.
+
+    `cortes`: ((caminho, percentual), ...) reduz as séries das categorias
+    com esse caminho (Categoria.caminho) e das subcategorias;
+    `custos`: ((valor, frequencia, data_inicio), ...) soma saídas recorrentes.
+    Argumentos em tuplas: a chave do cache é formada por eles.
+
+    Retorna {'saldo_inicial', 'meses_historico', 'base', 'cenario'}; 'base' e
+    'cenario' (None sem cenário) têm 'meses' ({'mes', 'entradas', 'saidas',
+    'saldo_final'}), 'saldo_minimo' e 'data_saldo_minimo'.
+    """
+    primeiro_mes = hoje.replace(day=1)
+    historico = carregar_historico(primeiro_mes - relativedelta(years=ANOS_HISTORICO), primeiro_mes - timedelta(days=1))
+    nivel, sazonal = linha_de_base(historico)
+    sinais = np.array([1.0 if tipo == 'entrada' else -1.0 for tipo, _ in historico.series])
+    entrada = sinais > 0
+
+    meses_projetados = [primeiro_mes + relativedelta(months=indice) for indice in range(meses)]
+    primeiro_dia = hoje + timedelta(days=1)
+    fim = meses_projetados[-1] + relativedelta(months=1) - timedelta(days=1)
+
+    # Valor de cada série em cada dia dos meses projetados (um bloco por mês, no máximo dezenas)
+    blocos, mes_do_dia = [], []
+    for indice, mes in enumerate(meses_projetados):
+        dias_no_mes = ((mes + relativedelta(months=1)) - mes).days
+        blocos.append((nivel * sazonal[:, mes.month - 1])[:, None] * _perfil_do_mes(historico.perfil, dias_no_mes))
+        mes_do_dia.append(np.full(dias_no_mes, indice))
+    # Os dias do mês atual até hoje já estão no saldo inicial
+    diario = np.concatenate(blocos, axis=1)[:, hoje.day:]
+    mes_do_dia = np.concatenate(mes_do_dia)[hoje.day:]
+
+    saldo_inicial = SaldoDiario.saldo_ate(hoje)
+
+    def projetar(fatores, regras):
+        projetado = diario * fatores[:, None]
+        entradas = projetado[entrada].sum(axis=0)
+        saidas = projetado[~entrada].sum(axis=0)
+        for data, (e, s) in prever_recorrentes(primeiro_dia, fim, regras).items() if regras else ():
+            entradas[(data - primeiro_dia).days] += float(e)
+            saidas[(data - primeiro_dia).days] += float(s)
+        resultado = _resultado(saldo_inicial, entradas, saidas, mes_do_dia, meses, primeiro_dia)
+        for mes, linha in zip(meses_projetados, resultado['meses']):
+            linha['mes'] = mes
+        return resultado
+
+    base = projetar(np.ones(len(historico.series)), [])
+    cenario = None
+    if cortes or custos:
+        cenario = projetar(_fatores_de_corte(historico.series, cortes), _custos_simulados(custos))
+    return {
+        'saldo_inicial': saldo_inicial,
+        'meses_historico': historico.mensal.shape[1],
+        'base': base,
+        'cenario': cenario,
+    }
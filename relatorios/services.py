@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Q, Sum, Value, When
+from django.utils import timezone
+
+from gerente.cache import cache_versionado
+from home.models import Categoria, Lancamento
+
+from .models import DREPeriodo
+
+# Linha base do DRE -> (nome da categoria pai, tipo dos lançamentos)
+LINHAS_DRE = {
+    'receita_bruta': ('RECEITAS', 'entrada'),
+    'custos': ('CUSTOS DE PRODUTOS/SERVIÇOS', 'saida'),
+    'despesas_operacionais': ('DESPESAS OPERACIONAIS', 'saida'),
+    'despesas_administrativas': ('DESPESAS ADMINISTRATIVAS', 'saida'),
+    'despesas_financeiras': ('DESPESAS FINANCEIRAS', 'saida'),
+}
+
+
+def montar_dre(linhas):
+    """Completa as linhas base do DRE com as linhas derivadas."""
+    dre = dict(linhas)
+    dre['lucro_bruto'] = dre['receita_bruta'] - dre['custos']
+    # earning before interest, taxes, depreciation and amortization
+    dre['ebitda'] = dre['lucro_bruto'] - dre['despesas_operacionais'] - dre['despesas_administrativas']
+    dre['resultado_liquido'] = dre['ebitda'] - dre['despesas_financeiras']
+    return dre
+
+
+def calcular_linhas_dre(inicio, fim):
+    """
+    Calcula as linhas base do DRE do período. Cada linha soma toda a subárvore
+    abaixo da sua categoria raiz (em qualquer profundidade), em uma única
+    consulta agrupada.
+    """
+    raizes = {categoria.nome: categoria for categoria in Categoria.objects.filter(
+        nome__in=[nome for nome, _ in LINHAS_DRE.values()]
+    )}
+    casos = [
+        When(raizes[nome].filtro_subarvore(incluir_raiz=False) & Q(tipo=tipo), then=Value(linha))
+        for linha, (nome, tipo) in LINHAS_DRE.items()
+        if nome in raizes
+    ]
+
+    totais = {}
+    if casos:
+        totais = {
+            resultado['linha']: resultado['total']
+            for resultado in Lancamento.objects.filter(data__gte=inicio, data__lte=fim).annotate(
+                linha=Case(*casos, output_field=CharField())
+            ).filter(linha__isnull=False).values('linha').annotate(total=Sum('valor')).order_by()
+        }
+    return {
+        linha: (totais.get(linha) or Decimal('0.00')).quantize(Decimal('0.01'))
+        for linha in LINHAS_DRE
+    }
+
+
+@cache_versionado('dre_aberto')
+def calcular_dre_aberto(inicio, fim):
+    """DRE do período em aberto, guardado no cache até a próxima escrita no ledger."""
+    return montar_dre(calcular_linhas_dre(inicio, fim))
+
+
+@cache_versionado('resultado_liquido')
+def calcular_resultado_liquido(inicio, fim):
+    """
+    Receitas - despesas do período nas subcategorias (qualquer profundidade),
+    fora da árvore de TRANSFERENCIAS. KPI do dashboard de relatórios.
+    """
+    lancamentos = Lancamento.objects.filter(data__gte=inicio, data__lte=fim, categoria__nivel__gte=1)
+    for transferencias in Categoria.objects.filter(nome='TRANSFERENCIAS'):
+        lancamentos = lancamentos.exclude(transferencias.filtro_subarvore())
+
+    totais = lancamentos.aggregate(
+        receitas=Sum('valor', filter=Q(tipo='entrada')),
+        despesas=Sum('valor', filter=Q(tipo='saida')),
+    )
+    receitas = totais['receitas'] or Decimal('0.00')
+    despesas = totais['despesas'] or Decimal('0.00')
+    return receitas - despesas
+
+
+def obter_dre(inicio, fim):
+    """
+    DRE do período. Períodos já encerrados são lidos do snapshot DREPeriodo
+    (materializado no primeiro acesso); o período em aberto vem do cache versionado.
+    """
+    if fim >= timezone.localdate():
+        return calcular_dre_aberto(inicio, fim)
+
+    snapshot = DREPeriodo.objects.filter(data_inicio=inicio, data_fim=fim).first()
+    if snapshot is None:
+        snapshot, _ = DREPeriodo.objects.update_or_create(
+            data_inicio=inicio, data_fim=fim, defaults=calcular_linhas_dre(inicio, fim)
+        )
+    return snapshot.como_dict()
+
+
+def invalidar_dre(*datas):
+    """Apaga os snapshots de DRE que cobrem alguma das datas."""
+    for data in set(datas):
+        DREPeriodo.objects.filter(data_inicio__lte=data, data_fim__gte=data).delete()
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from home.models import Categoria, Lancamento
+from home.signals import lancamentos_em_lote
+
+from .models import DREPeriodo, ResumoDiario
+from .services import invalidar_dre
+
+
+@receiver(post_save, sender=Lancamento)
+def invalidar_dre_ao_salvar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    datas = [Lancamento._meta.get_field('data').to_python(instance.data)]
+    anterior = getattr(instance, '_estado_anterior', None)
+    if anterior is not None:
+        datas.append(anterior.data)
+    invalidar_dre(*datas)
+
+
+@receiver(post_delete, sender=Lancamento)
+def invalidar_dre_ao_excluir(sender, instance, **kwargs):
+    invalidar_dre(instance.data)
+
+
+@receiver(lancamentos_em_lote)
+def invalidar_dre_em_lote(sender, movimentos, **kwargs):
+    # Um único DELETE para a faixa de datas do lote, em vez de um por dia.
+    if movimentos:
+        DREPeriodo.objects.filter(data_inicio__lte=max(movimentos), data_fim__gte=min(movimentos)).delete()
+
+
+@receiver([post_save, post_delete], sender=Categoria)
+def invalidar_dre_ao_mudar_categoria(sender, raw=False, **kwargs):
+    # Renomear ou mover categorias muda a classificação de todos os períodos.
+    if not raw:
+        DREPeriodo.objects.all().delete()
+
+
+@receiver(post_save, sender=Lancamento)
+def atualizar_resumo_ao_salvar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_estado_anterior', None)
+    if anterior is not None:
+        ResumoDiario.registrar(ResumoDiario.chave(anterior), -1, -anterior.valor)
+    ResumoDiario.registrar(ResumoDiario.chave(instance), 1, instance.valor)
+
+
+@receiver(post_delete, sender=Lancamento)
+def atualizar_resumo_ao_excluir(sender, instance, **kwargs):
+    ResumoDiario.registrar(ResumoDiario.chave(instance), -1, -instance.valor)
+
+
+@receiver(lancamentos_em_lote)
+def reconstruir_resumo_em_lote(sender, movimentos, **kwargs):
+    # Lotes trazem muitos lançamentos por chave: regrupar a faixa é uma consulta só.
+    if movimentos:
+        ResumoDiario.reconstruir(min(movimentos), max(movimentos))
@@ -1,3 +1,312 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db.models import Sum
 from django.test import TestCase
+from django.urls import reverse
+
+from home.models import CartaoCredito, Categoria, Lancamento, Fornecedor
+from home.services import criar_lancamentos_em_lote, excluir_lancamento, salvar_lancamento
+
+from .exportacao import openpyxl
+from .models import DREPeriodo, ResumoDiario
+from .projecao import simular_fluxo_caixa
+from .services import obter_dre
+
+
+class ExportarLancamentosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        fornecedor = Fornecedor.objects.create(nome="Atacadão")
+        Lancamento.objects.bulk_create([
+            Lancamento(descricao="Venda balcão", tipo='entrada', valor=Decimal('120.50'),
+                       data=date(2025, 3, 5), metodo_pagamento='pix'),
+            Lancamento(descricao="Compra; mercadoria", tipo='saida', valor=Decimal('80.00'),
+                       data=date(2025, 3, 10), metodo_pagamento='dinheiro', fornecedor=fornecedor),
+            Lancamento(descricao="Fora do período", tipo='entrada', valor=Decimal('10.00'),
+                       data=date(2025, 4, 20), metodo_pagamento='pix'),
+        ])
+
+    def exportar(self, **filtros):
+        resposta = self.client.get(reverse('relatorios:exportar_lancamentos'), filtros)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        conteudo = b''.join(resposta.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(conteudo), delimiter=';'))
+
+    def test_csv_aplica_filtros_do_relatorio(self):
+        linhas = self.exportar(data_inicio='2025-03-01', data_fim='2025-03-31', formato='csv')
+        self.assertEqual(linhas[0][:4], ['Data', 'Descrição', 'Tipo', 'Valor'])
+        self.assertEqual(
+            [linha[:4] for linha in linhas[1:]],
+            [['2025-03-05', 'Venda balcão', 'entrada', '120.50'],
+             ['2025-03-10', 'Compra; mercadoria', 'saida', '80.00']],
+        )
+        self.assertEqual(linhas[2][6], 'Atacadão')
+
+    def test_csv_filtra_por_metodo(self):
+        linhas = self.exportar(metodo_pagamento='pix')
+        self.assertEqual([linha[1] for linha in linhas[1:]], ['Venda balcão', 'Fora do período'])
+
+    def test_textos_com_formula_sao_neutralizados(self):
+        Lancamento.objects.create(
+            descricao='=HYPERLINK("http://exemplo.com","Clique")', tipo='saida', valor=Decimal('1.00'),
+            data=date(2025, 5, 1), metodo_pagamento='pix', observacoes='@SUM(1+1)',
+        )
+        linhas = self.exportar(data_inicio='2025-05-01')
+        self.assertEqual(linhas[1][1], '\'=HYPERLINK("http://exemplo.com","Clique")')
+        self.assertEqual(linhas[1][9], "'@SUM(1+1)")
+        # Valores numéricos não são alterados
+        self.assertEqual(linhas[1][3], '1.00')
+
+    @skipUnless(openpyxl, "openpyxl não instalado (requirements.txt)")
+    def test_xlsx_com_formula_neutralizada(self):
+        Lancamento.objects.create(
+            descricao='=HYPERLINK("http://exemplo.com","Clique")', tipo='saida', valor=Decimal('1.00'),
+            data=date(2025, 5, 1), metodo_pagamento='pix',
+        )
+        resposta = self.client.get(reverse('relatorios:exportar_lancamentos'), {'data_inicio': '2025-05-01', 'formato': 'xlsx'})
+        self.assertEqual(resposta.status_code, 200)
+        planilha = openpyxl.load_workbook(io.BytesIO(b''.join(resposta.streaming_content))).active
+        self.assertEqual(planilha['B2'].value, '\'=HYPERLINK("http://exemplo.com","Clique")')
+        self.assertEqual(planilha['B2'].data_type, 's')
+
+    def test_formato_invalido(self):
+        resposta = self.client.get(reverse('relatorios:exportar_lancamentos'), {'formato': 'pdf'})
+        self.assertEqual(resposta.status_code, 404)
+
+
+class ResumoDiarioTests(TestCase):
+
+    def setUp(self):
+        self.fornecedor = Fornecedor.objects.create(nome="Atacadão")
+
+    def assertResumoConsistente(self):
+        gravado = {
+            (r['data'], r['tipo'], r['metodo_pagamento'], r['fornecedor_id'], r['categoria_id']): (r['q'], r['t'])
+            for r in ResumoDiario.objects.values(
+                'data', 'tipo', 'metodo_pagamento', 'fornecedor_id', 'categoria_id'
+            ).annotate(q=Sum('quantidade'), t=Sum('total')).filter(q__gt=0)
+        }
+        esperado = {
+            ResumoDiario.chave(r): (r.quantidade, r.total)
+            for r in ResumoDiario.calcular_do_ledger(Lancamento.objects.all())
+        }
+        self.assertEqual(gravado, esperado)
+
+    def test_mantido_incrementalmente(self):
+        venda = salvar_lancamento(Lancamento(
+            descricao="Venda", tipo='entrada', valor=Decimal('50.00'), data=date(2025, 3, 3), metodo_pagamento='pix',
+        ))
+        compra = salvar_lancamento(Lancamento(
+            descricao="Compra", tipo='saida', valor=Decimal('20.00'), data=date(2025, 3, 3),
+            metodo_pagamento='dinheiro', fornecedor=self.fornecedor,
+        ))
+        self.assertResumoConsistente()
+
+        venda.valor = Decimal('70.00')
+        venda.data = date(2025, 3, 10)
+        salvar_lancamento(venda)
+        self.assertResumoConsistente()
+
+        excluir_lancamento(compra)
+        criar_lancamentos_em_lote([
+            Lancamento(descricao=f"Lote {i}", tipo='entrada', valor=Decimal('5.00'),
+                       data=date(2025, 3, 4 + i % 3), metodo_pagamento='pix')
+            for i in range(9)
+        ])
+        self.assertResumoConsistente()
+
+        self.fornecedor.delete()
+        self.assertResumoConsistente()
+
+    def test_relatorio_le_do_resumo(self):
+        criar_lancamentos_em_lote([
+            Lancamento(descricao=f"Venda {i}", tipo='entrada', valor=Decimal('10.00'),
+                       data=date(2025, 1, 1 + i), metodo_pagamento='pix')
+            for i in range(31)
+        ] + [
+            Lancamento(descricao="Compra", tipo='saida', valor=Decimal('40.00'), data=date(2025, 2, 3),
+                       metodo_pagamento='dinheiro', fornecedor=self.fornecedor),
+        ])
+        resposta = self.client.get(reverse('relatorios:entradas_saidas'), {
+            'data_inicio': '2025-01-01', 'data_fim': '2025-02-28',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['total_entradas'], Decimal('310.00'))
+        self.assertEqual(resposta.context['saldo_periodo'], Decimal('270.00'))
+        self.assertEqual(resposta.context['quantidade_lancamentos'], 32)
+        self.assertEqual(
+            [(m['mes'], m['saldo_mes']) for m in resposta.context['resumo_mensal']],
+            [('01/2025', Decimal('310.00')), ('02/2025', Decimal('-40.00'))],
+        )
+        self.assertEqual(list(resposta.context['gastos_por_fornecedor'])[0]['total_gasto'], Decimal('40.00'))
+
+    def test_links_de_exportacao_trocam_o_formato(self):
+        resposta = self.client.get(reverse('relatorios:entradas_saidas'), {'data_inicio': '2025-01-01', 'formato': 'xlsx'})
+        urls = resposta.context['urls_exportacao']
+        self.assertEqual(urls['csv'], reverse('relatorios:exportar_lancamentos') + '?data_inicio=2025-01-01&formato=csv')
+        self.assertEqual(urls['xlsx'].count('formato='), 1)
+
+
+class DREPeriodoTests(TestCase):
+    # Períodos contábeis fechados (corte no dia 11)
+    JANEIRO = (date(2025, 1, 11), date(2025, 2, 10))
+    FEVEREIRO = (date(2025, 2, 11), date(2025, 3, 10))
+
+    def setUp(self):
+        receitas = Categoria.objects.create(nome="RECEITAS")
+        custos = Categoria.objects.create(nome="CUSTOS DE PRODUTOS/SERVIÇOS")
+        self.vendas = Categoria.objects.create(nome="Vendas", categoria_pai=receitas)
+        self.insumos = Categoria.objects.create(nome="Insumos", categoria_pai=custos)
+        self.venda = self.lancamento('entrada', '1000.00', date(2025, 1, 20), self.vendas)
+        self.compra = self.lancamento('saida', '300.00', date(2025, 2, 1), self.insumos)
+        self.lancamento('entrada', '500.00', date(2025, 2, 20), self.vendas)
+
+    def lancamento(self, tipo, valor, data, categoria):
+        return salvar_lancamento(Lancamento(
+            descricao=f"{categoria.nome} {data}", tipo=tipo, valor=Decimal(valor), data=data,
+            metodo_pagamento='pix', categoria=categoria,
+        ))
+
+    def snapshots(self):
+        return set(DREPeriodo.objects.values_list('data_inicio', 'data_fim'))
+
+    def test_segundo_acesso_le_o_snapshot(self):
+        dre = obter_dre(*self.JANEIRO)
+        self.assertEqual((dre['receita_bruta'], dre['custos'], dre['resultado_liquido']),
+                         (Decimal('1000.00'), Decimal('300.00'), Decimal('700.00')))
+        self.assertEqual(self.snapshots(), {self.JANEIRO})
+
+        # Só a leitura do snapshot, sem reagrupar os lançamentos
+        with self.assertNumQueries(1):
+            self.assertEqual(obter_dre(*self.JANEIRO), dre)
+
+    def test_escritas_no_periodo_apagam_o_snapshot(self):
+        obter_dre(*self.JANEIRO)
+        obter_dre(*self.FEVEREIRO)
+
+        novo = self.lancamento('saida', '50.00', date(2025, 1, 25), self.insumos)
+        self.assertEqual(self.snapshots(), {self.FEVEREIRO})
+        self.assertEqual(obter_dre(*self.JANEIRO)['custos'], Decimal('350.00'))
+
+        # Editar sem mudar de período
+        novo.valor = Decimal('80.00')
+        salvar_lancamento(novo)
+        self.assertEqual(self.snapshots(), {self.FEVEREIRO})
+        self.assertEqual(obter_dre(*self.JANEIRO)['custos'], Decimal('380.00'))
+
+        # Mover para o outro período apaga os dois
+        self.venda.data = date(2025, 2, 25)
+        salvar_lancamento(self.venda)
+        self.assertEqual(self.snapshots(), set())
+        self.assertEqual(obter_dre(*self.JANEIRO)['receita_bruta'], Decimal('0.00'))
+        self.assertEqual(obter_dre(*self.FEVEREIRO)['receita_bruta'], Decimal('1500.00'))
+
+        excluir_lancamento(self.compra)
+        self.assertEqual(self.snapshots(), {self.FEVEREIRO})
+        self.assertEqual(obter_dre(*self.JANEIRO)['custos'], Decimal('80.00'))
+
+    def test_parametro_periodo_seleciona_o_periodo(self):
+        # Snapshots já materializados: a view fica dentro do orçamento de consultas
+        obter_dre(*self.JANEIRO)
+        obter_dre(*self.FEVEREIRO)
+
+        resposta = self.client.get(reverse('relatorios:dre_detalhado'), {'periodo': '2025-02'})
+        self.assertEqual((resposta.context['data_inicio'], resposta.context['data_fim']), self.FEVEREIRO)
+        self.assertEqual(resposta.context['dre']['receita_bruta'], Decimal('500.00'))
+        self.assertEqual((resposta.context['periodo_anterior'], resposta.context['periodo_seguinte']), ('2025-01', '2025-03'))
+
+        resposta = self.client.get(reverse('relatorios:dre_detalhado'), {'periodo': '2025-01'})
+        self.assertEqual(resposta.context['dre']['resultado_liquido'], Decimal('700.00'))
+
+        self.assertEqual(self.client.get(reverse('relatorios:dre_detalhado'), {'periodo': '2025-13'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('relatorios:dre_detalhado'), {'periodo': 'x'}).status_code, 404)
+
+
+class ProjecaoFluxoCaixaTests(TestCase):
+    hoje = date(2026, 1, 15)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendas = Categoria.objects.create(nome="Vendas")
+        cls.despesas = Categoria.objects.create(nome="Despesas")
+        cls.aluguel = Categoria.objects.create(nome="Aluguel", categoria_pai=cls.despesas)
+        cartao = CartaoCredito.objects.create(
+            nome="Cartão", limite_total=Decimal('5000.00'), limite_disponivel=Decimal('5000.00'),
+            dia_vencimento=10, dia_fechamento=3,
+        )
+        lancamentos = []
+        for mes in range(1, 13):
+            # Dezembro vende o dobro: com um ano de histórico vira sazonalidade
+            lancamentos.append(Lancamento(
+                descricao="Vendas", tipo='entrada', valor=Decimal('2000.00' if mes == 12 else '1000.00'),
+                data=date(2025, mes, 10), metodo_pagamento='pix', categoria=cls.vendas,
+            ))
+            lancamentos.append(Lancamento(
+                descricao="Aluguel", tipo='saida', valor=Decimal('300.00'),
+                data=date(2025, mes, 5), metodo_pagamento='pix', categoria=cls.aluguel,
+            ))
+        # Compra no cartão não movimenta o caixa
+        lancamentos.append(Lancamento(
+            descricao="Equipamento", tipo='saida', valor=Decimal('900.00'), data=date(2025, 6, 20),
+            metodo_pagamento='cartao_credito', cartao_credito=cartao, categoria=cls.despesas,
+        ))
+        criar_lancamentos_em_lote(lancamentos)
+
+    def test_linha_de_base_com_sazonalidade(self):
+        projecao = simular_fluxo_caixa.sem_cache(self.hoje, 12)
+        self.assertEqual(projecao['saldo_inicial'], Decimal('9400.00'))
+        # Os meses vazios antes do primeiro lançamento não entram na média
+        self.assertEqual(projecao['meses_historico'], 12)
+        self.assertIsNone(projecao['cenario'])
+
+        meses = projecao['base']['meses']
+        self.assertEqual([mes['mes'] for mes in meses], [date(2026, mes, 1) for mes in range(1, 13)])
+        # Dia 10 de janeiro já passou: o mês atual não projeta mais nada
+        self.assertEqual((meses[0]['entradas'], meses[0]['saidas']), (Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual((meses[1]['entradas'], meses[1]['saidas']), (Decimal('1000.00'), Decimal('300.00')))
+        self.assertEqual(meses[1]['saldo_final'], Decimal('10100.00'))
+        self.assertEqual(meses[11]['entradas'], Decimal('2000.00'))
+        self.assertEqual(meses[11]['saldo_final'], Decimal('9400.00') + 10 * Decimal('700.00') + Decimal('1700.00'))
+        # O aluguel do dia 5 sai antes das vendas do dia 10
+        self.assertEqual(projecao['base']['saldo_minimo'], Decimal('9100.00'))
+        self.assertEqual(projecao['base']['data_saldo_minimo'], date(2026, 2, 5))
+
+    def test_cenario_corta_subarvore_e_soma_custo(self):
+        projecao = simular_fluxo_caixa.sem_cache(
+            self.hoje, 3, ((self.despesas.caminho, Decimal('50')),), ((Decimal('1200.00'), 'mensal', date(2026, 2, 1)),),
+        )
+        base, cenario = projecao['base']['meses'], projecao['cenario']['meses']
+        self.assertEqual(cenario[1]['entradas'], base[1]['entradas'])
+        self.assertEqual(cenario[1]['saidas'], Decimal('150.00') + Decimal('1200.00'))
+        # Cada mês gasta 1350 antes das vendas do dia 10: o menor saldo é o de 5 de março
+        self.assertEqual(projecao['cenario']['saldo_minimo'], Decimal('9400.00') - 2 * Decimal('1350.00') + Decimal('1000.00'))
+        self.assertEqual(projecao['cenario']['data_saldo_minimo'], date(2026, 3, 5))
+
+    def test_resultado_em_cache_ate_o_ledger_mudar(self):
+        primeira = simular_fluxo_caixa(self.hoje, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(simular_fluxo_caixa(self.hoje, 2), primeira)
+        salvar_lancamento(Lancamento(
+            descricao="Venda extra", tipo='entrada', valor=Decimal('100.00'), data=date(2026, 1, 12),
+            metodo_pagamento='pix', categoria=self.vendas,
+        ))
+        self.assertEqual(simular_fluxo_caixa(self.hoje, 2)['saldo_inicial'], Decimal('9500.00'))
+
+    def test_view_com_cenario(self):
+        resposta = self.client.get(reverse('relatorios:projecao'), {
+            'meses': '6', 'categoria': self.despesas.pk, 'corte_percentual': '20',
+            'custo_valor': '', 'custo_frequencia': 'mensal',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.context['projecao']['cenario']['meses']), 6)
 
-# Create your tests here.
+        resposta = self.client.get(reverse('relatorios:projecao'), {'meses': '6', 'corte_percentual': '20'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('projecao', resposta.context)
+        self.assertIn('categoria', resposta.context['form'].errors)
@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .views import RelatorioDREView, RelatorioEntradasSaidasView, RelatoriosDashboardView
+from .views import RelatorioDREView, RelatorioEntradasSaidasView, RelatoriosDashboardView, ExportarLancamentosView, RelatorioProjecaoView
 
 app_name = 'relatorios' # Boa prática para evitar conflito de nomes de URL
 
@@ -11,5 +11,14 @@ urlpatterns = [
     # O relatório DRE detalhado, acessível em /relatorios/dre/
     path('dre/', RelatorioDREView.as_view(), name='dre_detalhado'),
 
+    # Entradas e saídas do período (rollup diário), acessível em /relatorios/entradas-saidas/
+    path('entradas-saidas/', RelatorioEntradasSaidasView.as_view(), name='entradas_saidas'),
+
+    # Projeção do saldo de caixa com simulação de cenários: /relatorios/projecao/
+    path('projecao/', RelatorioProjecaoView.as_view(), name='projecao'),
+
+    # Exportação dos lançamentos filtrados: /relatorios/exportar/?formato=csv|xlsx
+    path('exportar/', ExportarLancamentosView.as_view(), name='exportar_lancamentos'),
+
     
 ]
\ No newline at end of file
@@ -1,18 +1,22 @@
 from django.shortcuts import render
+from django.http import Http404
 from django.db.models import Sum, Q
-from django.db.models.functions import TruncWeek
+from django.db.models.functions import TruncMonth, TruncWeek
 from datetime import timedelta
-from django.views.generic import TemplateView
-from django.db import models
-from home.models import Lancamento, Categoria
-from home.forms import RelatorioPeriodoForm
+from django.urls import reverse
+from django.views.generic import TemplateView, View
+from home.models import Lancamento
+from home.forms import ProjecaoForm, RelatorioPeriodoForm
 
 from django.utils import timezone
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from decimal import Decimal
 
-from gerente.utils import get_periodo_contabil_atual
+from gerente.utils import get_periodo_contabil_atual, get_periodo_contabil
+from .models import ResumoDiario
+from .services import obter_dre, calcular_resultado_liquido
+from .exportacao import resposta_csv, resposta_xlsx
+from .projecao import simular_fluxo_caixa
 
 
 # Create your views here.
@@ -20,6 +24,7 @@ from gerente.utils import get_periodo_contabil_atual
 
 class RelatoriosDashboardView(TemplateView):
     template_name = 'relatorios/dashboard.html'
+    orcamento_consultas = 2
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -31,68 +36,70 @@ class RelatoriosDashboardView(TemplateView):
 
 #-----------------------------------------------------------------#
 
-        lancamentos_periodo = Lancamento.objects.filter(data__gte=data_inicio, data__lte=data_fim)
-
-        categorias_dre = Categoria.objects.exclude(nome='TRANSFERENCIAS')
-
-        receitas = lancamentos_periodo.filter(
-            tipo='entrada',
-            categoria__categoria_pai__in=categorias_dre
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-
-        despesas = lancamentos_periodo.filter(
-            tipo='saida',
-            categoria__categoria_pai__in=categorias_dre
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-
-        resultado_liquido = receitas - despesas
+        resultado_liquido = calcular_resultado_liquido(data_inicio, data_fim)
         
         context['kpi_resultado_liquido'] = resultado_liquido
         
         return context
 
 class RelatorioEntradasSaidasView(TemplateView):
+    """
+    Entradas e saídas do período. Totais, gastos por fornecedor e os resumos
+    semanal e mensal vêm do rollup diário (ResumoDiario); só a lista de
+    lançamentos lê a tabela de lançamentos, limitada aos mais recentes.
+    """
     template_name = 'relatorios/entradas_saidas.html'
+    limite_lancamentos = 100
+    orcamento_consultas = 5
+
+    def resumo_por(self, resumos, truncar):
+        return resumos.annotate(periodo=truncar('data')).values('periodo').annotate(
+            total_entradas=Sum('total', filter=Q(tipo='entrada')),
+            total_saidas=Sum('total', filter=Q(tipo='saida')),
+        ).order_by('periodo')
+
+    def urls_exportacao(self):
+        """Links de exportação com os filtros da página; `formato` é trocado, não repetido."""
+        query = self.request.GET.copy()
+        query.pop('formato', None)
+        urls = {}
+        for formato in ('csv', 'xlsx'):
+            query['formato'] = formato
+            urls[formato] = f"{reverse('relatorios:exportar_lancamentos')}?{query.urlencode()}"
+        return urls
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         form = RelatorioPeriodoForm(self.request.GET or None)
         context['form'] = form
         if form.is_valid():
+            context['urls_exportacao'] = self.urls_exportacao()
             data_inicio = form.cleaned_data.get('data_inicio')
             data_fim = form.cleaned_data.get('data_fim')
-            metodo_pagamento = form.cleaned_data.get('metodo_pagamento')
-            lancamentos_filtrados = Lancamento.objects.all()
-            if data_inicio:
-                lancamentos_filtrados = lancamentos_filtrados.filter(data__gte=data_inicio)
-            if data_fim:
-                lancamentos_filtrados = lancamentos_filtrados.filter(data__lte=data_fim)
-            if metodo_pagamento:
-                lancamentos_filtrados = lancamentos_filtrados.filter(metodo_pagamento=metodo_pagamento)
-
-            total_entradas = lancamentos_filtrados.filter(tipo='entrada').aggregate(Sum('valor'))['valor__sum'] or 0
-            total_saidas = lancamentos_filtrados.filter(tipo='saida').aggregate(Sum('valor'))['valor__sum'] or 0
+            resumos = form.filtrar(ResumoDiario.objects.all())
+
+            totais = resumos.aggregate(
+                total_entradas=Sum('total', filter=Q(tipo='entrada')),
+                total_saidas=Sum('total', filter=Q(tipo='saida')),
+                quantidade=Sum('quantidade'),
+            )
+            total_entradas = totais['total_entradas'] or 0
+            total_saidas = totais['total_saidas'] or 0
             saldo_periodo = total_entradas - total_saidas
 
             # Cálculo: Total de saídas por fornecedor
-            gastos_por_fornecedor = lancamentos_filtrados.filter(
+            gastos_por_fornecedor = resumos.filter(
                 tipo='saida', fornecedor__isnull=False
             ).values('fornecedor__nome').annotate(
-                total_gasto=Sum('valor')
+                total_gasto=Sum('total')
             ).order_by('-total_gasto')
 
-            # Cálculo: Resumo semanal
+            # Cálculo: Resumos semanal e mensal
             resumo_semanal = []
+            resumo_mensal = []
             if data_inicio and data_fim:
-                lancamentos_semanais = lancamentos_filtrados.annotate(
-                    semana=TruncWeek('data')
-                ).values('semana').annotate(
-                    total_entradas=Sum('valor', filter=models.Q(tipo='entrada')),
-                    total_saidas=Sum('valor', filter=models.Q(tipo='saida'))
-                ).order_by('semana')
-
-                for semana in lancamentos_semanais:
-                    data_inicio_semana = semana['semana']
+                for semana in self.resumo_por(resumos, TruncWeek):
+                    data_inicio_semana = semana['periodo']
                     data_fim_semana = data_inicio_semana + timedelta(days=6)
                     saldo_semana = (semana['total_entradas'] or 0) - (semana['total_saidas'] or 0)
                     resumo_semanal.append({
@@ -101,80 +108,115 @@ class RelatorioEntradasSaidasView(TemplateView):
                         'total_saidas': semana['total_saidas'] or 0,
                         'saldo_semana': saldo_semana
                     })
+                for mes in self.resumo_por(resumos, TruncMonth):
+                    resumo_mensal.append({
+                        'mes': mes['periodo'].strftime("%m/%Y"),
+                        'total_entradas': mes['total_entradas'] or 0,
+                        'total_saidas': mes['total_saidas'] or 0,
+                        'saldo_mes': (mes['total_entradas'] or 0) - (mes['total_saidas'] or 0),
+                    })
+
+            lancamentos_filtrados = form.filtrar(Lancamento.objects.all()).select_related(
+                'categoria__categoria_pai', 'fornecedor'
+            ).order_by('-data', '-id')[:self.limite_lancamentos]
 
             context.update({
-                'lancamentos_filtrados': lancamentos_filtrados.order_by('-data'),
+                'lancamentos_filtrados': list(lancamentos_filtrados),
+                'quantidade_lancamentos': totais['quantidade'] or 0,
                 'total_entradas': total_entradas,
                 'total_saidas': total_saidas,
                 'saldo_periodo': saldo_periodo,
                 'gastos_por_fornecedor': gastos_por_fornecedor,
-                'resumo_semanal': resumo_semanal
+                'resumo_semanal': resumo_semanal,
+                'resumo_mensal': resumo_mensal,
             })
         else:
             context.update({
                 'lancamentos_filtrados': [],
+                'quantidade_lancamentos': 0,
                 'total_entradas': 0,
                 'total_saidas': 0,
                 'saldo_periodo': 0,
                 'gastos_por_fornecedor': [],
-                'resumo_semanal': []
+                'resumo_semanal': [],
+                'resumo_mensal': [],
             })
         return context
     
 class RelatorioDREView(TemplateView):
 
     template_name = 'relatorios/dre.html'
+    orcamento_consultas = 2
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        # ?periodo=AAAA-MM seleciona o período contábil que começa naquele mês
         data_inicio, data_fim = get_periodo_contabil_atual()    # utils 
+        periodo = self.request.GET.get('periodo')
+        if periodo:
+            try:
+                ano, mes = (int(parte) for parte in periodo.split('-'))
+                data_inicio, data_fim = get_periodo_contabil(date(ano, mes, data_inicio.day))
+            except ValueError:
+                raise Http404("Período inválido.")
+
         context['data_inicio'] = data_inicio
         context['data_fim'] = data_fim
-        
-        lancamentos_periodo = Lancamento.objects.filter(data__gte=data_inicio, data__lte=data_fim)
-
-        categorias_receitas = Categoria.objects.filter(nome = 'RECEITAS')
-        categorias_custos = Categoria.objects.filter(nome='CUSTOS DE PRODUTOS/SERVIÇOS')
-        categorias_desp_op = Categoria.objects.filter(nome='DESPESAS OPERACIONAIS')
-        categorias_desp_adm = Categoria.objects.filter(nome='DESPESAS ADMINISTRATIVAS')
-        categorias_desp_fin = Categoria.objects.filter(nome='DESPESAS FINANCEIRAS')
-
-        def calcular_total_categoria_pai(queryset, categorias_pai):
-            if not categorias_pai.exists():
-                return Decimal('0.00')
-            total = queryset.filter(categoria__categoria_pai__in = categorias_pai).aggregate(soma=Sum('valor'))['soma']
-            return total or Decimal('0.00')
-        
-        # calculo das linhas do DRE
-
-        receita_bruta = calcular_total_categoria_pai(lancamentos_periodo.filter(tipo='entrada'), categorias_receitas)
+        context['periodo_anterior'] = (data_inicio - relativedelta(months=1)).strftime('%Y-%m')
+        if data_fim < timezone.localdate():
+            context['periodo_seguinte'] = (data_inicio + relativedelta(months=1)).strftime('%Y-%m')
 
-        custos = calcular_total_categoria_pai(lancamentos_periodo.filter(tipo='saida'), categorias_custos)
+        # Períodos fechados vêm do snapshot; o período atual é uma consulta agrupada
+        context['dre'] = obter_dre(data_inicio, data_fim)      # enviar pro template
 
-        lucro_bruto = receita_bruta - custos
-
-        despesas_operacionais = calcular_total_categoria_pai(lancamentos_periodo.filter(tipo='saida'), categorias_desp_op)
-
-        despesas_administrativas = calcular_total_categoria_pai(lancamentos_periodo.filter(tipo='saida'), categorias_desp_adm)
-
-        ebitda = lucro_bruto - despesas_operacionais - despesas_administrativas #earning before interest, taxes, cepreciation and amortization
+        return context
 
-        despesas_financeiras = calcular_total_categoria_pai(lancamentos_periodo.filter(tipo='saida'), categorias_desp_fin)
 
-        resultado_liquido = ebitda - despesas_financeiras
+class RelatorioProjecaoView(TemplateView):
+    """
+    Saldo de caixa projetado a partir do histórico (relatorios/projecao.py)
+    e, se preenchido, o cenário: corte numa categoria e/ou um custo recorrente novo.
+    """
+    template_name = 'relatorios/projecao.html'
+    # Sem cache: categoria do form (validação e widget), histórico, saldo e subárvore do corte
+    orcamento_consultas = 5
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ProjecaoForm(self.request.GET if 'meses' in self.request.GET else None)
+        context['form'] = form
+        hoje = timezone.localdate()
+        if form.is_bound and not form.is_valid():
+            return context
+        meses, cortes, custos = form.fields['meses'].initial, (), ()
+        if form.is_bound:
+            meses = form.cleaned_data['meses']
+            cortes, custos = form.cenario(hoje)
+        context['projecao'] = simular_fluxo_caixa(hoje, meses, cortes, custos)
+        if context['projecao']['cenario']:
+            context['comparacao'] = zip(context['projecao']['base']['meses'], context['projecao']['cenario']['meses'])
+        return context
 
-        context['dre'] = {      # enviar pro template
-            'receita_bruta': receita_bruta,
-            'custos': custos,
-            'lucro_bruto': lucro_bruto,
-            'despesas_operacionais': despesas_operacionais,
-            'despesas_administrativas': despesas_administrativas,
-            'ebitda': ebitda,
-            'despesas_financeiras': despesas_financeiras,
-            'resultado_liquido': resultado_liquido,
-        }
 
-        return context
-    
+class ExportarLancamentosView(View):
+    """
+    Exporta os lançamentos com os mesmos filtros do relatório de entradas/saídas.
+    ?formato=csv (padrão) ou ?formato=xlsx.
+    """
+    # No CSV a consulta roda durante o streaming, depois do middleware; o XLSX
+    # é montado dentro da view, com uma consulta (iterator)
+    orcamento_consultas = 1
+
+    def get(self, request, *args, **kwargs):
+        form = RelatorioPeriodoForm(request.GET)
+        if not form.is_valid():
+            raise Http404("Filtros inválidos.")
+        lancamentos = form.filtrar(Lancamento.objects.all())
+
+        formato = request.GET.get('formato', 'csv')
+        if formato == 'csv':
+            return resposta_csv(lancamentos)
+        if formato == 'xlsx':
+            return resposta_xlsx(lancamentos)
+        raise Http404("Formato de exportação inválido.")